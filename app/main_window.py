@@ -9,14 +9,13 @@ from typing import Any, Callable
 import pandas as pd
 
 from app import __version__
-from service.surgery_comparator import compare_surgery_data
-from service.surgery_error_extractor import surgery_error_extractor
-from service.surgery_schedule_processor import process_surgery_schedule
-from service.surgery_search_processor import process_eye_surgery_data
+from service.pipeline import run_pipeline
+from service.report_writers import WriterResult
 from utils.config_manager import (
     get_appearance_settings,
     get_exclusion_line_keywords,
     get_paths,
+    get_profiling_settings,
     get_replacement_dict,
     get_surgery_strings_to_remove,
     load_config,
@@ -117,6 +116,26 @@ class OPHCheckerGUI:
         )
         self.close_button.pack(side=tk.LEFT, padx=5)
 
+        # 今回の実行だけプロファイルを取得する（config.iniは変更しない）
+        self.profile_var = tk.BooleanVar(value=bool(get_profiling_settings(self.config)['enabled']))
+        self.profile_checkbutton = tk.Checkbutton(
+            button_frame_row2,
+            text="プロファイル",
+            variable=self.profile_var,
+            font=("Arial", self.font_size),
+        )
+        self.profile_checkbutton.pack(side=tk.LEFT, padx=5)
+
+        # 入力ファイルと設定に変更が無くてもすべての処理を実行する
+        self.force_var = tk.BooleanVar(value=False)
+        self.force_checkbutton = tk.Checkbutton(
+            button_frame_row2,
+            text="強制実行",
+            variable=self.force_var,
+            font=("Arial", self.font_size),
+        )
+        self.force_checkbutton.pack(side=tk.LEFT, padx=5)
+
         log_label = tk.Label(self.root, text="実行ログ:", font=("Arial", self.font_size - 1))
         log_label.grid(row=3, column=0, columnspan=2, sticky="nw", padx=10, pady=(5, 0))
 
@@ -199,56 +218,25 @@ class OPHCheckerGUI:
             logging.error(f"{step_name}中にエラーが発生: {str(e)}", exc_info=True)
             raise
 
-    def _process_surgery_schedule(self, paths: dict) -> None:
-        """手術予定表の処理"""
-        self._execute_step(
-            1, 4, "手術予定表の処理",
-            process_surgery_schedule,
-            paths['surgery_schedule'],
-            paths['processed_surgery_schedule']
-        )
-
-    def _process_surgery_search(self, paths: dict) -> None:
-        """眼科手術検索データの処理"""
-        self._execute_step(
-            2, 4, "手術検索データの処理",
-            process_eye_surgery_data,
-            paths['surgery_search_data'],
-            paths['processed_surgery_search_data']
-        )
-
-    def _compare_surgery_data(self, paths: dict) -> None:
-        """データ比較"""
-        self._execute_step(
-            3, 4, "データ比較",
-            compare_surgery_data,
-            paths['processed_surgery_search_data'],
-            paths['processed_surgery_schedule'],
-            paths['comparison_result']
-        )
-
-    def _extract_surgery_errors(self, paths: dict) -> str:
-        """眼科手術指示確認ファイルを作成"""
-        self._log_message("\n[4/4] 眼科手術指示確認ファイルを作成開始...")
-        logging.info("[4/4] 眼科手術指示確認ファイルを作成開始")
-
-        try:
-            instruction_file = surgery_error_extractor(
-                paths['comparison_result'],
-                paths['output_path'],
-                paths['template_path']
-            )
-            if instruction_file:
-                self._log_message("✓ 眼科手術指示確認ファイルを作成しました")
-                logging.info("眼科手術指示確認ファイルを作成しました")
-            else:
-                self._log_message("✓ 不一致および未入力データはありませんでした")
-                logging.info("不一致および未入力データはありませんでした")
-            return instruction_file
-        except Exception as e:
-            self._log_message(f"✗ エラー: {str(e)}")
-            logging.error(f"眼科手術指示確認ファイルの作成中にエラーが発生: {str(e)}", exc_info=True)
-            raise
+    def _report_writer_result(self, result: WriterResult) -> None:
+        """出力形式ごとの書き込み結果をログに記録"""
+        if result.succeeded:
+            self._log_message(f"  ✓ {result.output_format}: {Path(result.output_filepath).name}（{result.elapsed_seconds:.1f}秒）")
+        else:
+            self._log_message(f"  ✗ {result.output_format}の出力に失敗しました: {result.error}")
+
+    def _report_extraction_result(self, instruction_file: str, unchanged_error_count: int = 0) -> None:
+        """眼科手術指示確認ファイルの作成結果をログに記録"""
+        if instruction_file:
+            self._log_message("✓ 眼科手術指示確認ファイルを作成しました")
+            logging.info("眼科手術指示確認ファイルを作成しました")
+        elif unchanged_error_count > 0:
+            message = f"前回から新規・変更された不一致・未入力はありませんでした（変化の無い不一致・未入力 {unchanged_error_count}件）"
+            self._log_message(f"✓ {message}")
+            logging.info(message)
+        else:
+            self._log_message("✓ 不一致および未入力データはありませんでした")
+            logging.info("不一致および未入力データはありませんでした")
 
     def _log_completion_summary(self, processed_surgery_search_data: str) -> None:
         """完了サマリーをログに記録"""
@@ -277,10 +265,23 @@ class OPHCheckerGUI:
             paths = get_paths(self.config)
             Path(paths["output_path"]).mkdir(parents=True, exist_ok=True)
 
-            self._process_surgery_schedule(paths)
-            self._process_surgery_search(paths)
-            self._compare_surgery_data(paths)
-            self._extract_surgery_errors(paths)
+            unchanged_outputs: list[str] = []
+            unchanged_error_counts: list[int] = []
+            instruction_file = run_pipeline(
+                self.config,
+                paths,
+                execute_step=self._execute_step,
+                profile=self.profile_var.get(),
+                on_writer_done=self._report_writer_result,
+                force=self.force_var.get(),
+                on_unchanged=unchanged_outputs.append,
+                on_unchanged_errors=unchanged_error_counts.append,
+            )
+            if unchanged_outputs:
+                self._open_previous_result(instruction_file, paths["output_path"])
+                return
+
+            self._report_extraction_result(instruction_file, sum(unchanged_error_counts))
 
             self._log_completion_summary(paths['processed_surgery_search_data'])
             self._open_output_folder(paths["output_path"])
@@ -291,6 +292,24 @@ class OPHCheckerGUI:
         finally:
             self.start_button.config(state=tk.NORMAL)
 
+    def _open_previous_result(self, instruction_file: str, output_path: str) -> None:
+        """変更が無く処理を省略した場合に前回の結果を開く"""
+        self._log_message("✓ 前回の実行から入力ファイルと設定に変更はありません（前回の結果を開きます）")
+        self._log_message("  すべての処理をやり直す場合は「強制実行」にチェックを入れてください")
+        self.status_var.set("処理完了（変更なし）")
+
+        if not instruction_file:
+            self._log_message("✓ 不一致および未入力データはありませんでした")
+            self._open_output_folder(output_path)
+            return
+
+        try:
+            os.startfile(instruction_file)
+            logging.info(f"前回の眼科手術指示確認ファイルを開きました: {instruction_file}")
+        except Exception as e:
+            logging.error(f"眼科手術指示確認ファイルを開けません: {str(e)}", exc_info=True)
+            self._log_message(f"✗ エラー: 眼科手術指示確認ファイルを開けません: {str(e)}")
+
     def _open_output_folder(self, output_path: str) -> None:
         try:
             os.startfile(output_path)
@@ -0,0 +1,79 @@
+import argparse
+import sys
+from pathlib import Path
+from typing import Any, Callable
+
+from scripts import benchmark
+from service.pipeline import run_pipeline
+from service.report_writers import WriterResult
+from utils.config_manager import get_paths, load_config
+from utils.log_rotation import setup_logging
+
+
+def _print_step(step_num: int, total_steps: int, step_name: str, func: Callable, *args: Any, **kwargs: Any) -> Any:
+    """処理ステップを実行して進捗を標準出力に表示"""
+    print(f"[{step_num}/{total_steps}] {step_name}を開始...")
+    result = func(*args, **kwargs)
+    print(f"✓ {step_name}が完了しました")
+    return result
+
+
+def _print_writer_result(result: WriterResult) -> None:
+    """出力形式ごとの書き込み結果を標準出力に表示"""
+    if result.succeeded:
+        print(f"  ✓ {result.output_format}: {result.output_filepath}（{result.elapsed_seconds:.1f}秒）")
+    else:
+        print(f"  ✗ {result.output_format}の出力に失敗しました: {result.error}")
+
+
+def run_analysis(args: argparse.Namespace) -> int:
+    """GUIを起動せずに分析処理を実行"""
+    config = load_config()
+    setup_logging(config)
+
+    paths = get_paths(config)
+    Path(paths['output_path']).mkdir(parents=True, exist_ok=True)
+
+    unchanged_error_counts: list[int] = []
+    instruction_file = run_pipeline(
+        config, paths, execute_step=_print_step, profile=args.profile, on_writer_done=_print_writer_result,
+        force=args.force, on_unchanged=lambda _: print("前回の実行から入力ファイルと設定に変更が無いため、処理を省略しました"),
+        on_unchanged_errors=unchanged_error_counts.append
+    )
+    if instruction_file:
+        print(f"出力ファイル: {instruction_file}")
+    elif unchanged_error_counts:
+        print(f"前回から新規・変更された不一致・未入力はありませんでした（変化の無い不一致・未入力 {unchanged_error_counts[0]}件）")
+    else:
+        print("不一致および未入力データはありませんでした")
+    return 0
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="ophchecker", description="眼科手術指示確認 コマンドラインツール")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = subparsers.add_parser("run", help="config.iniの設定で分析処理を実行")
+    run_parser.add_argument(
+        "--profile",
+        action=argparse.BooleanOptionalAction,
+        default=None,
+        help="各処理をcProfileで計測してログディレクトリに出力 (デフォルト: [Profiling]の設定)"
+    )
+    run_parser.add_argument(
+        "--force",
+        action="store_true",
+        help="入力ファイルと設定に変更が無くてもすべての処理を実行"
+    )
+    run_parser.set_defaults(handler=run_analysis)
+
+    bench_parser = subparsers.add_parser("bench", help="各処理の性能を計測し、ベースラインと比較")
+    benchmark.add_arguments(bench_parser)
+    bench_parser.set_defaults(handler=benchmark.run_from_args)
+
+    args = parser.parse_args(argv)
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,325 @@
+import argparse
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+from typing import Callable
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+import pandas as pd  # noqa: E402
+
+from scripts.benchmark_data import generate_dataset  # noqa: E402
+from service.surgery_comparator import compare_surgery_data  # noqa: E402
+from service.surgery_error_extractor import surgery_error_extractor  # noqa: E402
+from service.surgery_schedule_processor import process_surgery_schedule  # noqa: E402
+from service.surgery_search_processor import process_eye_surgery_data  # noqa: E402
+
+BENCHMARK_SIZES = (1_000, 10_000, 100_000)
+DEFAULT_TIME_THRESHOLD = 0.20
+DEFAULT_MEMORY_THRESHOLD = 0.20
+# 計測誤差で小さい処理が回帰と判定されないよう、これ未満の差は無視する
+MIN_TIME_DELTA_SECONDS = 0.05
+MIN_MEMORY_DELTA_MB = 1.0
+STAGES = (
+    'process_surgery_schedule',
+    'process_eye_surgery_data',
+    'compare_surgery_data',
+    'surgery_error_extractor',
+    'end_to_end',
+)
+
+
+def _build_paths(dataset: dict, work_dir: Path) -> dict:
+    """データセットのパスに中間ファイル・出力先のパスを追加"""
+    paths = dict(dataset)
+    paths.update({
+        'processed_surgery_schedule': str(work_dir / 'processed_surgery_schedule.csv'),
+        'processed_surgery_search_data': str(work_dir / 'processed_surgery_search.csv'),
+        'comparison_result': str(work_dir / 'comparison_result.csv'),
+        'output_path': str(work_dir / 'output'),
+    })
+    return paths
+
+
+def _stage_functions(paths: dict) -> dict[str, Callable[[], object]]:
+    """各ステージを引数なしで呼び出せる関数の辞書を作成"""
+    def schedule() -> None:
+        process_surgery_schedule(paths['surgery_schedule'], paths['processed_surgery_schedule'])
+
+    def search() -> None:
+        process_eye_surgery_data(paths['surgery_search_data'], paths['processed_surgery_search_data'])
+
+    def compare() -> None:
+        compare_surgery_data(
+            paths['processed_surgery_search_data'],
+            paths['processed_surgery_schedule'],
+            paths['comparison_result']
+        )
+
+    def extract() -> str:
+        return surgery_error_extractor(paths['comparison_result'], paths['output_path'], paths['template_path'])
+
+    def end_to_end() -> None:
+        schedule()
+        search()
+        compare()
+        extract()
+
+    return {
+        'process_surgery_schedule': schedule,
+        'process_eye_surgery_data': search,
+        'compare_surgery_data': compare,
+        'surgery_error_extractor': extract,
+        'end_to_end': end_to_end,
+    }
+
+
+def measure(func: Callable[[], object], repeat: int) -> dict:
+    """
+    関数の実行時間とピークメモリを計測
+
+    実行時間はtracemallocを無効にした状態でrepeat回計測し、
+    ピークメモリはtracemallocを有効にした別の1回で計測する。
+    """
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'times': [round(t, 6) for t in times],
+        'median_seconds': round(statistics.median(times), 6),
+        'peak_memory_mb': round(peak / (1024 * 1024), 3),
+    }
+
+
+def run_benchmarks(
+        sizes: list[int],
+        repeat: int = 3,
+        work_dir: str | None = None,
+        stages: list[str] | None = None
+) -> dict:
+    """
+    各サイズのデータセットを生成して全ステージを計測
+
+    Args:
+        sizes: データセットの行数リスト
+        repeat: 1ステージあたりの計測回数
+        work_dir: データセット・中間ファイルの作成先（Noneなら一時ディレクトリ）
+        stages: 計測するステージ名（Noneなら全ステージ）
+
+    Returns:
+        {'meta': {...}, 'results': {行数: {ステージ名: 計測結果}}}
+    """
+    base_dir = Path(work_dir or tempfile.mkdtemp(prefix='ophchecker_bench_'))
+    target_stages = stages or list(STAGES)
+    results: dict[str, dict] = {}
+
+    for rows in sizes:
+        dataset = generate_dataset(str(base_dir), rows)
+        paths = _build_paths(dataset, base_dir / f'rows_{rows}')
+        stage_functions = _stage_functions(paths)
+
+        # 後続ステージの入力を用意するために一度すべて実行しておく
+        stage_functions['end_to_end']()
+
+        results[str(rows)] = {}
+        for stage in target_stages:
+            results[str(rows)][stage] = measure(stage_functions[stage], repeat)
+            print(f"{rows:>9}行 {stage:<26} 中央値={results[str(rows)][stage]['median_seconds']:.3f}秒 "
+                  f"ピーク={results[str(rows)][stage]['peak_memory_mb']:.1f}MB")
+
+    return {'meta': _collect_metadata(repeat), 'results': results}
+
+
+def _collect_metadata(repeat: int) -> dict:
+    """比較用に実行環境とコミットを記録"""
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=PROJECT_ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = ''
+
+    return {
+        'commit': commit,
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'architecture': platform.architecture()[0],
+        'pandas': pd.__version__,
+        'repeat': repeat,
+    }
+
+
+def save_results(results: dict, output_file: str) -> None:
+    with open(output_file, 'w', encoding='utf-8') as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+    print(f"ベンチマーク結果を '{output_file}' に保存しました")
+
+
+def load_results(input_file: str) -> dict:
+    with open(input_file, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _relative_delta(current: float, baseline: float) -> float:
+    if baseline <= 0:
+        return 0.0
+    return (current - baseline) / baseline
+
+
+def compare_results(
+        current: dict,
+        baseline: dict,
+        time_threshold: float = DEFAULT_TIME_THRESHOLD,
+        memory_threshold: float = DEFAULT_MEMORY_THRESHOLD
+) -> list[dict]:
+    """
+    計測結果をベースラインと比較
+
+    両方に存在する（行数, ステージ）の組について、実行時間の中央値とピークメモリの
+    増加率を求め、閾値を超えたものを回帰として判定する。
+
+    Args:
+        current: 今回の計測結果
+        baseline: ベースラインの計測結果
+        time_threshold: 実行時間の許容増加率（0.2なら20%）
+        memory_threshold: ピークメモリの許容増加率
+
+    Returns:
+        行数・ステージごとの比較結果のリスト
+    """
+    comparisons = []
+    for rows, stages in current['results'].items():
+        baseline_stages = baseline['results'].get(rows, {})
+        for stage, result in stages.items():
+            if stage not in baseline_stages:
+                continue
+            base = baseline_stages[stage]
+
+            time_delta = _relative_delta(result['median_seconds'], base['median_seconds'])
+            memory_delta = _relative_delta(result['peak_memory_mb'], base['peak_memory_mb'])
+            time_regressed = (
+                time_delta > time_threshold
+                and result['median_seconds'] - base['median_seconds'] >= MIN_TIME_DELTA_SECONDS
+            )
+            memory_regressed = (
+                memory_delta > memory_threshold
+                and result['peak_memory_mb'] - base['peak_memory_mb'] >= MIN_MEMORY_DELTA_MB
+            )
+
+            comparisons.append({
+                'rows': int(rows),
+                'stage': stage,
+                'baseline_seconds': base['median_seconds'],
+                'current_seconds': result['median_seconds'],
+                'time_delta': time_delta,
+                'baseline_memory_mb': base['peak_memory_mb'],
+                'current_memory_mb': result['peak_memory_mb'],
+                'memory_delta': memory_delta,
+                'regressed': time_regressed or memory_regressed,
+            })
+
+    return comparisons
+
+
+def format_comparison_table(comparisons: list[dict]) -> str:
+    """比較結果をステージごとの差分表に整形"""
+    header = (f"{'行数':>9} {'ステージ':<26} {'基準(秒)':>9} {'今回(秒)':>9} {'差分':>8} "
+              f"{'基準(MB)':>9} {'今回(MB)':>9} {'差分':>8}  判定")
+    lines = [header, '-' * len(header)]
+    for c in comparisons:
+        lines.append(
+            f"{c['rows']:>9} {c['stage']:<26} {c['baseline_seconds']:>9.3f} {c['current_seconds']:>9.3f} "
+            f"{c['time_delta']:>+8.1%} {c['baseline_memory_mb']:>9.1f} {c['current_memory_mb']:>9.1f} "
+            f"{c['memory_delta']:>+8.1%}  {'回帰' if c['regressed'] else 'OK'}"
+        )
+    return '\n'.join(lines)
+
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    """ベンチマークのコマンドライン引数を追加"""
+    parser.add_argument(
+        "--sizes",
+        type=int,
+        nargs="+",
+        help="計測する行数 (デフォルト: ベースラインの行数、無い場合は 1000 10000 100000)"
+    )
+    parser.add_argument("--repeat", type=int, default=3, help="1ステージあたりの計測回数 (デフォルト: 3)")
+    parser.add_argument("--stages", nargs="+", choices=STAGES, help="計測するステージ (デフォルト: すべて)")
+    parser.add_argument("--work-dir", help="データセットの作成先 (デフォルト: 一時ディレクトリ)")
+    parser.add_argument("-o", "--output", default="benchmark_results.json", help="結果JSONの出力先")
+    parser.add_argument("--compare", metavar="BASELINE", help="比較対象のベースラインJSON")
+    parser.add_argument(
+        "--time-threshold",
+        type=float,
+        default=DEFAULT_TIME_THRESHOLD,
+        help="実行時間の中央値の許容増加率 (デフォルト: 0.2)"
+    )
+    parser.add_argument(
+        "--memory-threshold",
+        type=float,
+        default=DEFAULT_MEMORY_THRESHOLD,
+        help="ピークメモリの許容増加率 (デフォルト: 0.2)"
+    )
+
+
+def run_from_args(args: argparse.Namespace) -> int:
+    """
+    引数に従ってベンチマークを実行し、ベースライン比較で回帰があれば1を返す
+    """
+    # 計測対象の処理が出力するログで結果表示が埋もれないようにする
+    logging.basicConfig(level=logging.ERROR)
+
+    baseline = load_results(args.compare) if args.compare else None
+    sizes = args.sizes
+    if not sizes:
+        sizes = [int(rows) for rows in baseline['results']] if baseline else list(BENCHMARK_SIZES)
+
+    results = run_benchmarks(sizes, args.repeat, args.work_dir, args.stages)
+    save_results(results, args.output)
+
+    if baseline is None:
+        return 0
+
+    comparisons = compare_results(results, baseline, args.time_threshold, args.memory_threshold)
+    print(f"\nベースライン: {args.compare} (commit {baseline['meta'].get('commit', '')})")
+    print(format_comparison_table(comparisons))
+
+    regressions = [c for c in comparisons if c['regressed']]
+    if regressions:
+        print(f"\n{len(regressions)}件のステージで性能の回帰を検出しました")
+        return 1
+
+    print("\n性能の回帰はありませんでした")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="サービス層の各ステージの処理時間とメモリを計測するスクリプト")
+    add_arguments(parser)
+    sys.exit(run_from_args(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,227 @@
+import argparse
+import importlib.util
+import os
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from openpyxl import Workbook
+
+DATASET_SIZES = (1_000, 10_000, 100_000, 1_000_000)
+XLS_MAX_ROWS = 65_534
+
+SEARCH_COLUMNS = [
+    '手術日', '患者ID', '氏名', '年齢', '性別', '手術', '医師',
+    '麻酔', '病名', '入外', '右', '左', '術前', '備考'
+]
+SCHEDULE_COLUMNS = ['日付', 'ID', '氏名', '入外', '術式', '麻酔', '術者']
+TEMPLATE_COLUMNS = [
+    '手術日', '患者ID', '氏名', '入外', '術眼', '手術', '医師', '麻酔', '術前',
+    '入外', '術眼', '手術', '医師', '麻酔'
+]
+
+SURGERIES = ['PEA+IOL', '硝子体手術', '緑内障手術', '翼状片切除', '眼瞼下垂手術', 'ﾄﾗﾍﾞｸﾚｸﾄﾐｰ']
+LENS_SUFFIXES = ['', '', '', '(トーリック)', '(クラレオンパンオプティクス)', '(ビビティ)', '(inject)']
+SURGEONS = {'橋本義弘': '橋本', '植田芳樹': '植田', '増子杏': '増子', '田中伸弥': '田中', '渡辺裕士': '渡辺'}
+ANESTHESIA = {'球後麻酔': '局所', '点眼麻酔': '局所', 'テノン嚢下麻酔': '局所', '全身麻酔': '全身'}
+INPATIENT = {'あやめ': '入院', 'わかば': '入院', 'さくら': '入院', '外来': '外来'}
+DISEASES = ['白内障', '緑内障', '網膜剥離', '黄斑円孔', '翼状片']
+EXCLUSION_MARKERS = ['★', '霰粒腫', '術式未定']
+
+
+def generate_search_data(rows: int, seed: int = 0, exclusion_rate: float = 0.02) -> pd.DataFrame:
+    """
+    眼科システム手術検索エクスポートと同じ列構成の合成データを生成
+
+    同一患者の同日両眼手術（重複行）、レンズ名の接尾辞、置換元の医師名・麻酔名、
+    除外キーワードを含む行を一定割合で含める。
+
+    Args:
+        rows: 生成する行数
+        seed: 乱数シード
+        exclusion_rate: 除外キーワードを含む行の割合
+
+    Returns:
+        生成したDataFrame（手術日は元データと同じyy/mm/dd形式）
+    """
+    rng = np.random.default_rng(seed)
+
+    dates = pd.Timestamp('2025-01-06') + pd.to_timedelta(rng.integers(0, 365, rows), unit='D')
+    patient_ids = rng.integers(1_000_000, 9_999_999, rows)
+
+    # 約10%の行を直前の行と同じ患者・同日の反対眼として重複させる
+    duplicate = rng.random(rows) < 0.10
+    duplicate[0] = False
+    source_index = np.where(duplicate, np.arange(rows) - 1, np.arange(rows))
+    dates = dates[source_index]
+    patient_ids = patient_ids[source_index]
+
+    eye = rng.choice(['R', 'L', 'B'], rows, p=[0.45, 0.45, 0.10])
+    eye = np.where(duplicate, np.where(eye[source_index] == 'R', 'L', 'R'), eye)
+
+    surgery = rng.choice(SURGERIES, rows).astype(object) + rng.choice(LENS_SUFFIXES, rows).astype(object)
+    names = np.char.add('患者', (patient_ids % 100_000).astype(str)).astype(object)
+
+    excluded = rng.random(rows) < exclusion_rate
+    markers = rng.choice(EXCLUSION_MARKERS, rows)
+    names = np.where(excluded & (markers == '★'), '★' + names, names)
+    surgery = np.where(excluded & (markers != '★'), markers, surgery)
+
+    return pd.DataFrame({
+        '手術日': dates.strftime('%y/%m/%d'),
+        '患者ID': patient_ids,
+        '氏名': names,
+        '年齢': rng.integers(20, 95, rows),
+        '性別': rng.choice(['男', '女'], rows),
+        '手術': surgery,
+        '医師': rng.choice(list(SURGEONS), rows),
+        '麻酔': rng.choice(list(ANESTHESIA), rows, p=[0.4, 0.3, 0.2, 0.1]),
+        '病名': rng.choice(DISEASES, rows),
+        '入外': rng.choice(list(INPATIENT), rows),
+        '右': np.where(np.isin(eye, ['R', 'B']), '○', ''),
+        '左': np.where(np.isin(eye, ['L', 'B']), '○', ''),
+        '術前': rng.choice(['', '血液検査', '心電図'], rows),
+        '備考': '',
+    }, columns=SEARCH_COLUMNS)
+
+
+def generate_schedule_data(
+        search_data: pd.DataFrame,
+        seed: int = 0,
+        mismatch_rate: float = 0.05,
+        missing_rate: float = 0.03
+) -> pd.DataFrame:
+    """
+    検索データに対応する手術予定表の合成データを生成
+
+    一部の行を不一致（術者・麻酔・術眼）、欠落（予定表に無い患者）、患者ID未入力にする。
+
+    Args:
+        search_data: generate_search_dataで生成した検索データ
+        seed: 乱数シード
+        mismatch_rate: 値を変更する行の割合
+        missing_rate: 予定表から欠落させる行・IDを空にする行の割合
+
+    Returns:
+        予定表シートと同じ列構成のDataFrame
+    """
+    rng = np.random.default_rng(seed + 1)
+    rows = len(search_data)
+
+    eye = np.where(
+        (search_data['右'] == '○') & (search_data['左'] == '○'), 'B',
+        np.where(search_data['右'] == '○', 'R', 'L')
+    )
+    surgery = search_data['手術'].str.replace(r'\(.*\)$', '', regex=True)
+    surgeon = search_data['医師'].map(SURGEONS)
+    anesthesia = search_data['麻酔'].map(ANESTHESIA)
+    inpatient = search_data['入外'].map(INPATIENT)
+
+    mismatch = rng.random(rows) < mismatch_rate
+    surgeon = surgeon.where(~mismatch, rng.choice(list(SURGEONS.values()), rows))
+    anesthesia = anesthesia.where(~(mismatch & (rng.random(rows) < 0.5)), '全身')
+
+    schedule = pd.DataFrame({
+        '日付': pd.to_datetime(search_data['手術日'], format='%y/%m/%d'),
+        'ID': search_data['患者ID'].astype('float64'),
+        '氏名': search_data['氏名'],
+        '入外': inpatient,
+        '術式': pd.Series(eye, index=search_data.index) + ')' + surgery,
+        '麻酔': anesthesia,
+        '術者': surgeon,
+    }, columns=SCHEDULE_COLUMNS)
+
+    schedule.loc[rng.random(rows) < missing_rate, 'ID'] = np.nan
+    schedule = schedule[rng.random(rows) >= missing_rate]
+
+    return schedule.reset_index(drop=True)
+
+
+def write_search_data(df: pd.DataFrame, path: str) -> None:
+    """検索データをcp932のCSVとして出力"""
+    df.to_csv(path, index=False, encoding='cp932')
+
+
+def write_schedule_data(df: pd.DataFrame, path: str, sheet_name: str = '南館2') -> None:
+    """
+    手術予定表をExcel形式で出力（1行目はタイトル行、2行目がヘッダー）
+
+    拡張子が.xlsの場合はxlwtが必要で、行数はxls形式の上限までに限られる。
+    """
+    if path.endswith('.xls'):
+        if importlib.util.find_spec('xlwt') is None:
+            raise RuntimeError("xls形式の出力にはxlwtが必要です")
+        if len(df) > XLS_MAX_ROWS:
+            raise ValueError(f"xls形式で出力できる行数は{XLS_MAX_ROWS}行までです: {len(df)}行")
+        engine = 'xlwt'
+    else:
+        engine = 'openpyxl'
+
+    with pd.ExcelWriter(path, engine=engine) as writer:
+        pd.DataFrame([['手術予定表']]).to_excel(writer, sheet_name=sheet_name, header=False, index=False)
+        df.to_excel(writer, sheet_name=sheet_name, startrow=1, index=False)
+
+
+def write_template(path: str) -> None:
+    """眼科手術指示確認テンプレートと同じヘッダーを持つブックを出力"""
+    wb = Workbook()
+    ws = wb.active
+    if ws is not None:
+        ws.append(TEMPLATE_COLUMNS)
+        ws.cell(row=2, column=1).number_format = 'yyyy/mm/dd'
+    wb.save(path)
+
+
+def generate_dataset(
+        output_dir: str,
+        rows: int,
+        seed: int = 0,
+        schedule_format: str = 'xlsx',
+        exclusion_rate: float = 0.02
+) -> dict:
+    """
+    指定行数のデータセット一式（検索データ・予定表・テンプレート）を生成
+
+    Returns:
+        生成したファイルのパス辞書
+    """
+    dataset_dir = Path(output_dir) / f'rows_{rows}'
+    dataset_dir.mkdir(parents=True, exist_ok=True)
+
+    paths = {
+        'surgery_search_data': str(dataset_dir / '眼科システム手術検索.csv'),
+        'surgery_schedule': str(dataset_dir / f'手術予定表.{schedule_format}'),
+        'template_path': str(dataset_dir / '眼科手術指示確認.xlsx'),
+    }
+
+    search_data = generate_search_data(rows, seed=seed, exclusion_rate=exclusion_rate)
+    write_search_data(search_data, paths['surgery_search_data'])
+    write_schedule_data(generate_schedule_data(search_data, seed=seed), paths['surgery_schedule'])
+    write_template(paths['template_path'])
+
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ベンチマーク用の合成データセットを生成するスクリプト")
+    parser.add_argument("output_dir", help="出力先ディレクトリ")
+    parser.add_argument(
+        "--sizes",
+        type=int,
+        nargs="+",
+        default=list(DATASET_SIZES),
+        help="生成する行数 (デフォルト: 1000 10000 100000 1000000)"
+    )
+    parser.add_argument("--seed", type=int, default=0, help="乱数シード")
+    parser.add_argument("--schedule-format", choices=["xlsx", "xls"], default="xlsx", help="手術予定表の形式")
+    parser.add_argument("--exclusion-rate", type=float, default=0.02, help="除外キーワードを含む行の割合")
+
+    args = parser.parse_args()
+
+    for rows in args.sizes:
+        paths = generate_dataset(args.output_dir, rows, args.seed, args.schedule_format, args.exclusion_rate)
+        print(f"{rows}行のデータセットを生成しました: {os.path.dirname(paths['surgery_search_data'])}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+import argparse
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+import pandas as pd  # noqa: E402
+from openpyxl import load_workbook  # noqa: E402
+from openpyxl.styles import Font, PatternFill  # noqa: E402
+from openpyxl.worksheet.datavalidation import DataValidation  # noqa: E402
+
+from scripts.benchmark import measure  # noqa: E402
+from scripts.benchmark_data import write_template  # noqa: E402
+from service.report_template import load_template_skeleton  # noqa: E402
+from service.report_writers import iter_report_rows, write_xlsx, write_xlsx_streaming  # noqa: E402
+
+OUTPUT_COLUMNS = [
+    '手術日', '患者ID', '氏名', '入外', '術眼', '手術', '医師', '麻酔', '術前',
+    '入外_比較', '術眼_比較', '手術_比較', '医師_比較', '麻酔_比較'
+]
+
+
+def generate_mismatch_output(rows: int) -> pd.DataFrame:
+    """すべての行が不一致となる指示確認の出力データを生成"""
+    return pd.DataFrame({
+        '手術日': ['2024/01/15'] * rows,
+        '患者ID': range(10_000_000, 10_000_000 + rows),
+        '氏名': ['山田太郎'] * rows,
+        '入外': ['外来'] * rows,
+        '術眼': ['右'] * rows,
+        '手術': ['PEA+IOL'] * rows,
+        '医師': ['橋本'] * rows,
+        '麻酔': ['局所'] * rows,
+        '術前': [''] * rows,
+        '入外_比較': [False] * rows,
+        '術眼_比較': [False] * rows,
+        '手術_比較': [False] * rows,
+        '医師_比較': [False] * rows,
+        '麻酔_比較': ['未入力'] * rows,
+    }, columns=OUTPUT_COLUMNS)
+
+
+def write_styled_template(path: str, lookup_rows: int) -> None:
+    """書式・入力規則・印刷設定と参照用のシートを持つテンプレートを出力"""
+    write_template(path)
+    wb = load_workbook(path)
+    ws = wb.active
+    for cell in ws[1]:
+        cell.font = Font(bold=True)
+        cell.fill = PatternFill(start_color='FFFF00', end_color='FFFF00', fill_type='solid')
+    for letter in 'ABCDEFGHIJKLMN':
+        ws.column_dimensions[letter].width = 14
+    ws.freeze_panes = 'A2'
+    ws.auto_filter.ref = 'A1:N1'
+    validation = DataValidation(type='list', formula1='"外来,入院"')
+    validation.add('D2:D1048576')
+    ws.add_data_validation(validation)
+    ws.print_title_rows = '1:1'
+
+    lookup = wb.create_sheet('医師一覧')
+    for index in range(lookup_rows):
+        lookup.append([f'医師{index}', f'イシ{index}', '眼科'])
+        lookup.cell(row=index + 1, column=1).font = Font(bold=True)
+    wb.save(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="指示確認ファイルの通常モードと書き込み専用モードの出力を比較するスクリプト")
+    parser.add_argument("--rows", type=int, default=100_000, help="出力する行数 (デフォルト: 100000)")
+    parser.add_argument("--repeat", type=int, default=1, help="計測回数")
+    parser.add_argument("--lookup-rows", type=int, default=500, help="テンプレートの参照用シートの行数 (デフォルト: 500)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix='ophchecker_bench_') as work_dir:
+        template_path = str(Path(work_dir) / 'template.xlsx')
+        write_template(template_path)
+        skeleton = load_template_skeleton(template_path)
+        df_output = generate_mismatch_output(args.rows)
+
+        writers = {
+            'write_xlsx': write_xlsx,
+            'write_xlsx_streaming': write_xlsx_streaming,
+        }
+        for name, writer in writers.items():
+            output_filepath = str(Path(work_dir) / f'{name}.xlsx')
+            result = measure(lambda: writer(skeleton, iter_report_rows(df_output), output_filepath), args.repeat)
+            print(f"{args.rows:>9}行 {name:<22} 中央値={result['median_seconds']:.3f}秒 "
+                  f"ピーク={result['peak_memory_mb']:.1f}MB")
+
+        # 通常モードのブックの作成（テンプレートを毎回解析する方式と、キャッシュした骨格から作成する方式）
+        styled_template_path = str(Path(work_dir) / 'styled_template.xlsx')
+        write_styled_template(styled_template_path, args.lookup_rows)
+        styled_skeleton = load_template_skeleton(styled_template_path)
+        creators = {
+            'テンプレートを解析': lambda: load_workbook(styled_template_path),
+            '骨格から作成': styled_skeleton.create_workbook,
+        }
+        for name, creator in creators.items():
+            result = measure(creator, max(args.repeat, 20))
+            print(f"ブックの作成 {name:<12} 中央値={result['median_seconds'] * 1000:.1f}ミリ秒 "
+                  f"ピーク={result['peak_memory_mb']:.1f}MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+import argparse
+import os
+import sys
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+
+from scripts.benchmark import measure  # noqa: E402
+from scripts.benchmark_data import generate_schedule_data, generate_search_data  # noqa: E402
+from service.surgery_schedule_processor import split_surgery_field  # noqa: E402
+
+
+def build_surgery_series(rows: int, unparsable_rate: float, seed: int = 0) -> pd.Series:
+    """合成した予定表の術式列（一部の行は閉じ括弧を除いて分割できない術式にする）"""
+    surgery = generate_schedule_data(generate_search_data(rows, seed=seed), seed=seed)['術式']
+    unparsable = np.random.default_rng(seed + 2).random(len(surgery)) < unparsable_rate
+    return surgery.where(~unparsable, surgery.str.replace(')', '', n=1, regex=False))
+
+
+def split_by_delimiter(surgery: pd.Series) -> pd.DataFrame:
+    """変更前の分割（閉じ括弧で分割し、手術の前後の空白を除く）"""
+    parts = surgery.str.split(')', n=1, expand=True)
+    parts.columns = ['術眼', '手術']
+    parts['手術'] = parts['手術'].str.strip()
+    return parts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="手術予定表の術式の分割（閉じ括弧での分割と正規表現での抽出）を比較するスクリプト")
+    parser.add_argument("--rows", type=int, default=100_000, help="検索データの行数 (デフォルト: 100000)")
+    parser.add_argument("--unparsable-rate", type=float, default=0.01, help="閉じ括弧の無い術式の割合 (デフォルト: 0.01)")
+    parser.add_argument("--repeat", type=int, default=3, help="計測回数")
+    args = parser.parse_args()
+
+    surgery = build_surgery_series(args.rows, args.unparsable_rate)
+
+    # 分割できる行は変更前と同じ術眼・手術になる
+    parts, unparsed = split_surgery_field(surgery)
+    pd.testing.assert_frame_equal(parts[~unparsed], split_by_delimiter(surgery)[~unparsed])
+    print(f"分割できない術式: {int(unparsed.sum())}件 / {len(surgery)}件")
+
+    for name, runner in (('閉じ括弧で分割', split_by_delimiter), ('正規表現で抽出', split_surgery_field)):
+        result = measure(lambda: runner(surgery), args.repeat)
+        print(f"{len(surgery):>9}行 {name:<10} "
+              f"中央値={result['median_seconds']:.3f}秒 ピーク={result['peak_memory_mb']:.1f}MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+import argparse
+import os
+import sys
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+import pandas as pd  # noqa: E402
+
+from scripts.benchmark import measure  # noqa: E402
+from scripts.benchmark_data import (  # noqa: E402
+    ANESTHESIA,
+    EXCLUSION_MARKERS,
+    INPATIENT,
+    LENS_SUFFIXES,
+    SURGEONS,
+    generate_search_data,
+)
+from service.normalization import NormalizationRules  # noqa: E402
+from service.replacement_engine import compile_replacements  # noqa: E402
+from service.surgery_search_processor import REQUIRED_COLUMNS, search_steps  # noqa: E402
+from utils.step_plan import order_steps, run_steps  # noqa: E402
+
+
+def build_benchmark_rules() -> NormalizationRules:
+    """合成データの置換元・接尾辞・除外キーワードに対応する正規化のルール"""
+    return NormalizationRules(
+        replacements=compile_replacements({'麻酔': ANESTHESIA, '医師': SURGEONS, '入外': INPATIENT}),
+        surgery_strings_to_remove=tuple(suffix for suffix in LENS_SUFFIXES if suffix),
+        exclusion_keywords=tuple(EXCLUSION_MARKERS),
+    )
+
+
+def run_in_declared_order(df: pd.DataFrame, rules: NormalizationRules) -> pd.DataFrame:
+    """除外キーワードによる行削除を移動せず、宣言順に処理"""
+    return run_steps(df[REQUIRED_COLUMNS].copy(), search_steps(rules))
+
+
+def run_in_cost_order(df: pd.DataFrame, rules: NormalizationRules) -> pd.DataFrame:
+    """除外キーワードによる行削除を依存関係が許す範囲で先に実行"""
+    return run_steps(df[REQUIRED_COLUMNS].copy(), order_steps(search_steps(rules)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="手術検索データの処理順（宣言順と行削除を先に実行する順）を比較するスクリプト")
+    parser.add_argument("--rows", type=int, default=100_000, help="検索データの行数 (デフォルト: 100000)")
+    parser.add_argument("--exclusion-rate", type=float, default=0.5, help="除外キーワードを含む行の割合 (デフォルト: 0.5)")
+    parser.add_argument("--repeat", type=int, default=3, help="計測回数")
+    args = parser.parse_args()
+
+    df = generate_search_data(args.rows, exclusion_rate=args.exclusion_rate)
+    rules = build_benchmark_rules()
+
+    print("処理順: " + " → ".join(step.name for step in order_steps(search_steps(rules))))
+    pd.testing.assert_frame_equal(run_in_cost_order(df, rules), run_in_declared_order(df, rules))
+
+    for name, runner in (('宣言順', run_in_declared_order), ('行削除を先に実行', run_in_cost_order)):
+        result = measure(lambda: runner(df, rules), args.repeat)
+        print(f"{args.rows:>9}行 除外{args.exclusion_rate:.0%} {name:<10} "
+              f"中央値={result['median_seconds']:.3f}秒 ピーク={result['peak_memory_mb']:.1f}MB")
+
+
+if __name__ == "__main__":
+    main()
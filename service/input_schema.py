@@ -0,0 +1,82 @@
+import difflib
+from dataclasses import dataclass
+from typing import Sequence
+
+import pandas as pd
+
+# エラーメッセージに列挙する想定外の列の最大数
+MAX_LISTED_UNKNOWN_COLUMNS = 20
+
+
+class SchemaValidationError(ValueError):
+    """入力ファイルの列構成・文字コードが宣言したスキーマと異なる場合の例外"""
+
+
+@dataclass(frozen=True)
+class InputSchema:
+    """
+    入力ファイルに必要な列の宣言
+
+    必要な列以外の列があっても構わない。不足している列がある場合は、
+    不足している列と想定外の列（名前が変わった列の候補）をメッセージに含めた例外を送出する。
+    """
+    name: str
+    required_columns: tuple[str, ...]
+
+    def validate(self, columns: Sequence[str], source: str) -> None:
+        """
+        見出しの列に必要な列がすべて含まれているか確認
+
+        Args:
+            columns: 入力ファイルの見出しの列名
+            source: メッセージに表示する入力ファイル（シート）の名前
+
+        Raises:
+            SchemaValidationError: 必要な列が不足している場合
+        """
+        present = [str(column) for column in columns]
+        missing = [column for column in self.required_columns if column not in present]
+        if not missing:
+            return
+
+        unknown = [column for column in present if column not in self.required_columns]
+        lines = [f"{self.name}に必要な列がありません: {source}"]
+        for column in missing:
+            candidates = difflib.get_close_matches(column, unknown, n=3, cutoff=0.5)
+            hint = f"（候補: {', '.join(f'「{candidate}」' for candidate in candidates)}）" if candidates else ''
+            lines.append(f"  不足: 「{column}」{hint}")
+        if unknown:
+            listed = ', '.join(f'「{column}」' for column in unknown[:MAX_LISTED_UNKNOWN_COLUMNS])
+            if len(unknown) > MAX_LISTED_UNKNOWN_COLUMNS:
+                listed += f" ほか{len(unknown) - MAX_LISTED_UNKNOWN_COLUMNS}列"
+            lines.append(f"  想定外の列: {listed}")
+        raise SchemaValidationError('\n'.join(lines))
+
+
+def read_csv_header(csv_path: str, name: str, encoding: str = 'cp932') -> list[str]:
+    """
+    CSVファイルの見出し行だけを読み込む
+
+    Raises:
+        SchemaValidationError: 指定した文字コードで読み込めない場合、または見出し行が無い場合
+    """
+    try:
+        return list(pd.read_csv(csv_path, encoding=encoding, nrows=0).columns)
+    except UnicodeDecodeError as e:
+        raise SchemaValidationError(f"{name}の文字コードが{encoding}ではありません: {csv_path}: {str(e)}") from e
+    except pd.errors.EmptyDataError as e:
+        raise SchemaValidationError(f"{name}に見出し行がありません: {csv_path}") from e
+
+
+def read_xls_sheet_header(sheet, header: int) -> list[str]:
+    """xlrdのシートから見出し行（0始まり）のセルの値だけを読み込む（空のセルは除く）"""
+    if sheet.nrows <= header:
+        return []
+    return [str(value) for value in sheet.row_values(header) if value != '']
+
+
+def read_worksheet_header(worksheet, header: int) -> list[str]:
+    """openpyxlの読み取り専用のシートから見出し行（0始まり）のセルだけを読み込む（空のセルは除く）"""
+    for row in worksheet.iter_rows(min_row=header + 1, max_row=header + 1, values_only=True):
+        return [str(value) for value in row if value is not None]
+    return []
@@ -0,0 +1,119 @@
+import re
+import unicodedata
+from dataclasses import dataclass, field
+from typing import Any, Sequence
+
+import numpy as np
+import pandas as pd
+
+from service.replacement_engine import ReplacementEngine, map_unique_values
+from utils.step_plan import Step, order_steps, run_steps
+
+# 除外キーワードを含むか判定する列
+EXCLUSION_COLUMNS = ('氏名', '手術')
+
+
+@dataclass(frozen=True)
+class NormalizationRules:
+    """
+    手術検索データと手術予定表に共通して適用する正規化のルール
+
+    置換ルール・手術から削除する文字列・除外キーワードを保持する。作成後は変更しない。
+    """
+    replacements: ReplacementEngine = field(default_factory=ReplacementEngine)
+    surgery_strings_to_remove: tuple[str, ...] = ()
+    exclusion_keywords: tuple[str, ...] = ()
+
+    @property
+    def exclusion_pattern(self) -> re.Pattern | None:
+        """除外キーワードのいずれかを含む値に一致する正規表現（キーワードは正規表現として扱う）"""
+        if not self.exclusion_keywords:
+            return None
+        return re.compile('|'.join(f'(?:{keyword})' for keyword in self.exclusion_keywords))
+
+    def remove_surgery_strings(self, value: Any) -> Any:
+        """手術名から削除する文字列を取り除く（文字列以外の値はそのまま）"""
+        if not isinstance(value, str):
+            return value
+        for string in self.surgery_strings_to_remove:
+            value = value.replace(string, '')
+        return value
+
+
+def _normalize_text(value: Any) -> Any:
+    return unicodedata.normalize('NFKC', value) if isinstance(value, str) else value
+
+
+def apply_replacements(df: pd.DataFrame, rules: NormalizationRules) -> pd.DataFrame:
+    """麻酔・医師・入外の値を置換"""
+    return rules.replacements.apply(df)
+
+
+def remove_surgery_strings(df: pd.DataFrame, rules: NormalizationRules) -> pd.DataFrame:
+    """手術列から削除する文字列を取り除く（一意な値ごとに一度だけ処理）"""
+    if rules.surgery_strings_to_remove:
+        df['手術'] = map_unique_values(df['手術'], rules.remove_surgery_strings)
+    return df
+
+
+def filter_exclusion_keywords(
+        df: pd.DataFrame,
+        rules: NormalizationRules,
+        columns: Sequence[str] = EXCLUSION_COLUMNS
+) -> pd.DataFrame:
+    """氏名列または手術列に除外キーワードを含む行を削除（一意な値ごとに一度だけ判定）"""
+    pattern = rules.exclusion_pattern
+    if pattern is None:
+        return df
+
+    excluded = np.zeros(len(df), dtype=bool)
+    for column in columns:
+        if column in df.columns:
+            codes, uniques = pd.factorize(df[column])
+            matched = [isinstance(value, str) and pattern.search(value) is not None for value in uniques]
+            # 欠損の行（コード-1）は末尾のFalseを参照する
+            excluded |= np.array([*matched, False], dtype=bool)[codes]
+    if not excluded.any():
+        return df
+    # 以降の処理で列を書き換えるため、元のDataFrameの一部としてではなく新しいDataFrameとして取り出す
+    return df.take(np.flatnonzero(~excluded))
+
+
+def normalize_surgery_text(df: pd.DataFrame) -> pd.DataFrame:
+    """手術列の値を全角カナに変換（一意な値ごとに一度だけ処理）"""
+    df['手術'] = map_unique_values(df['手術'], _normalize_text)
+    return df
+
+
+def normalization_steps(rules: NormalizationRules) -> list[Step]:
+    """
+    置換・手術の文字列削除・除外キーワードの行削除・手術の全角カナ変換の処理と、読み書きする列
+
+    除外キーワードの判定は列ごとの処理に分け、氏名の判定は手術の処理を待たずに実行できるようにする。
+    手術の判定は文字列を削除した後の手術名で行う。
+    """
+    replaced_columns = frozenset(rules.replacements.columns)
+    return [
+        Step('置換', lambda df: apply_replacements(df, rules), replaced_columns, replaced_columns),
+        Step('手術の文字列削除', lambda df: remove_surgery_strings(df, rules), frozenset({'手術'}), frozenset({'手術'})),
+        *(
+            Step(
+                f'除外キーワード（{column}）',
+                lambda df, column=column: filter_exclusion_keywords(df, rules, [column]),
+                frozenset({column}),
+                filters_rows=True
+            )
+            for column in EXCLUSION_COLUMNS
+        ),
+        Step('手術の全角カナ変換', normalize_surgery_text, frozenset({'手術'}), frozenset({'手術'})),
+    ]
+
+
+def normalize_frame(df: pd.DataFrame, rules: NormalizationRules) -> pd.DataFrame:
+    """
+    置換・手術の文字列削除・除外キーワードの行削除・手術の全角カナ変換を適用
+
+    手術検索データと手術予定表の両方の処理から呼び、同じルールで表記を揃える。
+    除外キーワードによる行削除は、列の依存関係が許す範囲で先に実行する。
+    """
+    return run_steps(df, order_steps(normalization_steps(rules)))
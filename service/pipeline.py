@@ -0,0 +1,312 @@
+import configparser
+import logging
+import os
+import sqlite3
+import time
+from typing import Any, Callable
+
+from service.report_writers import WriterResult
+from service.result_store import get_result_store_path, store_comparison_results
+from service.surgery_comparator import compare_surgery_data, get_schedule_only_path
+from service.surgery_equivalence import compile_equivalence_table
+from service.surgery_error_extractor import surgery_error_extractor
+from service.surgery_schedule_processor import (
+    get_parse_error_path,
+    process_surgery_schedule,
+    validate_surgery_schedule,
+)
+from service.surgery_search_processor import (
+    build_normalization_rules,
+    process_eye_surgery_data,
+    validate_search_data,
+)
+from service.surgery_similarity import SurgerySimilarity, get_similarity_cache_path
+from utils import config_manager
+from utils.config_manager import (
+    get_comparison_settings,
+    get_incremental_settings,
+    get_memory_settings,
+    get_profiling_settings,
+    get_report_settings,
+    get_result_store_settings,
+    get_schedule_settings,
+    get_snapshot_settings,
+    get_surgery_equivalence_settings,
+    get_surgery_similarity_settings,
+)
+from utils.input_snapshot import get_snapshot_directory, snapshot_inputs
+from utils.log_rotation import get_log_directory
+from utils.profiler import profiled
+from utils.run_state import compute_fingerprint, find_unchanged_output, get_run_state_path, save_run_state
+
+# (step_num, total_steps, step_name, func, *args, **kwargs) を受け取りfuncの戻り値を返す
+StepExecutor = Callable[..., Any]
+
+TOTAL_STEPS = 4
+SNAPSHOT_INPUT_KEYS = ('surgery_search_data', 'surgery_schedule')
+INCREMENTAL_CACHE_DIRECTORY = 'incremental_cache'
+
+
+def run_step(step_num: int, total_steps: int, step_name: str, func: Callable, *args: Any, **kwargs: Any) -> Any:
+    """処理ステップを実行してログに記録"""
+    logging.info(f"[{step_num}/{total_steps}] {step_name}を開始")
+    result = func(*args, **kwargs)
+    logging.info(f"{step_name}が完了しました")
+    return result
+
+
+def run_pipeline(
+        config: configparser.ConfigParser,
+        paths: dict,
+        execute_step: StepExecutor = run_step,
+        profile: bool | None = None,
+        on_writer_done: Callable[[WriterResult], None] | None = None,
+        force: bool = False,
+        on_unchanged: Callable[[str], None] | None = None,
+        on_unchanged_errors: Callable[[int], None] | None = None
+) -> str:
+    """
+    手術予定表・手術検索データの処理から眼科手術指示確認ファイルの作成までを実行
+
+    Args:
+        config: 設定ファイルオブジェクト
+        paths: get_pathsで取得したパス辞書
+        execute_step: 各ステップの実行関数（GUIのログ表示などに差し替える）
+        profile: Trueなら各ステップをcProfileで計測（Noneの場合は[Profiling]の設定に従う）
+        on_writer_done: 眼科手術指示確認ファイルの出力形式ごとの結果を受け取る関数
+        force: Trueなら入力ファイルと設定に変更が無くてもすべての処理を実行
+            （プロファイルを取得する場合も、変更の有無にかかわらずすべての処理を実行）
+        on_unchanged: 変更が無く処理を省略した場合に前回の出力ファイルのパスを受け取る関数
+        on_unchanged_errors: 差分出力で前回から変化の無い不一致・未入力だけがあり、ファイルを作成しなかった場合に
+            件数を受け取る関数
+
+    Returns:
+        生成された眼科手術指示確認ファイルのパス（不一致が無い場合は空文字）。
+        処理を省略した場合は前回の出力ファイルのパス
+
+    Raises:
+        SchemaValidationError: 入力ファイルの列構成・文字コードが想定と異なる場合（各ステップの実行前に送出）
+        OSError: 入力ファイルのスナップショットを作成できない場合（元ファイルと再試行回数をログに出力して送出）
+    """
+    state_path = get_run_state_path(get_log_directory(config))
+    fingerprint = compute_fingerprint(_run_inputs(config, paths), config)
+    if profile is None:
+        profile = get_profiling_settings(config)['enabled']
+
+    # プロファイルは処理を実行しないと取得できないため、プロファイルを取得する場合は省略しない
+    if not force and not profile:
+        previous_output = find_unchanged_output(
+            state_path, fingerprint, required_paths=[paths['processed_surgery_search_data']]
+        )
+        if previous_output is not None:
+            logging.info(f"前回の実行から入力ファイルと設定に変更が無いため、処理を省略しました: {previous_output or '出力なし'}")
+            if on_unchanged is not None:
+                on_unchanged(previous_output)
+            return previous_output
+
+    state_db_path = _report_state_path(config)
+
+    snapshot_settings = get_snapshot_settings(config)
+    if snapshot_settings['enabled']:
+        # ネットワーク上の入力ファイルをローカルにコピーし、以降の処理はコピーを読み込む
+        try:
+            stage_paths = snapshot_inputs(
+                paths,
+                SNAPSHOT_INPUT_KEYS,
+                get_snapshot_directory(snapshot_settings['cache_directory']),
+                retries=snapshot_settings['retries'],
+                backoff_seconds=snapshot_settings['backoff_seconds']
+            )
+        except OSError as e:
+            sources = ', '.join(paths[key] for key in SNAPSHOT_INPUT_KEYS)
+            logging.error(
+                f"入力ファイルのスナップショットを作成できませんでした（再試行 {snapshot_settings['retries']}回）: "
+                f"{sources}: {str(e)}"
+            )
+            raise
+    else:
+        stage_paths = paths
+
+    # 各ステップが読み込むファイル（スナップショットのコピー）の見出しを確認する
+    _validate_inputs(config, stage_paths)
+
+    instruction_file = _run_stages(
+        config, stage_paths, execute_step, profile, on_writer_done, on_unchanged_errors, state_db_path
+    )
+    save_run_state(state_path, fingerprint, instruction_file)
+    return instruction_file
+
+
+def _report_state_path(config: configparser.ConfigParser) -> str:
+    """
+    不一致・未入力の状態を保存する結果データベースのパス（[ResultStore]が無効の場合は空文字）
+
+    Raises:
+        ValueError: 差分出力を指定しているが、結果データベースが無効の場合
+    """
+    store_settings = get_result_store_settings(config)
+    if not store_settings['enabled']:
+        if get_report_settings(config)['report_mode'] == 'delta':
+            raise ValueError(
+                "差分出力（[Report] report_mode = delta）には前回の状態を保存する結果データベースが必要です。"
+                "[ResultStore] enabled = true にしてください"
+            )
+        return ''
+    return get_result_store_path(get_log_directory(config), store_settings['database_path'])
+
+
+def _validate_inputs(config: configparser.ConfigParser, paths: dict) -> None:
+    """見出し行だけを読み込み、入力ファイルの列構成を重い処理の前に確認"""
+    started = time.perf_counter()
+    validate_search_data(paths['surgery_search_data'])
+    schedule_settings = get_schedule_settings(config)
+    validate_surgery_schedule(
+        paths['surgery_schedule'],
+        sheet_name=schedule_settings['sheet_names'] or None,
+        sheet_pattern=schedule_settings['sheet_pattern']
+    )
+    logging.info(f"入力ファイルの列構成を確認しました（{(time.perf_counter() - started) * 1000:.0f}ミリ秒）")
+
+
+def _run_inputs(config: configparser.ConfigParser, paths: dict) -> dict[str, str]:
+    """処理結果に影響する入力ファイル（入力データ・ルールファイル・設定ファイル・テンプレート）"""
+    return {
+        'surgery_search_data': paths['surgery_search_data'],
+        'surgery_schedule': paths['surgery_schedule'],
+        'excludeitems_file': config.get('Paths', 'excludeitems_file', fallback=''),
+        'replacements_file': config.get('Paths', 'replacements_file', fallback=''),
+        'template_path': paths['template_path'],
+        'config': config_manager.CONFIG_PATH,
+    }
+
+
+def _store_results(config: configparser.ConfigParser, comparison_result: str) -> None:
+    """比較結果を結果データベースに保存（失敗しても処理は続行）"""
+    store_settings = get_result_store_settings(config)
+    if not store_settings['enabled']:
+        return
+
+    db_path = get_result_store_path(get_log_directory(config), store_settings['database_path'])
+    try:
+        store_comparison_results(db_path, comparison_result)
+    except (sqlite3.Error, OSError) as e:
+        logging.warning(f"比較結果を結果データベースに保存できませんでした: {db_path}: {str(e)}")
+
+
+def _run_stages(
+        config: configparser.ConfigParser,
+        paths: dict,
+        execute_step: StepExecutor,
+        profile: bool | None,
+        on_writer_done: Callable[[WriterResult], None] | None,
+        on_unchanged_errors: Callable[[int], None] | None,
+        state_db_path: str
+) -> str:
+    """4つの処理ステップを順に実行"""
+    profiling_settings = get_profiling_settings(config)
+    if profile is None:
+        profile = profiling_settings['enabled']
+
+    def stage(func: Callable, stage_name: str) -> Callable:
+        if not profile:
+            return func
+        return profiled(func, stage_name, get_log_directory(config), profiling_settings['top_n'])
+
+    schedule_settings = get_schedule_settings(config)
+    memory_settings = get_memory_settings(config)
+    low_memory = memory_settings['low_memory_mode']
+    memory_budget_mb = memory_settings['memory_budget_mb']
+
+    incremental_settings = get_incremental_settings(config)
+    if incremental_settings['enabled']:
+        incremental_cache_dir = incremental_settings['cache_directory'] or os.path.join(
+            get_log_directory(config), INCREMENTAL_CACHE_DIRECTORY
+        )
+    else:
+        incremental_cache_dir = ''
+
+    parse_error_result = get_parse_error_path(paths['processed_surgery_schedule'])
+
+    preprocessing_steps = [
+        (
+            1, "手術予定表の処理",
+            stage(process_surgery_schedule, 'surgery_schedule'),
+            (paths['surgery_schedule'], paths['processed_surgery_schedule']),
+            {
+                'sheet_name': schedule_settings['sheet_names'] or None,
+                'sheet_pattern': schedule_settings['sheet_pattern'],
+                'low_memory': low_memory,
+                'normalization': build_normalization_rules(config) if schedule_settings['normalize'] else None,
+                'parse_error_result': parse_error_result,
+            },
+        ),
+        (
+            2, "手術検索データの処理",
+            stage(process_eye_surgery_data, 'surgery_search'),
+            (paths['surgery_search_data'], paths['processed_surgery_search_data']),
+            {
+                'low_memory': low_memory,
+                'memory_budget_mb': memory_budget_mb,
+                'cache_dir': incremental_cache_dir,
+            },
+        ),
+    ]
+    # どちらの処理もGILを保持したままの解析が中心で、スレッドで並行しても短縮しないため順に実行する
+    # （プロファイルを有効にした場合にcProfileの計測が重ならないようにする意味もある）
+    for step_num, step_name, func, args, kwargs in preprocessing_steps:
+        execute_step(step_num, TOTAL_STEPS, step_name, func, *args, **kwargs)
+
+    comparison_settings = get_comparison_settings(config)
+    if comparison_settings['join_mode'] == 'outer':
+        schedule_only_result = get_schedule_only_path(paths['comparison_result'])
+    else:
+        schedule_only_result = ''
+    equivalence_settings = get_surgery_equivalence_settings(config)
+    surgery_equivalence = compile_equivalence_table(
+        equivalence_settings['classes'], equivalence_settings['patterns']
+    )
+    similarity_settings = get_surgery_similarity_settings(config)
+    if similarity_settings['enabled']:
+        surgery_similarity = SurgerySimilarity(
+            similarity_settings['threshold'],
+            similarity_settings['ngram_size'],
+            get_similarity_cache_path(get_log_directory(config), similarity_settings['cache_file'])
+        )
+    else:
+        surgery_similarity = None
+
+    execute_step(
+        3, TOTAL_STEPS, "データ比較",
+        stage(compare_surgery_data, 'comparison'),
+        paths['processed_surgery_search_data'],
+        paths['processed_surgery_schedule'],
+        paths['comparison_result'],
+        low_memory=low_memory,
+        memory_budget_mb=memory_budget_mb,
+        cache_dir=incremental_cache_dir,
+        date_tolerance_days=comparison_settings['date_tolerance_days'],
+        join_mode=comparison_settings['join_mode'],
+        schedule_only_result=schedule_only_result,
+        surgery_equivalence=surgery_equivalence,
+        surgery_similarity=surgery_similarity
+    )
+
+    _store_results(config, paths['comparison_result'])
+
+    report_settings = get_report_settings(config)
+    return execute_step(
+        4, TOTAL_STEPS, "眼科手術指示確認ファイルの作成",
+        stage(surgery_error_extractor, 'error_extraction'),
+        paths['comparison_result'],
+        paths['output_path'],
+        paths['template_path'],
+        report_settings['streaming_row_threshold'],
+        report_settings['output_formats'],
+        report_settings['csv_encoding'],
+        on_writer_done,
+        report_mode=report_settings['report_mode'],
+        state_db_path=state_db_path,
+        schedule_only_result=schedule_only_result,
+        parse_error_result=parse_error_result,
+        on_unchanged_errors=on_unchanged_errors
+    )
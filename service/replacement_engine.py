@@ -0,0 +1,181 @@
+import re
+from dataclasses import dataclass, field
+from typing import Any, Callable, Mapping, Sequence
+
+import numpy as np
+import pandas as pd
+
+# 置換する列と、置換項目ファイル（replacements.txt）のキーの対応
+REPLACEMENT_KEYS = {
+    '麻酔': 'anesthesia_replacements',
+    '医師': 'surgeon_replacements',
+    '入外': 'inpatient_replacements',
+}
+RULE_KINDS = ('exact', 'prefix', 'regex')
+# 置換元の末尾に付けると前方一致、前後を囲むと正規表現のルールになる記号
+PREFIX_MARKER = '*'
+REGEX_DELIMITER = '/'
+
+
+def map_unique_values(series: pd.Series, func: Callable[[Any], Any]) -> pd.Series:
+    """
+    列の一意な値ごとに一度だけfuncを呼び、結果を各行に展開
+
+    列を一意な値に分解してから配列の参照で各行に展開するため、同じ値が多い列ほど速い。
+    欠損の行は元の値のまま残し、どの値も変わらない場合は元の列をそのまま返す。
+    """
+    codes, uniques = pd.factorize(series)
+    mapped = np.array([func(value) for value in uniques], dtype=object)
+    if (mapped == np.asarray(uniques, dtype=object)).all():
+        return series
+
+    result = pd.Series(mapped[codes], index=series.index, dtype=object)
+    return result.where(codes >= 0, series.astype(object))
+
+
+@dataclass(frozen=True)
+class ReplacementRule:
+    """1つの置換ルール（kindはexact・prefix・regexのいずれか）"""
+    source: str
+    target: str
+    kind: str = 'exact'
+
+
+def parse_replacement_rules(replacements: Mapping[str, str]) -> list[ReplacementRule]:
+    """
+    置換元と置換先の辞書を置換ルールのリストに変換
+
+    置換元が/で囲まれている場合は正規表現（値の一部に一致すればよい）、
+    *で終わる場合は前方一致、それ以外は完全一致のルールとする。
+    """
+    rules = []
+    for source, target in replacements.items():
+        if len(source) > 2 and source.startswith(REGEX_DELIMITER) and source.endswith(REGEX_DELIMITER):
+            rules.append(ReplacementRule(source[1:-1], target, 'regex'))
+        elif len(source) > 1 and source.endswith(PREFIX_MARKER):
+            rules.append(ReplacementRule(source[:-1], target, 'prefix'))
+        else:
+            rules.append(ReplacementRule(source, target))
+    return rules
+
+
+@dataclass(frozen=True)
+class ColumnReplacements:
+    """
+    1列分のコンパイル済みの置換ルール
+
+    完全一致の辞書、前方一致（長い順）、正規表現（定義順）の順に最初に一致したルールを使う。
+    置換先は連鎖（A→B、B→C）を解決した最終的な値を保持するため、1回の照合で置換できる。
+    """
+    exact: dict[str, str] = field(default_factory=dict)
+    prefixes: tuple[tuple[str, str], ...] = ()
+    patterns: tuple[tuple[re.Pattern, str], ...] = ()
+
+    def _match(self, value: str) -> str | None:
+        target = self.exact.get(value)
+        if target is not None:
+            return target
+        for prefix, prefix_target in self.prefixes:
+            if value.startswith(prefix):
+                return prefix_target
+        for pattern, pattern_target in self.patterns:
+            if pattern.search(value):
+                return pattern_target
+        return None
+
+    def replace(self, value: Any) -> Any:
+        """1つの値を置換（文字列以外の値と、どのルールにも一致しない値はそのまま）"""
+        if not isinstance(value, str):
+            return value
+        target = self._match(value)
+        return value if target is None else target
+
+    def apply(self, series: pd.Series) -> pd.Series:
+        """列の値を置換（一意な値ごとに一度だけ置換先を求める）"""
+        return map_unique_values(series, self.replace)
+
+
+@dataclass(frozen=True)
+class ReplacementEngine:
+    """列ごとのコンパイル済みの置換ルール（作成後は変更しない）"""
+    columns: dict[str, ColumnReplacements] = field(default_factory=dict)
+
+    def apply(self, df: pd.DataFrame) -> pd.DataFrame:
+        """DataFrameに含まれる列の値を置換"""
+        for column, replacements in self.columns.items():
+            if column in df.columns:
+                df[column] = replacements.apply(df[column])
+        return df
+
+
+def _compile_column(column: str, rules: Sequence[ReplacementRule]) -> ColumnReplacements:
+    exact: dict[str, str] = {}
+    prefixes: list[tuple[str, str]] = []
+    patterns: list[tuple[re.Pattern, str]] = []
+
+    for rule in rules:
+        if rule.kind == 'exact':
+            exact.setdefault(rule.source, rule.target)
+        elif rule.kind == 'prefix':
+            prefixes.append((rule.source, rule.target))
+        elif rule.kind == 'regex':
+            try:
+                patterns.append((re.compile(rule.source), rule.target))
+            except re.error as e:
+                raise ValueError(f"{column}の置換の正規表現が不正です: {rule.source}: {str(e)}") from e
+        else:
+            raise ValueError(f"{column}の置換ルールの種類が不正です: {rule.kind}（{', '.join(RULE_KINDS)}のいずれか）")
+
+    # 長い接頭辞を優先する（同じ長さの場合は定義順）
+    prefixes.sort(key=lambda item: -len(item[0]))
+    single_step = ColumnReplacements(exact, tuple(prefixes), tuple(patterns))
+
+    resolved_targets: dict[str, str] = {}
+
+    def resolve(target: str) -> str:
+        """置換先にさらに一致するルールがあれば、一致しなくなるまでたどった値"""
+        if target in resolved_targets:
+            return resolved_targets[target]
+        chain = [target]
+        value = target
+        while True:
+            next_value = single_step.replace(value)
+            if next_value == value:
+                break
+            if next_value in chain:
+                raise ValueError(f"{column}の置換が循環しています: {' → '.join([*chain, next_value])}")
+            chain.append(next_value)
+            value = next_value
+        for item in chain:
+            resolved_targets[item] = value
+        return value
+
+    return ColumnReplacements(
+        exact={source: resolve(target) for source, target in exact.items()},
+        prefixes=tuple((prefix, resolve(target)) for prefix, target in prefixes),
+        patterns=tuple((pattern, resolve(target)) for pattern, target in patterns),
+    )
+
+
+def compile_replacements(
+        rules: Mapping[str, Mapping[str, str] | Sequence[ReplacementRule]]
+) -> ReplacementEngine:
+    """
+    列ごとの置換ルールをコンパイル
+
+    Args:
+        rules: 列名と、置換元・置換先の辞書（parse_replacement_rulesの書式）または置換ルールのリスト
+
+    Returns:
+        コンパイル済みの置換ルール
+
+    Raises:
+        ValueError: 正規表現が不正な場合、ルールの種類が不正な場合、または置換が循環している場合
+    """
+    columns = {}
+    for column, column_rules in rules.items():
+        if isinstance(column_rules, Mapping):
+            column_rules = parse_replacement_rules(column_rules)
+        if column_rules:
+            columns[column] = _compile_column(column, column_rules)
+    return ReplacementEngine(columns)
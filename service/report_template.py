@@ -0,0 +1,299 @@
+import logging
+import os
+import threading
+from copy import copy
+from dataclasses import dataclass
+from typing import Any
+
+from openpyxl import Workbook, load_workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.cell.cell import Cell
+from openpyxl.styles import Alignment, Border, Font, PatternFill, Protection
+from openpyxl.workbook.defined_name import DefinedName
+from openpyxl.worksheet.datavalidation import DataValidation
+from openpyxl.worksheet.dimensions import ColumnDimension
+from openpyxl.worksheet.page import PageMargins, PrintOptions, PrintPageSetup
+from openpyxl.worksheet.worksheet import Worksheet
+
+HEADER_ROW = 1
+DATA_START_ROW = 2
+
+
+@dataclass(frozen=True)
+class CellStyle:
+    """テンプレートのセル書式（ブックに依存しない形で保持）"""
+    font: Font
+    fill: PatternFill
+    border: Border
+    alignment: Alignment
+    protection: Protection
+    number_format: str
+
+    @classmethod
+    def from_cell(cls, cell: Any) -> 'CellStyle':
+        return cls(
+            font=copy(cell.font),
+            fill=copy(cell.fill),
+            border=copy(cell.border),
+            alignment=copy(cell.alignment),
+            protection=copy(cell.protection),
+            number_format=cell.number_format,
+        )
+
+    def apply(self, cell: Any) -> None:
+        cell.font = self.font
+        cell.fill = self.fill
+        cell.border = self.border
+        cell.alignment = self.alignment
+        cell.protection = self.protection
+        cell.number_format = self.number_format
+
+
+@dataclass(frozen=True)
+class TemplateSheet:
+    """テンプレートの本体以外のシート（セルの値と書式、列幅）"""
+    title: str
+    rows: tuple[tuple[tuple[Any, CellStyle | None], ...], ...]
+    column_widths: tuple[tuple[str, int, int, float], ...]
+
+
+@dataclass(frozen=True)
+class TemplateSkeleton:
+    """
+    眼科手術指示確認テンプレートの骨格
+
+    ヘッダー行の値と書式、データ行の列ごとの書式、ブックで再現するレイアウト（列幅・入力規則・セルの結合・
+    印刷設定・名前の定義・本体以外のシートなど）を保持し、テンプレートを再度読み込まずに同じ体裁のブックを作成できるようにする。
+    保持する書式オブジェクトは複数の出力処理で共有するため、ブックに反映する際は複製する。
+    """
+    sheet_title: str
+    header: tuple[tuple[Any, CellStyle | None], ...]
+    column_styles: tuple[CellStyle | None, ...]
+    # (列名, 開始列番号, 終了列番号, 幅)。複数列をまとめた列幅も保持する
+    column_widths: tuple[tuple[str, int, int, float], ...]
+    header_row_height: float | None
+    freeze_panes: str | None
+    auto_filter: str | None
+    conditional_formatting: tuple[tuple[str, Any], ...]
+    merged_cells: tuple[str, ...] = ()
+    data_validations: tuple[DataValidation, ...] = ()
+    page_setup: PrintPageSetup | None = None
+    page_margins: PageMargins | None = None
+    print_options: PrintOptions | None = None
+    print_title_rows: str | None = None
+    print_title_cols: str | None = None
+    print_area: str | None = None
+    defined_names: tuple[tuple[str, DefinedName], ...] = ()
+    other_sheets: tuple[TemplateSheet, ...] = ()
+
+    @property
+    def column_count(self) -> int:
+        return len(self.header)
+
+    def create_workbook(self) -> Workbook:
+        """
+        テンプレートと同じ体裁のブックを骨格から作成（本体のシートを選択した状態）
+
+        テンプレートのファイルは再度解析せず、本体のシートのレイアウトとヘッダー行、
+        本体以外のシートと名前の定義を反映する。データ行は2行目から書き込む。
+        """
+        wb = Workbook()
+        ws = wb.active
+        ws.title = self.sheet_title
+        self.apply_layout(ws)
+        for col_idx, (value, style) in enumerate(self.header, start=1):
+            cell = ws.cell(row=HEADER_ROW, column=col_idx, value=value)
+            if style is not None:
+                style.apply(cell)
+        self.add_template_parts(wb)
+        return wb
+
+    def apply_layout(self, ws: Any) -> None:
+        """
+        テンプレートの本体のシートのレイアウトを新しいシートに反映
+
+        列幅・行の高さ・ウィンドウ枠の固定・フィルター・条件付き書式・セルの結合・入力規則・印刷設定を反映する。
+        書き込み専用モードのシートでは行を追加する前に呼ぶ。
+        """
+        _apply_column_widths(ws, self.column_widths)
+        if self.header_row_height is not None:
+            ws.row_dimensions[HEADER_ROW].height = self.header_row_height
+        if self.freeze_panes:
+            ws.freeze_panes = self.freeze_panes
+        if self.auto_filter:
+            ws.auto_filter.ref = self.auto_filter
+        for sqref, rule in self.conditional_formatting:
+            ws.conditional_formatting.add(sqref, copy(rule))
+        for cell_range in self.merged_cells:
+            ws.merged_cells.add(cell_range)
+        for validation in self.data_validations:
+            ws.data_validations.append(copy(validation))
+        if self.page_setup is not None:
+            ws.page_setup = copy(self.page_setup)
+        if self.page_margins is not None:
+            ws.page_margins = copy(self.page_margins)
+        if self.print_options is not None:
+            ws.print_options = copy(self.print_options)
+        if self.print_title_rows:
+            ws.print_title_rows = self.print_title_rows
+        if self.print_title_cols:
+            ws.print_title_cols = self.print_title_cols
+        if self.print_area:
+            ws.print_area = self.print_area
+
+    def add_template_parts(self, wb: Workbook) -> None:
+        """
+        本体以外のシートと名前の定義をブックに追加（書き込み専用モードのブックにも追加できる）
+
+        本体のシートを作成した後、追加のシートを作成する前に呼ぶ。
+        """
+        for sheet in self.other_sheets:
+            ws = wb.create_sheet(title=sheet.title)
+            _apply_column_widths(ws, sheet.column_widths)
+            # 同じ書式のセルは書式を一度だけブックに登録し、登録済みの書式の番号を複製する
+            style_arrays: dict[int, Any] = {}
+            for row in sheet.rows:
+                cells = []
+                for value, style in row:
+                    cell = WriteOnlyCell(ws, value=value)
+                    if style is not None:
+                        style_array = style_arrays.get(id(style))
+                        if style_array is None:
+                            style.apply(cell)
+                            style_arrays[id(style)] = cell._style
+                        else:
+                            cell._style = copy(style_array)
+                    cells.append(cell)
+                ws.append(cells)
+        for name, defined_name in self.defined_names:
+            wb.defined_names[name] = copy(defined_name)
+
+    def apply_column_style(self, cell: Cell, col_idx: int) -> None:
+        """データ行のセルにテンプレートの列書式を反映"""
+        if col_idx <= len(self.column_styles):
+            style = self.column_styles[col_idx - 1]
+            if style is not None:
+                style.apply(cell)
+
+
+def _apply_column_widths(ws: Any, column_widths: tuple[tuple[str, int, int, float], ...]) -> None:
+    for column_letter, min_col, max_col, width in column_widths:
+        ws.column_dimensions[column_letter] = ColumnDimension(
+            ws, index=column_letter, width=width, min=min_col, max=max_col
+        )
+
+
+def _read_column_widths(ws: Worksheet) -> tuple[tuple[str, int, int, float], ...]:
+    return tuple(
+        (letter, dimension.min, dimension.max, dimension.width)
+        for letter, dimension in ws.column_dimensions.items()
+        if dimension.width
+    )
+
+
+def _read_sheet(ws: Worksheet) -> TemplateSheet:
+    """本体以外のシートのセルの値と書式を読み込む（同じ書式のセルは同じCellStyleを共有する）"""
+    styles: dict[Any, CellStyle] = {}
+
+    def cell_style(cell: Cell) -> CellStyle | None:
+        if not cell.has_style:
+            return None
+        key = tuple(cell._style)
+        if key not in styles:
+            styles[key] = CellStyle.from_cell(cell)
+        return styles[key]
+
+    rows = tuple(tuple((cell.value, cell_style(cell)) for cell in row) for row in ws.iter_rows())
+    return TemplateSheet(title=ws.title, rows=rows, column_widths=_read_column_widths(ws))
+
+
+_cache: dict[str, tuple[int, TemplateSkeleton]] = {}
+_cache_lock = threading.Lock()
+
+
+def _build_skeleton(template_path: str) -> TemplateSkeleton:
+    wb = load_workbook(template_path)
+    ws = wb.active
+    if ws is None:
+        raise ValueError(f'テンプレートにワークシートがありません: {template_path}')
+
+    header_cells = [cell for cell in ws[HEADER_ROW] if cell.value is not None]
+    column_count = max((cell.column for cell in header_cells), default=0)
+
+    header = []
+    column_styles = []
+    for col_idx in range(1, column_count + 1):
+        header_cell = ws.cell(row=HEADER_ROW, column=col_idx)
+        header.append((header_cell.value, CellStyle.from_cell(header_cell) if header_cell.has_style else None))
+
+        # 1件目のデータ行の書式を列の書式として扱う
+        data_cell = ws.cell(row=DATA_START_ROW, column=col_idx)
+        column_styles.append(CellStyle.from_cell(data_cell) if data_cell.has_style else None)
+
+    conditional_formatting = tuple(
+        (str(formatting.sqref), rule)
+        for formatting in ws.conditional_formatting
+        for rule in formatting.rules
+    )
+
+    skeleton = TemplateSkeleton(
+        sheet_title=ws.title,
+        header=tuple(header),
+        column_styles=tuple(column_styles),
+        column_widths=_read_column_widths(ws),
+        header_row_height=ws.row_dimensions[HEADER_ROW].height,
+        freeze_panes=ws.freeze_panes,
+        auto_filter=ws.auto_filter.ref,
+        conditional_formatting=conditional_formatting,
+        merged_cells=tuple(str(cell_range) for cell_range in ws.merged_cells.ranges),
+        data_validations=tuple(copy(validation) for validation in ws.data_validations.dataValidation),
+        page_setup=copy(ws.page_setup),
+        page_margins=copy(ws.page_margins),
+        print_options=copy(ws.print_options),
+        print_title_rows=ws.print_title_rows,
+        print_title_cols=ws.print_title_cols,
+        print_area=_print_area(ws),
+        defined_names=tuple((name, copy(defined_name)) for name, defined_name in wb.defined_names.items()),
+        other_sheets=tuple(_read_sheet(sheet) for sheet in wb.worksheets if sheet is not ws),
+    )
+    wb.close()
+    return skeleton
+
+
+def _print_area(ws: Worksheet) -> str | None:
+    """印刷範囲（シート名を除いたセル範囲）"""
+    if not ws.print_area:
+        return None
+    return ','.join(part.split('!')[-1] for part in str(ws.print_area).split(','))
+
+
+def load_template_skeleton(template_path: str) -> TemplateSkeleton:
+    """
+    テンプレートの骨格を取得
+
+    プロセス内でテンプレートごとに一度だけ解析してキャッシュし、
+    ファイルの更新日時が変わった場合は再解析する。
+
+    Args:
+        template_path: テンプレートExcelファイルのパス
+
+    Returns:
+        テンプレートの骨格
+    """
+    cache_key = os.path.abspath(template_path)
+    mtime = os.stat(cache_key).st_mtime_ns
+
+    with _cache_lock:
+        cached = _cache.get(cache_key)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+
+        skeleton = _build_skeleton(template_path)
+        _cache[cache_key] = (mtime, skeleton)
+        logging.info(f"テンプレートを読み込みました: {template_path}")
+        return skeleton
+
+
+def clear_template_cache() -> None:
+    with _cache_lock:
+        _cache.clear()
@@ -0,0 +1,287 @@
+import logging
+import os
+import sqlite3
+from datetime import datetime
+
+import pandas as pd
+
+RESULT_STORE_FILENAME = 'comparison_results.sqlite3'
+
+# 比較項目ごとのビット（mismatch_mask・missing_maskで使用）
+COMPARE_BITS = {
+    '入外': 1,
+    '術眼': 2,
+    '手術': 4,
+    '医師': 8,
+    '麻酔': 16,
+}
+
+# 比較結果CSVの列とテーブルの列の対応
+RESULT_COLUMNS = {
+    '手術日': 'surgery_date',
+    '患者ID': 'patient_id',
+    '氏名': 'name',
+    '入外': 'inpatient',
+    '術眼': 'eye',
+    '手術': 'surgery',
+    '医師': 'surgeon',
+    '麻酔': 'anesthesia',
+    '術前': 'preoperative',
+}
+
+# 前回の実行からの変化を判定する列（手術の内容と比較結果）
+STATE_COLUMNS = [*RESULT_COLUMNS, *(f'{column}_比較' for column in COMPARE_BITS)]
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    created_at TEXT NOT NULL,
+    source_file TEXT NOT NULL,
+    row_count INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS comparison_results (
+    run_id INTEGER NOT NULL REFERENCES runs (run_id),
+    surgery_date TEXT NOT NULL,
+    patient_id TEXT NOT NULL,
+    name TEXT,
+    inpatient TEXT,
+    eye TEXT,
+    surgery TEXT,
+    surgeon TEXT,
+    anesthesia TEXT,
+    preoperative TEXT,
+    mismatch_mask INTEGER NOT NULL,
+    missing_mask INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_results_date_patient ON comparison_results (surgery_date, patient_id);
+CREATE INDEX IF NOT EXISTS idx_results_surgeon ON comparison_results (surgeon);
+CREATE INDEX IF NOT EXISTS idx_results_mismatch ON comparison_results (mismatch_mask);
+CREATE INDEX IF NOT EXISTS idx_results_missing ON comparison_results (missing_mask);
+CREATE TABLE IF NOT EXISTS report_state (
+    row_key TEXT PRIMARY KEY,
+    surgery_date TEXT NOT NULL,
+    state_hash INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_report_state_date ON report_state (surgery_date);
+"""
+
+
+def get_result_store_path(log_directory: str, database_path: str = '') -> str:
+    """結果データベースのパス（未指定の場合はログディレクトリ）"""
+    return database_path or os.path.join(log_directory, RESULT_STORE_FILENAME)
+
+
+def connect(db_path: str) -> sqlite3.Connection:
+    """結果データベースに接続し、テーブルとインデックスがなければ作成"""
+    directory = os.path.dirname(db_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    conn = sqlite3.connect(db_path)
+    conn.executescript(_SCHEMA)
+    return conn
+
+
+def compute_masks(df: pd.DataFrame) -> tuple[pd.Series, pd.Series]:
+    """
+    比較結果から不一致・未入力の項目をビットで表した値を計算
+
+    CSVから読み込んだ比較結果はTrue/Falseが文字列になる場合があるため、両方を判定する。
+
+    Returns:
+        (不一致のビットマスク, 未入力のビットマスク)
+    """
+    mismatch_mask = pd.Series(0, index=df.index, dtype='int64')
+    missing_mask = pd.Series(0, index=df.index, dtype='int64')
+
+    for column, bit in COMPARE_BITS.items():
+        result = df[f'{column}_比較']
+        mismatch_mask |= result.isin([False, 'False']).astype('int64') * bit
+        missing_mask |= (result == '未入力').astype('int64') * bit
+
+    return mismatch_mask, missing_mask
+
+
+def _to_records(df: pd.DataFrame, run_id: int) -> list[tuple]:
+    """比較結果をテーブルに挿入する行のリストに変換"""
+    mismatch_mask, missing_mask = compute_masks(df)
+
+    values = df[list(RESULT_COLUMNS)].astype(object).where(df[list(RESULT_COLUMNS)].notna(), None)
+    values['患者ID'] = df['患者ID'].astype(str)
+
+    return [
+        (run_id, *row, int(mismatch), int(missing))
+        for row, mismatch, missing in zip(
+            values.itertuples(index=False, name=None), mismatch_mask, missing_mask
+        )
+    ]
+
+
+def store_comparison_results(db_path: str, comparison_result: str, chunksize: int = 50_000) -> int:
+    """
+    比較結果CSVを1回の実行分として結果データベースに保存
+
+    CSVはチャンク単位で読み込み、1つのトランザクション内でまとめて挿入する。
+
+    Args:
+        db_path: 結果データベースのパス
+        comparison_result: 比較結果CSVファイルのパス
+        chunksize: 1回に読み込み・挿入する行数
+
+    Returns:
+        保存した実行のID
+    """
+    columns = ['run_id', *RESULT_COLUMNS.values(), 'mismatch_mask', 'missing_mask']
+    insert_sql = (
+        f"INSERT INTO comparison_results ({', '.join(columns)}) "
+        f"VALUES ({', '.join('?' for _ in columns)})"
+    )
+
+    conn = connect(db_path)
+    try:
+        with conn:
+            cursor = conn.execute(
+                "INSERT INTO runs (created_at, source_file) VALUES (?, ?)",
+                (datetime.now().isoformat(timespec='seconds'), os.path.abspath(comparison_result))
+            )
+            run_id = int(cursor.lastrowid or 0)
+
+            row_count = 0
+            for chunk in pd.read_csv(comparison_result, encoding='cp932', chunksize=chunksize, dtype={'患者ID': str}):
+                conn.executemany(insert_sql, _to_records(chunk, run_id))
+                row_count += len(chunk)
+
+            conn.execute("UPDATE runs SET row_count = ? WHERE run_id = ?", (row_count, run_id))
+    finally:
+        conn.close()
+
+    logging.info(f"比較結果を結果データベースに保存しました: {db_path}（{row_count}件）")
+    return run_id
+
+
+def count_results(
+        db_path: str,
+        column: str,
+        state: str = 'mismatch',
+        surgeon: str | None = None,
+        start_date: str | None = None,
+        end_date: str | None = None
+) -> int:
+    """
+    指定した項目が不一致または未入力だった手術の件数を集計
+
+    同じ手術（手術日・患者ID）が複数回の実行に含まれていても1件として数える。
+
+    Args:
+        db_path: 結果データベースのパス
+        column: 比較項目（入外・術眼・手術・医師・麻酔）
+        state: 'mismatch'（不一致）または'missing'（未入力）
+        surgeon: 医師で絞り込む場合の医師名
+        start_date: 手術日の開始（YYYY/MM/DD、この日を含む）
+        end_date: 手術日の終了（YYYY/MM/DD、この日を含む）
+
+    Returns:
+        件数
+    """
+    if column not in COMPARE_BITS:
+        raise ValueError(f"比較項目が不正です: {column}")
+    if state not in ('mismatch', 'missing'):
+        raise ValueError(f"状態が不正です: {state}")
+
+    conditions = [f"({state}_mask & ?) != 0"]
+    params: list = [COMPARE_BITS[column]]
+    if surgeon is not None:
+        conditions.append("surgeon = ?")
+        params.append(surgeon)
+    if start_date is not None:
+        conditions.append("surgery_date >= ?")
+        params.append(start_date)
+    if end_date is not None:
+        conditions.append("surgery_date <= ?")
+        params.append(end_date)
+
+    conn = connect(db_path)
+    try:
+        row = conn.execute(
+            "SELECT COUNT(*) FROM (SELECT DISTINCT surgery_date, patient_id FROM comparison_results "
+            f"WHERE {' AND '.join(conditions)})",
+            params
+        ).fetchone()
+    finally:
+        conn.close()
+
+    return int(row[0])
+
+
+def compute_state_hashes(df: pd.DataFrame) -> tuple[list[str], list[int]]:
+    """
+    行ごとのキー（手術日・患者ID）と、手術の内容・比較結果のハッシュを計算
+
+    同じ手術日・患者IDの行が複数ある場合は、出現順の番号をキーに加えて区別する。
+    CSVの読み込み方で型が変わってもハッシュが変わらないよう、文字列に揃えてから計算する。
+
+    Returns:
+        (キーのリスト, ハッシュのリスト)
+    """
+    occurrence = df.groupby(['手術日', '患者ID'], sort=False).cumcount()
+    keys = (df['手術日'].astype(str) + '|' + df['患者ID'].astype(str) + '|' + occurrence.astype(str)).tolist()
+    hashes = pd.util.hash_pandas_object(df[STATE_COLUMNS].astype(str), index=False)
+    # SQLiteのINTEGERは符号付き64ビットのため、ビット列を変えずに符号付きとして扱う
+    return keys, hashes.to_numpy().view('int64').tolist()
+
+
+def find_changed_rows(db_path: str, df_errors: pd.DataFrame) -> pd.Series:
+    """
+    前回の実行から新たに発生した、または内容が変わった不一致・未入力の行を判定
+
+    Args:
+        db_path: 結果データベースのパス
+        df_errors: 今回の不一致・未入力の行
+
+    Returns:
+        新規または変更された行をTrueとする真偽値のSeries
+    """
+    keys, hashes = compute_state_hashes(df_errors)
+
+    conn = connect(db_path)
+    try:
+        previous = dict(conn.execute(
+            "SELECT row_key, state_hash FROM report_state WHERE surgery_date BETWEEN ? AND ?",
+            (str(df_errors['手術日'].min()), str(df_errors['手術日'].max()))
+        ).fetchall()) if len(df_errors) > 0 else {}
+    finally:
+        conn.close()
+
+    return pd.Series(
+        [previous.get(key) != state_hash for key, state_hash in zip(keys, hashes)],
+        index=df_errors.index,
+        dtype=bool
+    )
+
+
+def update_report_state(db_path: str, df_comparison: pd.DataFrame, df_errors: pd.DataFrame) -> None:
+    """
+    今回の不一致・未入力の行を次回の差分判定用に保存
+
+    今回の比較結果に含まれる手術日の状態だけを置き換えるため、
+    別の期間を処理した実行の状態は残る。
+
+    Args:
+        db_path: 結果データベースのパス
+        df_comparison: 今回の比較結果全体
+        df_errors: 今回の不一致・未入力の行
+    """
+    dates = [(str(date),) for date in df_comparison['手術日'].dropna().unique()]
+    keys, hashes = compute_state_hashes(df_errors)
+    surgery_dates = df_errors['手術日'].astype(str).tolist()
+
+    conn = connect(db_path)
+    try:
+        with conn:
+            conn.executemany("DELETE FROM report_state WHERE surgery_date = ?", dates)
+            conn.executemany(
+                "INSERT OR REPLACE INTO report_state (row_key, surgery_date, state_hash) VALUES (?, ?, ?)",
+                zip(keys, surgery_dates, hashes)
+            )
+    finally:
+        conn.close()
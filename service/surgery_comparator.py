@@ -1,24 +1,47 @@
 import logging
+import os
 
+import numpy as np
 import pandas as pd
 
+from service.surgery_equivalence import EquivalenceTable, compile_equivalence_table, map_to_class_ids
+from service.surgery_similarity import SIMILAR_LABEL, SurgerySimilarity
+from utils.memory_budget import (
+    CATEGORICAL_COLUMNS,
+    create_partition_directory,
+    estimate_peak_bytes,
+    exceeds_budget,
+    get_peak_memory_bytes,
+    log_memory_usage,
+    partition_csv_by_month,
+    share_categories,
+    shared_categorical_dtype,
+)
+from utils.partition_cache import PartitionCache, run_partitioned
 
-def compare_surgery_data(
-        processed_surgery_search_data: str,
-        processed_surgery_schedule: str,
-        comparison_result: str
-) -> None:
-    """
-    眼科手術検索データと手術予定表を比較してCSV形式で出力
+COMPARE_COLUMNS = ['入外', '術眼', '手術', '医師', '麻酔']
+SCHEDULE_COLUMNS = ['手術日', '患者ID', '氏名', '入外', '術眼', '手術', '医師', '麻酔']
+# leftは検索データを基準に結合、outerは予定表のみの手術も含めて結合
+JOIN_MODES = ('left', 'outer')
+MATCH_COLUMN = '照合'
+MATCH_LABELS = {'both': '両方', 'left_only': '検索のみ', 'right_only': '予定のみ'}
+SCHEDULE_ONLY_SUFFIX = '_予定のみ'
+JOIN_KEYS = ['手術日', '患者ID']
+# 同じ手術日・患者IDの行を1対1に対応付けるための組番号の列
+PAIR_COLUMN = '_組'
+# 同じキーの行の組み合わせがこの数を超える場合は、一致数を比べずに出現順に対応付ける
+MAX_PAIR_CANDIDATES = 100
+# ログに表示する重複キーの最大件数
+MAX_LOGGED_DUPLICATE_KEYS = 20
+
+
+def _read_frame(csv_path: str) -> pd.DataFrame:
+    """処理済みのCSVを読み込み、値の種類が少ない比較項目はカテゴリ型にする"""
+    return pd.read_csv(csv_path, encoding='cp932', dtype={column: 'category' for column in CATEGORICAL_COLUMNS})
 
-    Args:
-        processed_surgery_search_data: 眼科手術検索データのCSVファイルパス（基準）
-        processed_surgery_schedule: 手術予定表のCSVファイルパス（比較対象）
-        comparison_result: 比較結果を出力するCSVファイルパス
-    """
-    df_search = pd.read_csv(processed_surgery_search_data, encoding='cp932')
-    df_schedule = pd.read_csv(processed_surgery_schedule, encoding='cp932')
 
+def _prepare_frames(df_search: pd.DataFrame, df_schedule: pd.DataFrame) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """手術日と患者IDの表記を揃え、予定表の空行を除外し、比較項目のカテゴリを共通にする"""
     logging.info(f"検索データ件数: {len(df_search)}件")
     logging.info(f"予定表データ件数（読み込み時）: {len(df_schedule)}件")
 
@@ -55,28 +78,277 @@ def compare_surgery_data(
     else:
         logging.warning("予定表にデータがありません")
 
-    df_merged = df_search.merge(
-        df_schedule,
-        on=['手術日', '患者ID'],
-        how='left',
+    # 結合後も同じカテゴリ型の列どうしとして、整数コードで比較できるようにする
+    share_categories([df_search, df_schedule])
+
+    return df_search, df_schedule
+
+
+def get_schedule_only_path(comparison_result: str) -> str:
+    """予定表のみの手術を出力するCSVファイルのパス（比較結果CSVと同じディレクトリ）"""
+    root, ext = os.path.splitext(comparison_result)
+    return f'{root}{SCHEDULE_ONLY_SUFFIX}{ext}'
+
+
+def _merge_within_tolerance(
+        df_search: pd.DataFrame,
+        df_schedule: pd.DataFrame,
+        tolerance_days: int,
+        include_schedule_only: bool = False
+) -> pd.DataFrame:
+    """
+    患者IDごとに、検索データの手術日に最も近い予定表の行を前後tolerance_days日以内で結合
+
+    手術日で並べ替えてからmerge_asofで結合するため、検索データ1行につき予定表の1行だけが対応する。
+    結果は検索データの行順に戻し、手術日が一致しない場合は手術日_比較をFalseとする。
+    include_schedule_onlyがTrueの場合は、どの検索データとも対応しなかった予定表の行を末尾に加え、
+    照合列に両方・検索のみ・予定のみを記録する。
+    """
+    search_dates = pd.to_datetime(df_search['手術日'], format='%Y/%m/%d', errors='coerce')
+    schedule_dates = pd.to_datetime(df_schedule['手術日'], format='%Y/%m/%d', errors='coerce')
+
+    df_left = df_search.assign(_照合日=search_dates, _行順=range(len(df_search)))
+    df_right = df_schedule.assign(_照合日=schedule_dates, _予定行順=range(len(df_schedule)))
+
+    valid = search_dates.notna().to_numpy()
+    df_matched = pd.merge_asof(
+        df_left[valid].sort_values('_照合日', kind='mergesort'),
+        df_right[schedule_dates.notna().to_numpy()].sort_values('_照合日', kind='mergesort'),
+        on='_照合日',
+        by='患者ID',
+        direction='nearest',
+        tolerance=pd.Timedelta(days=tolerance_days),
         suffixes=('_検索', '_予定')
     )
+    # merge_asofで接尾辞が付く列（結合しない行も同じ列名に揃える）
+    overlapping = (set(df_search.columns) & set(df_schedule.columns)) - {'患者ID'}
+    # 手術日が変換できない検索データの行は予定表と対応させない
+    frames = [df_matched, df_left[~valid].rename(columns={column: f'{column}_検索' for column in overlapping})]
+
+    if include_schedule_only:
+        df_schedule_only = df_right[~df_right['_予定行順'].isin(df_matched['_予定行順'].dropna())]
+        df_schedule_only = df_schedule_only.rename(columns={column: f'{column}_予定' for column in overlapping})
+        frames.append(df_schedule_only.assign(手術日_検索=df_schedule_only['手術日_予定']))
+
+    df_merged = pd.concat(frames).sort_values(['_行順', '_予定行順'], na_position='last', kind='mergesort')
+    df_merged = df_merged.reset_index(drop=True)
+
+    df_merged['手術日_比較'] = [
+        '未入力' if pd.isna(schedule_date) else search_date == schedule_date
+        for search_date, schedule_date in zip(df_merged['手術日_検索'], df_merged['手術日_予定'])
+    ]
+    if include_schedule_only:
+        df_merged[MATCH_COLUMN] = [
+            MATCH_LABELS['right_only'] if pd.isna(search_order)
+            else MATCH_LABELS['left_only'] if pd.isna(schedule_order)
+            else MATCH_LABELS['both']
+            for search_order, schedule_order in zip(df_merged['_行順'], df_merged['_予定行順'])
+        ]
+
+    df_merged = df_merged.drop(columns=['_照合日', '_行順', '_予定行順'])
+    return df_merged.rename(columns={'手術日_検索': '手術日'})
+
+
+def _log_duplicate_keys(duplicates: pd.DataFrame, large_group_count: int) -> None:
+    """同じ手術日・患者IDの行が複数あるキーをログに出力"""
+    logging.warning(
+        f"同じ手術日・患者IDの行が複数あるキーが {len(duplicates)}件 あります。"
+        "項目の一致数が多い行どうしを対応付け、対応しない行は未入力とします"
+    )
+    for (surgery_date, patient_id), (search_count, schedule_count) in (
+            duplicates.head(MAX_LOGGED_DUPLICATE_KEYS).iterrows()):
+        logging.warning(f"  {surgery_date} 患者ID={patient_id}: 検索データ{search_count}件, 予定表{schedule_count}件")
+    if len(duplicates) > MAX_LOGGED_DUPLICATE_KEYS:
+        logging.warning(f"  ほか {len(duplicates) - MAX_LOGGED_DUPLICATE_KEYS}件")
+    if large_group_count > 0:
+        logging.warning(
+            f"行の組み合わせが{MAX_PAIR_CANDIDATES}を超える {large_group_count}件 のキーは出現順に対応付けました"
+        )
+
+
+def _assign_pairs(df_search: pd.DataFrame, df_schedule: pd.DataFrame) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    同じ手術日・患者IDの行が複数ある場合に、検索データと予定表の行を1対1に対応付ける
+
+    先にキーごとの件数を数え、どちらかに複数行あるキーだけを対象に、比較項目の一致数が多い組から順に
+    対応付ける（直積で行が増えることを防ぐ）。組み合わせがMAX_PAIR_CANDIDATESを超えるキーは、
+    メモリ使用量を抑えるため出現順に対応付ける。
+
+    Returns:
+        組番号の列を加えた (検索データ, 予定表)。JOIN_KEYSと組番号で結合すると1対1になる
+    """
+    search_pairs = np.zeros(len(df_search), dtype='int64')
+    schedule_pairs = np.zeros(len(df_schedule), dtype='int64')
+
+    counts = pd.concat([
+        df_search.groupby(JOIN_KEYS, sort=False).size().rename('検索'),
+        df_schedule.groupby(JOIN_KEYS, sort=False).size().rename('予定'),
+    ], axis=1).fillna(0).astype('int64')
+    duplicates = counts[((counts['検索'] > 1) | (counts['予定'] > 1)) & (counts['検索'] > 0) & (counts['予定'] > 0)]
+
+    if len(duplicates) == 0:
+        return df_search.assign(**{PAIR_COLUMN: search_pairs}), df_schedule.assign(**{PAIR_COLUMN: schedule_pairs})
+
+    # 対象のキーの行だけを取り出し、位置（0始まり）で対応を管理する
+    search_target = pd.MultiIndex.from_frame(df_search[JOIN_KEYS]).isin(duplicates.index)
+    schedule_target = pd.MultiIndex.from_frame(df_schedule[JOIN_KEYS]).isin(duplicates.index)
+    value_columns = JOIN_KEYS + COMPARE_COLUMNS
+    df_left = df_search.loc[search_target, value_columns].assign(_行順=np.flatnonzero(search_target))
+    df_right = df_schedule.loc[schedule_target, value_columns].assign(_予定行順=np.flatnonzero(schedule_target))
+
+    large = duplicates[duplicates['検索'] * duplicates['予定'] > MAX_PAIR_CANDIDATES].index
+    left_large = pd.MultiIndex.from_frame(df_left[JOIN_KEYS]).isin(large)
+    right_large = pd.MultiIndex.from_frame(df_right[JOIN_KEYS]).isin(large)
+
+    # 組み合わせが少ないキーはすべての組の一致数を数える
+    df_candidates = df_left[~left_large].merge(df_right[~right_large], on=JOIN_KEYS, suffixes=('_検索', '_予定'))
+    df_candidates['_一致数'] = sum(
+        (df_candidates[f'{column}_検索'] == df_candidates[f'{column}_予定']).astype('int64')
+        for column in COMPARE_COLUMNS
+    )
+    df_candidates = df_candidates.sort_values(
+        ['_一致数', '_行順', '_予定行順'], ascending=[False, True, True], kind='mergesort'
+    )
+
+    # 組み合わせが多いキーは出現順の番号どうしを対応付ける
+    df_left_large = df_left[left_large]
+    df_right_large = df_right[right_large]
+    df_positional = df_left_large.assign(_出現順=df_left_large.groupby(JOIN_KEYS).cumcount()).merge(
+        df_right_large.assign(_出現順=df_right_large.groupby(JOIN_KEYS).cumcount()),
+        on=JOIN_KEYS + ['_出現順']
+    )
+
+    # 一致数の多い組から、まだ対応付けていない行どうしを対応付ける（キーが異なる行は候補に含まれない）
+    paired_search: set[int] = set()
+    paired_schedule: set[int] = set()
+    pairs = list(zip(df_positional['_行順'], df_positional['_予定行順']))
+    for search_position, schedule_position in zip(df_candidates['_行順'], df_candidates['_予定行順']):
+        if search_position not in paired_search and schedule_position not in paired_schedule:
+            paired_search.add(search_position)
+            paired_schedule.add(schedule_position)
+            pairs.append((search_position, schedule_position))
+
+    # 対象のキーの検索データの行には他と重ならない正の組番号、対応しない予定表の行には負の組番号を付ける
+    search_pairs[search_target] = np.flatnonzero(search_target) + 1
+    schedule_pairs[schedule_target] = -(np.flatnonzero(schedule_target) + 1)
+    for search_position, schedule_position in pairs:
+        schedule_pairs[schedule_position] = search_position + 1
+
+    _log_duplicate_keys(duplicates, len(large))
+
+    return df_search.assign(**{PAIR_COLUMN: search_pairs}), df_schedule.assign(**{PAIR_COLUMN: schedule_pairs})
+
+
+def _merge_outer(df_search: pd.DataFrame, df_schedule: pd.DataFrame) -> pd.DataFrame:
+    """
+    検索データと予定表を1回の外部結合で結合し、照合列に両方・検索のみ・予定のみを記録
+
+    検索データの行は元の順に並べ、予定表のみの行は予定表の順に末尾へ並べる。
+    """
+    df_merged = df_search.assign(_行順=range(len(df_search))).merge(
+        df_schedule.assign(_予定行順=range(len(df_schedule))),
+        on=JOIN_KEYS + [PAIR_COLUMN],
+        how='outer',
+        suffixes=('_検索', '_予定'),
+        indicator=MATCH_COLUMN
+    )
+    df_merged = df_merged.sort_values(['_行順', '_予定行順'], na_position='last', kind='mergesort')
+    df_merged[MATCH_COLUMN] = df_merged[MATCH_COLUMN].astype(str).map(MATCH_LABELS)
+
+    return df_merged.drop(columns=['_行順', '_予定行順']).reset_index(drop=True)
+
+
+def _category_codes(series: pd.Series, categories: pd.Index) -> np.ndarray:
+    """列の値を、共通のカテゴリでの位置（整数コード、欠損は-1）に変換"""
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        # カテゴリごとに位置を求め、各行のコードから参照する（末尾の-1は欠損のコード用）
+        positions = np.append(categories.get_indexer(series.cat.categories), -1)
+        return positions[series.cat.codes.to_numpy()]
+    return categories.get_indexer(series)
+
+
+def _codes_equal(search: pd.Series, schedule: pd.Series) -> np.ndarray:
+    """
+    カテゴリ型の2列を共通のカテゴリの整数コードで比較（検索データが欠損している行は一致しない）
+
+    結合でカテゴリの順序が変わったり、カテゴリ型でなくなったりした列も、共通のカテゴリに揃えて比較する。
+    """
+    categories = shared_categorical_dtype([search, schedule]).categories
+    search_codes = _category_codes(search, categories)
+    return (search_codes == _category_codes(schedule, categories)) & (search_codes >= 0)
+
+
+def _comparison_result(matched: np.ndarray, schedule: pd.Series) -> pd.Series:
+    """一致判定（True/False）の配列から比較結果の列を作成（予定が未入力の行は'未入力'）"""
+    result = pd.Series(matched.tolist(), index=schedule.index, dtype=object)
+    return result.where(schedule.notna(), '未入力')
 
-    compare_columns = ['入外', '術眼', '手術', '医師', '麻酔']
 
-    df_merged['手術日_比較'] = True
+def _compare_frames(
+        df_search: pd.DataFrame,
+        df_schedule: pd.DataFrame,
+        date_tolerance_days: int = 0,
+        join_mode: str = 'left',
+        surgery_equivalence: EquivalenceTable | None = None,
+        surgery_similarity: SurgerySimilarity | None = None
+) -> pd.DataFrame:
+    """
+    検索データを基準に予定表を結合し、項目ごとの比較結果を作成
+
+    date_tolerance_daysが0の場合は手術日と患者IDが完全に一致する行を結合し、
+    1以上の場合は前後date_tolerance_days日以内で最も近い手術日の行を結合する。
+    完全一致の場合、同じ手術日・患者IDの行が複数あっても行が増えないよう、行どうしを1対1に対応付ける。
+    join_modeがouterの場合は予定表のみの行も含め、照合列を加える（予定表のみの行の項目は予定表の値）。
+    surgery_equivalenceを指定した場合、手術は同じ手術のクラスIDで比較する。
+    surgery_similarityを指定した場合、一致しなかった手術のうち手術名が似ているものを類似とする。
+    """
+    df_search, df_schedule = _prepare_frames(df_search, df_schedule)
+    include_schedule_only = join_mode == 'outer'
 
-    for column in compare_columns:
+    if date_tolerance_days > 0:
+        df_merged = _merge_within_tolerance(df_search, df_schedule, date_tolerance_days, include_schedule_only)
+    else:
+        df_search, df_schedule = _assign_pairs(df_search, df_schedule)
+        if include_schedule_only:
+            df_merged = _merge_outer(df_search, df_schedule)
+        else:
+            df_merged = df_search.merge(
+                df_schedule,
+                on=JOIN_KEYS + [PAIR_COLUMN],
+                how='left',
+                suffixes=('_検索', '_予定')
+            )
+        df_merged = df_merged.drop(columns=PAIR_COLUMN)
+        df_merged['手術日_比較'] = True
+
+    for column in COMPARE_COLUMNS:
         search_col = f'{column}_検索'
         schedule_col = f'{column}_予定'
         result_col = f'{column}_比較'
 
+        if column == '手術' and (surgery_equivalence is not None or surgery_similarity is not None):
+            # 手術名は同じ手術のクラスIDに変換して整数で比較し、表記が異なる同じ手術を一致とする
+            search_ids, schedule_ids = map_to_class_ids(
+                surgery_equivalence or compile_equivalence_table({}), df_merged[search_col], df_merged[schedule_col]
+            )
+            matched = search_ids == schedule_ids
+            result = _comparison_result(matched, df_merged[schedule_col])
+            if surgery_similarity is not None:
+                # 一致しなかった行のうち、手術名が似ている行を類似とする
+                candidates = (
+                    ~matched & df_merged[search_col].notna().to_numpy() & df_merged[schedule_col].notna().to_numpy()
+                )
+                similar = surgery_similarity.find_similar(df_merged[search_col], df_merged[schedule_col], candidates)
+                result[similar] = SIMILAR_LABEL
+            df_merged[result_col] = result
+            continue
+
         # 予定が未入力の場合は'未入力'、それ以外は一致判定（True/False）
-        df_merged[result_col] = df_merged.apply(
-            lambda row: '未入力' if pd.isna(row[schedule_col])
-            else (row[search_col] == row[schedule_col]),
-            axis=1
-        )
+        if column in CATEGORICAL_COLUMNS:
+            matched = _codes_equal(df_merged[search_col], df_merged[schedule_col])
+        else:
+            matched = (df_merged[search_col] == df_merged[schedule_col]).to_numpy()
+        df_merged[result_col] = _comparison_result(matched, df_merged[schedule_col])
 
     output_columns = [
         '手術日', '患者ID', '氏名_検索', '入外_検索', '術眼_検索',
@@ -88,30 +360,241 @@ def compare_surgery_data(
         '手術_比較', '医師_比較', '麻酔_比較'
     ]
 
-    df_output = df_merged[output_columns + comparison_columns].copy()
-    df_output.columns = [
+    output_names = [
         '手術日', '患者ID', '氏名', '入外', '術眼',
         '手術', '医師', '麻酔', '術前',
         '手術日_比較', '入外_比較', '術眼_比較',
         '手術_比較', '医師_比較', '麻酔_比較'
     ]
 
-    df_output.to_csv(comparison_result, index=False, encoding='cp932')
+    if include_schedule_only:
+        # 予定表のみの行は、検索データの項目の代わりに予定表の値を出力する
+        schedule_only = df_merged[MATCH_COLUMN] == MATCH_LABELS['right_only']
+        for column in ['氏名', *COMPARE_COLUMNS]:
+            df_merged.loc[schedule_only, f'{column}_検索'] = df_merged.loc[schedule_only, f'{column}_予定']
+        comparison_columns = comparison_columns + [MATCH_COLUMN]
+        output_names = output_names + [MATCH_COLUMN]
+
+    # 列の選択で新しいDataFrameが作られるため、追加のコピーは不要
+    df_output = df_merged[output_columns + comparison_columns]
+    df_output.columns = output_names
+
+    return df_output
+
+
+def _count_comparison_results(df_output: pd.DataFrame) -> dict[str, list[int]]:
+    """比較項目ごとの一致・不一致・未入力・類似の件数を集計"""
+    counts = {}
+    for column in COMPARE_COLUMNS:
+        result_col = f'{column}_比較'
+        counts[column] = [
+            int((df_output[result_col] == True).sum()),
+            int((df_output[result_col] == False).sum()),
+            int((df_output[result_col] == '未入力').sum()),
+            int((df_output[result_col] == SIMILAR_LABEL).sum()),
+        ]
+    return counts
 
-    total_rows = len(df_output)
-    logging.info("=== 比較結果の詳細 ===")
 
-    for col in ['入外_比較', '術眼_比較', '手術_比較', '医師_比較', '麻酔_比較']:
-        true_count = (df_output[col] == True).sum()
-        false_count = (df_output[col] == False).sum()
-        not_entered_count = (df_output[col] == '未入力').sum()
+def _log_comparison_summary(counts: dict[str, list[int]], total_rows: int, comparison_result: str) -> None:
+    logging.info("=== 比較結果の詳細 ===")
 
-        logging.info(f"{col.replace('_比較', '')}: 一致={true_count}件, 不一致={false_count}件, 未入力={not_entered_count}件")
+    for column, (true_count, false_count, not_entered_count, similar_count) in counts.items():
+        message = f"{column}: 一致={true_count}件, 不一致={false_count}件, 未入力={not_entered_count}件"
+        if similar_count:
+            message += f", {SIMILAR_LABEL}={similar_count}件"
+        logging.info(message)
 
     logging.info(f"処理が完了しました: 総件数={total_rows}件")
     logging.info(f"出力ファイル: {comparison_result}")
 
 
+def _compare_by_month(
+        processed_surgery_search_data: str,
+        processed_surgery_schedule: str,
+        comparison_result: str,
+        surgery_equivalence: EquivalenceTable | None = None,
+        surgery_similarity: SurgerySimilarity | None = None
+) -> tuple[dict[str, list[int]], int]:
+    """手術月ごとに分割して比較し、結果を順に追記"""
+    counts = {column: [0, 0, 0, 0] for column in COMPARE_COLUMNS}
+    total_rows = 0
+
+    with create_partition_directory() as search_dir, create_partition_directory() as schedule_dir:
+        search_partitions = partition_csv_by_month(
+            processed_surgery_search_data, '手術日', search_dir, date_format='%Y/%m/%d'
+        )
+        schedule_partitions = dict(partition_csv_by_month(
+            processed_surgery_schedule, '手術日', schedule_dir, date_format='%Y/%m/%d'
+        ))
+
+        for index, (month, search_path) in enumerate(search_partitions):
+            logging.info(f"手術月 {month} を比較します")
+            df_search = _read_frame(search_path)
+            schedule_path = schedule_partitions.get(month)
+            if schedule_path is not None:
+                df_schedule = _read_frame(schedule_path)
+            else:
+                df_schedule = pd.DataFrame(columns=SCHEDULE_COLUMNS)
+
+            df_output = _compare_frames(
+                df_search, df_schedule,
+                surgery_equivalence=surgery_equivalence, surgery_similarity=surgery_similarity
+            )
+            df_output.to_csv(
+                comparison_result, index=False, encoding='cp932',
+                mode='w' if index == 0 else 'a', header=index == 0
+            )
+
+            for column, month_counts in _count_comparison_results(df_output).items():
+                counts[column] = [total + count for total, count in zip(counts[column], month_counts)]
+            total_rows += len(df_output)
+
+    if not search_partitions:
+        _compare_frames(
+            _read_frame(processed_surgery_search_data),
+            pd.DataFrame(columns=SCHEDULE_COLUMNS),
+            surgery_equivalence=surgery_equivalence,
+            surgery_similarity=surgery_similarity
+        ).to_csv(comparison_result, index=False, encoding='cp932')
+
+    return counts, total_rows
+
+
+def _date_keys(dates: pd.Series) -> pd.Series:
+    """手術日をYYYY/MM/DD形式の分割キーに変換（変換できない場合は欠損）"""
+    return pd.to_datetime(dates, errors='coerce').dt.strftime('%Y/%m/%d')
+
+
+def _compare_incremental(
+        processed_surgery_search_data: str,
+        processed_surgery_schedule: str,
+        cache_dir: str,
+        join_mode: str = 'left',
+        surgery_equivalence: EquivalenceTable | None = None,
+        surgery_similarity: SurgerySimilarity | None = None
+) -> pd.DataFrame:
+    """検索データ・予定表の行が変わった手術日だけを比較し、それ以外は前回の比較結果を使う"""
+    df_search = _read_frame(processed_surgery_search_data)
+    df_schedule = _read_frame(processed_surgery_schedule)
+
+    return run_partitioned(
+        PartitionCache(cache_dir, 'comparison'),
+        [(df_search, _date_keys(df_search['手術日'])), (df_schedule, _date_keys(df_schedule['手術日']))],
+        lambda search, schedule: _compare_frames(
+            search, schedule, join_mode=join_mode,
+            surgery_equivalence=surgery_equivalence, surgery_similarity=surgery_similarity
+        ),
+        '手術日',
+        # 結合方法・手術名のクラス・類似度の設定が変わると結果が変わるため、キャッシュを分ける
+        context=(
+            f"join_mode={join_mode}"
+            f"|equivalence={surgery_equivalence.digest if surgery_equivalence else ''}"
+            f"|similarity={surgery_similarity.digest if surgery_similarity else ''}"
+        )
+    )
+
+
+def _split_schedule_only(df_output: pd.DataFrame) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """外部結合の比較結果を、検索データの行と予定表のみの行に分ける"""
+    schedule_only = df_output[MATCH_COLUMN] == MATCH_LABELS['right_only']
+    return df_output[~schedule_only].drop(columns=MATCH_COLUMN), df_output.loc[schedule_only, SCHEDULE_COLUMNS]
+
+
+def compare_surgery_data(
+        processed_surgery_search_data: str,
+        processed_surgery_schedule: str,
+        comparison_result: str,
+        low_memory: bool = False,
+        memory_budget_mb: int = 0,
+        cache_dir: str = '',
+        date_tolerance_days: int = 0,
+        join_mode: str = 'left',
+        schedule_only_result: str = '',
+        surgery_equivalence: EquivalenceTable | None = None,
+        surgery_similarity: SurgerySimilarity | None = None
+) -> None:
+    """
+    眼科手術検索データと手術予定表を比較してCSV形式で出力
+
+    Args:
+        processed_surgery_search_data: 眼科手術検索データのCSVファイルパス（基準）
+        processed_surgery_schedule: 手術予定表のCSVファイルパス（比較対象）
+        comparison_result: 比較結果を出力するCSVファイルパス
+        low_memory: Trueの場合、推定ピークメモリがmemory_budget_mbを超えると手術月ごとに処理
+        memory_budget_mb: 低メモリモードでのメモリ予算（MB）
+        cache_dir: 指定した場合、手術日ごとの比較結果をキャッシュし、入力が変わった手術日だけを比較
+            （低メモリモードより優先）
+        date_tolerance_days: 1以上の場合、患者IDが同じで手術日が前後この日数以内の予定表の行と照合し、
+            手術日が異なる場合は手術日_比較をFalseとする（0の場合は手術日の完全一致）
+        join_mode: 'left'は検索データを基準に結合し、'outer'は1回の外部結合で予定表のみの手術も判定する
+        schedule_only_result: join_modeがouterの場合に予定表のみの手術を出力するCSVファイルパス
+            （未指定の場合は比較結果CSVの名前に_予定のみを付けたパス）
+        surgery_equivalence: 同じ手術として扱う手術名のクラス（指定した場合は手術をクラスIDで比較）
+        surgery_similarity: 指定した場合、一致しなかった手術のうち手術名が似ているものを手術_比較で類似とする
+
+    Raises:
+        ValueError: date_tolerance_daysが負の場合、またはjoin_modeが不正な場合
+    """
+    if date_tolerance_days < 0:
+        raise ValueError(f"手術日の許容日数が不正です: {date_tolerance_days}（0以上）")
+    if join_mode not in JOIN_MODES:
+        raise ValueError(f"結合方法が不正です: {join_mode}（{', '.join(JOIN_MODES)}のいずれか）")
+
+    peak_before = get_peak_memory_bytes() if low_memory else None
+    estimated_bytes = estimate_peak_bytes([processed_surgery_search_data, processed_surgery_schedule])
+
+    if date_tolerance_days > 0 and (cache_dir or low_memory):
+        # 手術日の前後を照合するため、手術日・手術月ごとに分割せずにまとめて比較する
+        logging.info("手術日の許容日数が指定されているため、手術日ごとに分割せずに比較します")
+        cache_dir = ''
+    # 手術月ごとの分割は検索データの手術月を基準とするため、検索データを基準とした完全一致の結合に限る
+    split_by_month = low_memory and date_tolerance_days == 0 and join_mode == 'left'
+
+    if cache_dir:
+        df_output = _compare_incremental(
+            processed_surgery_search_data, processed_surgery_schedule, cache_dir, join_mode,
+            surgery_equivalence, surgery_similarity
+        )
+    elif split_by_month and exceeds_budget(estimated_bytes, memory_budget_mb):
+        logging.info(f"推定ピークメモリがメモリ予算 {memory_budget_mb}MB を超えるため、手術月ごとに比較します")
+        counts, total_rows = _compare_by_month(
+            processed_surgery_search_data, processed_surgery_schedule, comparison_result,
+            surgery_equivalence, surgery_similarity
+        )
+        df_output = None
+    else:
+        df_search = _read_frame(processed_surgery_search_data)
+        df_schedule = _read_frame(processed_surgery_schedule)
+
+        df_output = _compare_frames(
+            df_search, df_schedule, date_tolerance_days, join_mode, surgery_equivalence, surgery_similarity
+        )
+
+    if df_output is not None:
+        if join_mode == 'outer':
+            df_output, df_schedule_only = _split_schedule_only(df_output)
+            schedule_only_result = schedule_only_result or get_schedule_only_path(comparison_result)
+            df_schedule_only.to_csv(schedule_only_result, index=False, encoding='cp932')
+            logging.info(f"予定表のみの手術: {len(df_schedule_only)}件")
+            logging.info(f"出力ファイル: {schedule_only_result}")
+
+        df_output.to_csv(comparison_result, index=False, encoding='cp932')
+        if date_tolerance_days > 0:
+            logging.info(f"手術日が異なる予定と照合した件数: {int((df_output['手術日_比較'] == False).sum())}件")
+
+        counts = _count_comparison_results(df_output)
+        total_rows = len(df_output)
+
+    if surgery_similarity is not None:
+        surgery_similarity.save()
+
+    _log_comparison_summary(counts, total_rows, comparison_result)
+
+    if low_memory:
+        log_memory_usage("データ比較", estimated_bytes, peak_before)
+
+
 if __name__ == '__main__':
     from utils.config_manager import load_config, get_paths
 
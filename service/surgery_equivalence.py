@@ -0,0 +1,139 @@
+import hashlib
+import re
+import unicodedata
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+
+# 手術名が欠損している場合のクラスID
+MISSING_CLASS_ID = -1
+
+
+def normalize_surgery_name(name: str) -> str:
+    """手術名の表記を揃える（全角・半角の統一と空白の除去）"""
+    return ''.join(unicodedata.normalize('NFKC', name).split())
+
+
+@dataclass(frozen=True)
+class EquivalenceTable:
+    """
+    同じ手術として扱う手術名のクラス
+
+    正規化した手術名からクラスIDへの辞書と、辞書に無い手術名に順に適用する正規表現を保持する。
+    作成後は変更しない。
+    """
+    class_ids: dict[str, int] = field(default_factory=dict)
+    patterns: tuple[tuple[re.Pattern, int], ...] = ()
+    canonical_names: tuple[str, ...] = ()
+
+    @property
+    def digest(self) -> str:
+        """表の内容のハッシュ（キャッシュした比較結果を使えるかの判定用）"""
+        content = repr((sorted(self.class_ids.items()), [(p.pattern, i) for p, i in self.patterns]))
+        return hashlib.sha1(content.encode('utf-8')).hexdigest()
+
+    def class_id(self, name: str) -> int | None:
+        """手術名のクラスID（どのクラスにも含まれない場合はNone）"""
+        normalized = normalize_surgery_name(name)
+        class_id = self.class_ids.get(normalized)
+        if class_id is not None:
+            return class_id
+        for pattern, pattern_class_id in self.patterns:
+            if pattern.search(normalized):
+                return pattern_class_id
+        return None
+
+
+def compile_equivalence_table(
+        classes: dict[str, list[str]],
+        patterns: list[tuple[str, str]] | None = None
+) -> EquivalenceTable:
+    """
+    代表名と別名の対応・正規表現から、正規化した手術名とクラスIDの辞書を作成
+
+    Args:
+        classes: 代表名と別名のリストの辞書
+        patterns: (代表名, 正規表現) のリスト。辞書に無い手術名に順に適用する
+
+    Returns:
+        手術名のクラス
+
+    Raises:
+        ValueError: 同じ手術名が複数のクラスに含まれる場合、または正規表現が不正な場合
+    """
+    class_ids: dict[str, int] = {}
+    canonical_ids: dict[str, int] = {}
+
+    def canonical_id(canonical: str) -> int:
+        normalized = normalize_surgery_name(canonical)
+        if normalized not in canonical_ids:
+            canonical_ids[normalized] = len(canonical_ids)
+        return canonical_ids[normalized]
+
+    for canonical, aliases in classes.items():
+        class_id = canonical_id(canonical)
+        for name in [canonical, *aliases]:
+            normalized = normalize_surgery_name(name)
+            if class_ids.get(normalized, class_id) != class_id:
+                raise ValueError(f"手術名が複数のクラスに含まれています: {name}")
+            class_ids[normalized] = class_id
+
+    compiled_patterns = []
+    for canonical, pattern in patterns or []:
+        try:
+            compiled_patterns.append((re.compile(pattern), canonical_id(canonical)))
+        except re.error as e:
+            raise ValueError(f"手術名の正規表現が不正です: {pattern}: {str(e)}") from e
+
+    # 代表名しか無いクラスも代表名で照合できるようにする
+    for normalized, class_id in canonical_ids.items():
+        class_ids.setdefault(normalized, class_id)
+
+    return EquivalenceTable(
+        class_ids=class_ids,
+        patterns=tuple(compiled_patterns),
+        canonical_names=tuple(canonical_ids),
+    )
+
+
+def map_to_class_ids(table: EquivalenceTable, *values: pd.Series) -> list[np.ndarray]:
+    """
+    複数の手術名の列を、共通のクラスIDの整数配列に変換
+
+    すべての列の値をまとめて一意な値に分解し、一意な値ごとに一度だけクラスを判定してから
+    配列の参照で各行に展開する。どのクラスにも含まれない手術名は、正規化した名前ごとに
+    クラスと重ならないIDを割り当てるため、IDが等しいことと同じ手術であることが一致する。
+
+    Args:
+        table: 手術名のクラス
+        *values: 手術名の列
+
+    Returns:
+        列ごとのクラスIDの配列（欠損はMISSING_CLASS_ID）
+    """
+    combined = pd.concat([series.reset_index(drop=True) for series in values], ignore_index=True)
+    codes, uniques = pd.factorize(combined)
+
+    unknown_ids: dict[str, int] = {}
+    next_id = len(table.canonical_names)
+    unique_ids = np.empty(len(uniques), dtype='int64')
+    for index, name in enumerate(uniques):
+        class_id = table.class_id(str(name))
+        if class_id is None:
+            normalized = normalize_surgery_name(str(name))
+            if normalized not in unknown_ids:
+                unknown_ids[normalized] = next_id
+                next_id += 1
+            class_id = unknown_ids[normalized]
+        unique_ids[index] = class_id
+
+    # 欠損のコード（-1）は末尾に加えたMISSING_CLASS_IDを参照する
+    ids = np.append(unique_ids, MISSING_CLASS_ID)[codes]
+
+    results = []
+    start = 0
+    for series in values:
+        results.append(ids[start:start + len(series)])
+        start += len(series)
+    return results
@@ -1,73 +1,189 @@
 import logging
+import os
 from datetime import datetime
 from pathlib import Path
+from typing import Callable, Sequence
 
 import pandas as pd
-from openpyxl import load_workbook
 
-
-def surgery_error_extractor(comparison_result: str, output_path: str, template_path: str) -> str:
+from service.report_writers import (
+    REPORT_FORMATS,
+    STREAMING_ROW_THRESHOLD,
+    ExtraSheet,
+    ReportData,
+    WriterResult,
+    iter_report_rows,
+    render_report_rows,
+    write_reports,
+)
+from service.result_store import find_changed_rows, update_report_state
+from service.surgery_similarity import SIMILAR_LABEL
+
+REPORT_MODES = ('full', 'delta')
+# 予定表のみの手術を出力するxlsxのシート名
+SCHEDULE_ONLY_SHEET_TITLE = '予定のみ'
+# 術式を術眼と手術に分割できなかった予定表の行を出力するxlsxのシート名
+PARSE_ERROR_SHEET_TITLE = '術式エラー'
+
+# 出力形式ごとのファイル名の接頭辞と拡張子
+OUTPUT_FILE_NAMES = {
+    'xlsx': ('眼科手術指示確認', '.xlsx'),
+    'csv': ('眼科手術指示確認', '.csv'),
+    'html': ('眼科手術指示確認', '.html'),
+    'comparison': ('比較結果', '.csv'),
+}
+
+
+def _read_extra_sheet(csv_path: str, title: str, description: str) -> ExtraSheet | None:
+    """CSVファイルの行を別シートとして読み込む（ファイルが無い場合・行が無い場合はNone）"""
+    if not csv_path or not os.path.exists(csv_path):
+        return None
+    df = pd.read_csv(csv_path, encoding='cp932')
+    if len(df) == 0:
+        return None
+    logging.info(f"{description} {len(df)}件 を「{title}」シートに出力します")
+    return ExtraSheet(title=title, header=tuple(df.columns), rows=render_report_rows(df))
+
+
+def surgery_error_extractor(
+        comparison_result: str,
+        output_path: str,
+        template_path: str,
+        streaming_row_threshold: int = STREAMING_ROW_THRESHOLD,
+        output_formats: Sequence[str] = ('xlsx',),
+        csv_encoding: str = 'cp932',
+        on_writer_done: Callable[[WriterResult], None] | None = None,
+        report_mode: str = 'full',
+        state_db_path: str = '',
+        schedule_only_result: str = '',
+        parse_error_result: str = '',
+        on_unchanged_errors: Callable[[int], None] | None = None
+) -> str:
     """
-    comparison_resultからFALSEまたは未入力が含まれる行を抽出し眼科手術指示確認.xlsxとして出力
+    comparison_resultからFALSEまたは未入力が含まれる行を抽出し眼科手術指示確認ファイル（xlsx・csv・html）として出力
+
+    複数の形式を指定した場合は、変換済みの抽出結果を共有して順に書き込む。
 
     Args:
         comparison_result: 比較結果CSVファイルのパス
         output_path: 出力先ディレクトリのパス
         template_path: テンプレートExcelファイルのパス
+        streaming_row_threshold: この行数を超える場合は書き込み専用モードで逐次出力
+        output_formats: 出力形式（xlsx、csv、html、comparison）のリスト
+        csv_encoding: CSV出力の文字コード（cp932またはutf-8-sig）
+        on_writer_done: 出力形式ごとの結果を受け取る関数（すべての書き込み後に呼び出し元のスレッドで呼ぶ）
+        report_mode: 'full'ならすべての不一致・未入力、'delta'なら前回から新規・変更された行のみ出力
+        state_db_path: 前回の不一致・未入力の状態を保存する結果データベースのパス（空なら保存しない）
+        schedule_only_result: 予定表のみの手術のCSVファイルパス（指定した場合はxlsxの別シートに出力）
+        parse_error_result: 術式を分割できなかった予定表の行のCSVファイルパス（指定した場合はxlsxの別シートに出力）
+        on_unchanged_errors: 差分出力で出力する行が無く、前回から変化の無い不一致・未入力だけがある場合に件数を受け取る関数
 
     Returns:
-        生成されたファイルのパス
+        生成されたファイルのパス（複数形式の場合は最初に成功した形式のファイル）
+
+    Raises:
+        RuntimeError: すべての形式の出力に失敗した場合（前回の状態は更新しない）
     """
+    unknown_formats = [fmt for fmt in output_formats if fmt not in REPORT_FORMATS]
+    if unknown_formats or not output_formats:
+        raise ValueError(
+            f"出力形式が不正です: {', '.join(unknown_formats) or '未指定'}（{', '.join(REPORT_FORMATS)}のいずれか）"
+        )
+    if report_mode not in REPORT_MODES:
+        raise ValueError(f"出力モードが不正です: {report_mode}（{', '.join(REPORT_MODES)}のいずれか）")
+    if report_mode == 'delta' and not state_db_path:
+        raise ValueError("差分出力には結果データベースのパスが必要です")
+
     df = pd.read_csv(comparison_result, encoding='cp932')
     comparison_cols = ['入外_比較', '術眼_比較', '手術_比較', '医師_比較', '麻酔_比較']
 
-    # FALSEまたは「未入力」が含まれる行を抽出
+    # FALSEまたは「未入力」が含まれる行を抽出（手術名が「類似」の行も確認のため抽出）
     mask = pd.Series([False] * len(df))
     for col in comparison_cols:
-        mask |= (df[col] == False) | (df[col] == '未入力')
+        mask |= (df[col] == False) | (df[col] == '未入力') | (df[col] == SIMILAR_LABEL)
+    # 手術日の許容日数を指定した場合、手術日が異なる予定と照合した行も抽出
+    if '手術日_比較' in df.columns:
+        mask |= df['手術日_比較'].isin([False, 'False'])
 
     df_errors = df[mask]
+    # 出力に失敗した行が次回の差分出力で変化無しとされないよう、状態は出力の成功後に保存する
+    df_all_errors = df_errors
+
+    unchanged_count = 0
+    if report_mode == 'delta':
+        changed = find_changed_rows(state_db_path, df_errors)
+        unchanged_count = int((~changed).sum())
+        logging.info(f"前回から変化の無い不一致・未入力 {unchanged_count}件 を除外しました")
+        df_errors = df_errors[changed]
+
+    extra_sheets = tuple(
+        sheet for sheet in (
+            _read_extra_sheet(schedule_only_result, SCHEDULE_ONLY_SHEET_TITLE, "予定表のみの手術"),
+            _read_extra_sheet(parse_error_result, PARSE_ERROR_SHEET_TITLE, "術式を分割できなかった予定表の行"),
+        )
+        if sheet is not None
+    )
 
-    if len(df_errors) == 0:
-        logging.info("不一致および未入力はありませんでした")
+    if len(df_errors) == 0 and not extra_sheets:
+        if state_db_path:
+            update_report_state(state_db_path, df, df_all_errors)
+        if unchanged_count > 0:
+            logging.info(f"前回から新規・変更された不一致・未入力はありませんでした（変化の無い不一致・未入力 {unchanged_count}件）")
+            if on_unchanged_errors is not None:
+                on_unchanged_errors(unchanged_count)
+        else:
+            logging.info("不一致および未入力はありませんでした")
         return ""
 
     output_columns = ['手術日', '患者ID', '氏名', '入外', '術眼', '手術', '医師', '麻酔', '術前','入外_比較', '術眼_比較', '手術_比較', '医師_比較', '麻酔_比較']
-    df_output = df_errors[output_columns].copy()
+    # 列の選択で新しいDataFrameが作られ、以降は読み取るだけなのでコピーは不要
+    df_output = df_errors[output_columns]
 
     Path(output_path).mkdir(parents=True, exist_ok=True)
 
     timestamp = datetime.now().strftime('%Y%m%d_%H%M')
-    output_filename = f'眼科手術指示確認{timestamp}.xlsx'
-    output_filepath = Path(output_path) / output_filename
-
-    wb = load_workbook(template_path)
-    ws = wb.active
-
-    for row_idx, (_, row_data) in enumerate(df_output.iterrows(), start=2):
-        for col_idx, value in enumerate(row_data, start=1):
-            if ws is not None:
-                # 手術日列（1列目）をdatetimeオブジェクトに変換してテンプレートの書式を反映
-                if col_idx == 1 and pd.notna(value):
-                    try:
-                        value = datetime.strptime(str(value), '%Y/%m/%d')
-                    except (ValueError, TypeError):
-                        pass
+    targets = {}
+    for output_format in output_formats:
+        prefix, suffix = OUTPUT_FILE_NAMES[output_format]
+        targets[output_format] = str(Path(output_path) / f'{prefix}{timestamp}{suffix}')
+
+    # 複数形式で出力する場合は、行の変換を一度だけ行って各形式で共有する
+    if len(targets) > 1:
+        rows = render_report_rows(df_output)
+    else:
+        rows = iter_report_rows(df_output)
+
+    report = ReportData(
+        header=tuple(df_output.columns),
+        rows=rows,
+        row_count=len(df_output),
+        df_comparison=df if 'comparison' in targets else None,
+        extra_sheets=extra_sheets,
+    )
+    results = write_reports(
+        report, targets, template_path,
+        streaming_row_threshold=streaming_row_threshold,
+        csv_encoding=csv_encoding
+    )
 
-                if value is True or value == 'True':
-                    value = '一致'
-                elif value is False or value == 'False':
-                    value = '不一致'
+    if on_writer_done is not None:
+        for result in results:
+            on_writer_done(result)
 
-                ws.cell(row=row_idx, column=col_idx).value = value
+    succeeded = [result for result in results if result.succeeded]
+    if not succeeded:
+        errors = ', '.join(f"{result.output_format}: {result.error}" for result in results)
+        raise RuntimeError(f"眼科手術指示確認ファイルを出力できませんでした（{errors}）")
 
-    wb.save(output_filepath)
+    if state_db_path:
+        update_report_state(state_db_path, df, df_all_errors)
 
     logging.info(f"眼科手術指示確認ファイルの作成が完了しました")
     logging.info(f"エラー件数: {len(df_errors)}件")
-    logging.info(f"出力ファイル: {output_filepath}")
+    for result in succeeded:
+        logging.info(f"出力ファイル: {result.output_filepath}")
 
-    return str(output_filepath)
+    return succeeded[0].output_filepath
 
 
 if __name__ == '__main__':
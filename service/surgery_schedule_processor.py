@@ -1,59 +1,275 @@
 import logging
+import os
+import re
 import unicodedata
 from typing import Mapping
 
+import numpy as np
+import openpyxl
 import pandas as pd
+import xlrd
 
+from service.input_schema import InputSchema, SchemaValidationError, read_worksheet_header, read_xls_sheet_header
+from service.normalization import NormalizationRules, normalize_frame
+from service.replacement_engine import map_unique_values
+from utils.memory_budget import estimate_peak_bytes, get_peak_memory_bytes, log_memory_usage
 
-def process_surgery_schedule(surgery_schedule: str, processed_surgery_schedule: str, sheet_name: str = '南館2') -> None:
+REQUIRED_COLUMNS = ['日付', 'ID', '氏名', '入外', '術式', '麻酔', '術者']
+INPUT_SCHEMA = InputSchema('手術予定表', tuple(REQUIRED_COLUMNS))
+SHEET_COLUMN = 'シート'
+# 見出しの行（0始まり、1行目はタイトル）
+HEADER_ROW = 1
+# 術式（例: R)白内障手術）を最初の閉じ括弧で術眼と手術に分ける。前後の空白は含めない
+SURGERY_FIELD_PATTERN = re.compile(r'^\s*(?P<術眼>[^)]*?)\s*\)\s*(?P<手術>.*?)\s*$', re.DOTALL)
+# 術式を分割できなかった行のCSVファイル名に付ける接尾辞と、出力する列
+PARSE_ERROR_SUFFIX = '_術式エラー'
+PARSE_ERROR_COLUMNS = [SHEET_COLUMN, '行', '手術日', '患者ID', '氏名', '術式']
+# 予定表のデータの1行目のExcelの行番号（read_excelは空の行も残すため、行の位置にこの値を足すとExcelの行番号になる）
+FIRST_DATA_ROW = HEADER_ROW + 2
+MAX_LOGGED_PARSE_ERRORS = 20
+
+
+def _resolve_sheet_names(
+        sheet_names: list[str],
+        sheet_name: str | list[str] | None,
+        sheet_pattern: str
+) -> list[str]:
+    """処理対象のシート名を決定"""
+    if isinstance(sheet_name, str):
+        return [sheet_name]
+    if sheet_name:
+        return list(sheet_name)
+
+    pattern = re.compile(sheet_pattern) if sheet_pattern else None
+    return [name for name in sheet_names if pattern is None or pattern.search(name)]
+
+
+def _target_sheets(
+        sheet_names: list,
+        surgery_schedule: str,
+        sheet_name: str | list[str] | None,
+        sheet_pattern: str
+) -> list[str]:
+    """ブックに含まれる処理対象のシート名（対象シートが無い場合はSchemaValidationError）"""
+    available_sheets = [str(name) for name in sheet_names]
+    target_sheets = _resolve_sheet_names(available_sheets, sheet_name, sheet_pattern)
+
+    missing_sheets = [name for name in target_sheets if name not in available_sheets]
+    if missing_sheets:
+        raise SchemaValidationError(f"手術予定表にシートが見つかりません: {', '.join(missing_sheets)}")
+    if not target_sheets:
+        raise SchemaValidationError(f"手術予定表に対象シートがありません: {surgery_schedule}")
+    return target_sheets
+
+
+def validate_surgery_schedule(
+        surgery_schedule: str,
+        sheet_name: str | list[str] | None = '南館2',
+        sheet_pattern: str = ''
+) -> None:
     """
-    手術予定表を処理してCSV形式で出力
+    対象シートの見出し行だけを読み込み、必要な列があるか確認
+
+    xlsx形式のブックは読み取り専用で開き、各シートの見出し行のセルだけを読み込む。
+    xls形式のブックはシートを必要になるまで読み込まない設定で開き、対象シートだけを読み込む。
 
     Args:
         surgery_schedule: 入力Excelファイルのパス
-        processed_surgery_schedule: 出力CSVファイルのパス
-        sheet_name: 処理対象のシート名（デフォルト: '南館2'）
+        sheet_name: 処理対象のシート名またはそのリスト（process_surgery_scheduleと同じ）
+        sheet_pattern: sheet_nameがNoneの場合に使うシート名の正規表現
+
+    Raises:
+        SchemaValidationError: 対象シートが無い場合、または必要な列が不足している場合
     """
-    df = pd.read_excel(surgery_schedule, sheet_name=sheet_name, header=1)
+    if os.path.splitext(surgery_schedule)[1].lower() == '.xls':
+        book = xlrd.open_workbook(surgery_schedule, on_demand=True)
+        try:
+            headers = {
+                name: read_xls_sheet_header(book.sheet_by_name(name), HEADER_ROW)
+                for name in _target_sheets(book.sheet_names(), surgery_schedule, sheet_name, sheet_pattern)
+            }
+        finally:
+            book.release_resources()
+    else:
+        workbook = openpyxl.load_workbook(surgery_schedule, read_only=True, data_only=True)
+        try:
+            headers = {
+                name: read_worksheet_header(workbook[name], HEADER_ROW)
+                for name in _target_sheets(workbook.sheetnames, surgery_schedule, sheet_name, sheet_pattern)
+            }
+        finally:
+            workbook.close()
+
+    for name, columns in headers.items():
+        INPUT_SCHEMA.validate(columns, f"{surgery_schedule}（シート: {name}）")
+
+
+def get_parse_error_path(processed_surgery_schedule: str) -> str:
+    """術式を分割できなかった行を出力するCSVファイルのパス（処理済みの予定表と同じディレクトリ）"""
+    root, ext = os.path.splitext(processed_surgery_schedule)
+    return f'{root}{PARSE_ERROR_SUFFIX}{ext}'
+
+
+def split_surgery_field(surgery: pd.Series) -> tuple[pd.DataFrame, pd.Series]:
+    """
+    術式を術眼と手術に分割
+
+    1つの正規表現で術眼と手術を同時に取り出す（一意な術式ごとに一度だけ照合）。閉じ括弧が無い術式は分割できないため、
+    術眼を欠損、手術を術式全体とし、その行を分割できなかった行として返す。
+
+    Args:
+        surgery: 術式の列
+
+    Returns:
+        術眼・手術の列のDataFrameと、分割できなかった行をTrueとする列
+    """
+    # 同じ術式が多いため、一意な術式ごとに一度だけ抽出して各行に展開する
+    codes, uniques = pd.factorize(surgery)
+    unique_surgery = pd.Series(uniques, dtype=object)
+    unique_parts = unique_surgery.str.extract(SURGERY_FIELD_PATTERN)
+    unique_unparsed = unique_parts['術眼'].isna().to_numpy()
+    unique_parts.loc[unique_unparsed, '手術'] = unique_surgery[unique_unparsed].str.strip()
+
+    # 欠損の行（コード-1）は末尾の欠損の行を参照する
+    values = np.vstack([unique_parts.to_numpy(dtype=object), [[np.nan, np.nan]]])
+    parts = pd.DataFrame(values[codes], index=surgery.index, columns=unique_parts.columns)
+    unparsed = pd.Series(np.append(unique_unparsed, False)[codes], index=surgery.index)
+    return parts, unparsed
 
-    required_columns = ['日付', 'ID', '氏名', '入外', '術式', '麻酔', '術者']
-    df_processed = df[required_columns].copy()
+
+def _process_sheet(
+        excel_file: pd.ExcelFile,
+        sheet_name: str,
+        low_memory: bool = False
+) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """1シート分の手術予定表を整形し、術式が空欄の行・術式を分割できなかった行とともに返す"""
+    if low_memory:
+        # 必要な列だけを読み込み、列選択のコピーを省く
+        df_processed = excel_file.parse(sheet_name=sheet_name, header=HEADER_ROW, usecols=REQUIRED_COLUMNS)
+    else:
+        df = excel_file.parse(sheet_name=sheet_name, header=HEADER_ROW)
+        df_processed = df[REQUIRED_COLUMNS].copy()
 
     date_series = df_processed['日付']
     df_processed['日付'] = pd.to_datetime(date_series).dt.strftime('%Y/%m/%d')
 
-    # 術式列の値を全角カナに変換
-    surgery_series = df_processed['術式']
-    df_processed['術式'] = surgery_series.apply(
-        lambda x: unicodedata.normalize('NFKC', str(x)) if pd.notna(x) else x
+    # 術式列の値を全角カナに変換（一意な値ごとに一度だけ処理）
+    surgery_series = map_unique_values(
+        df_processed['術式'], lambda value: unicodedata.normalize('NFKC', str(value))
     )
 
-    split_series = df_processed['術式']
-    df_processed[['術眼', '手術']] = split_series.str.split(')', n=1, expand=True)
-    hand_series = df_processed['手術']
-    df_processed['手術'] = hand_series.str.strip()
+    parts, unparsed = split_surgery_field(surgery_series)
+    df_processed['術眼'] = parts['術眼']
+    df_processed['手術'] = parts['手術']
+
+    # 日付か患者IDが入力されているのに術式が空欄の行も、術式を分割できなかった行として扱う
+    empty_surgery = surgery_series.isna() & df_processed[['日付', 'ID']].notna().any(axis=1)
+    errors = (unparsed | empty_surgery).to_numpy()
+
+    # 行の位置（空の行を含む）からExcelの行番号を求める
+    row_numbers = np.arange(len(df_processed)) + FIRST_DATA_ROW
+    df_parse_errors = pd.DataFrame({
+        SHEET_COLUMN: sheet_name,
+        '行': row_numbers[errors],
+        '手術日': df_processed['日付'].to_numpy()[errors],
+        '患者ID': df_processed['ID'].to_numpy()[errors],
+        '氏名': df_processed['氏名'].to_numpy()[errors],
+        '術式': surgery_series.to_numpy()[errors],
+    }, columns=PARSE_ERROR_COLUMNS)
 
     df_processed = df_processed.drop(columns=['術式'])
+    df_processed[SHEET_COLUMN] = sheet_name
+
+    return df_processed, df_parse_errors
+
+
+def _log_parse_errors(df_parse_errors: pd.DataFrame) -> None:
+    """術式が空欄の行・術式を分割できなかった行をログに出力"""
+    logging.warning(
+        f"術式が空欄、または術眼と手術に分割できない行が {len(df_parse_errors)}件 あります。"
+        "分割できない術式は術眼を未入力、手術を術式全体として比較します"
+    )
+    for row in df_parse_errors.head(MAX_LOGGED_PARSE_ERRORS).itertuples(index=False):
+        logging.warning(f"  {row[0]} {row[1]}行目 {row[2]} 患者ID={row[3]}: {row[5]}")
+    if len(df_parse_errors) > MAX_LOGGED_PARSE_ERRORS:
+        logging.warning(f"  ほか {len(df_parse_errors) - MAX_LOGGED_PARSE_ERRORS}件")
+
+
+def process_surgery_schedule(
+        surgery_schedule: str,
+        processed_surgery_schedule: str,
+        sheet_name: str | list[str] | None = '南館2',
+        sheet_pattern: str = '',
+        low_memory: bool = False,
+        normalization: NormalizationRules | None = None,
+        parse_error_result: str = ''
+) -> None:
+    """
+    手術予定表を処理してCSV形式で出力
+
+    ブックは一度だけ開き、対象シートを順に処理して結合する。
+    術式が空欄の行（日付か患者IDがある行）と術式を術眼と手術に分割できなかった行はログに出力し、
+    Excelの行番号とともに別のCSVファイルに書き出す。
+
+    Args:
+        surgery_schedule: 入力Excelファイルのパス
+        processed_surgery_schedule: 出力CSVファイルのパス
+        sheet_name: 処理対象のシート名またはそのリスト（デフォルト: '南館2'）。
+            Noneの場合はsheet_patternに一致するすべてのシートを処理
+        sheet_pattern: sheet_nameがNoneの場合に使うシート名の正規表現（空なら全シート）
+        low_memory: Trueの場合、必要な列だけを読み込んで中間コピーを省く
+        normalization: 指定した場合、手術検索データと同じルールで置換・手術の文字列削除・
+            除外キーワードの行削除・手術の全角カナ変換を行う
+        parse_error_result: 術式が空欄の行・術式を分割できなかった行を出力するCSVファイルのパス
+            （空の場合は処理済みの予定表のファイル名に_術式エラーを付けたパス）
+    """
+    peak_before = get_peak_memory_bytes() if low_memory else None
+
+    with pd.ExcelFile(surgery_schedule) as excel_file:
+        target_sheets = _target_sheets(excel_file.sheet_names, surgery_schedule, sheet_name, sheet_pattern)
+        logging.info(f"手術予定表の対象シート: {', '.join(target_sheets)}")
+
+        # ExcelFileのブックはスレッド間で共有できないため、シートは順に読み込む
+        results = [_process_sheet(excel_file, name, low_memory) for name in target_sheets]
+
+    df_processed = pd.concat([frame for frame, _ in results], ignore_index=True)
+
+    # 前回の実行の結果が残らないよう、分割できない行が無い場合も見出しだけのファイルを出力する
+    df_parse_errors = pd.concat([parse_errors for _, parse_errors in results], ignore_index=True)
+    if len(df_parse_errors) > 0:
+        _log_parse_errors(df_parse_errors)
+    df_parse_errors.to_csv(
+        parse_error_result or get_parse_error_path(processed_surgery_schedule), index=False, encoding='cp932'
+    )
 
     rename_mapping: Mapping[str, str] = {'日付': '手術日', 'ID': '患者ID', '術者': '医師'}
     df_processed = df_processed.rename(columns=rename_mapping)
 
-    df_processed = df_processed[['手術日', '患者ID', '氏名', '入外', '術眼', '手術', '医師', '麻酔']]
+    if normalization is not None:
+        df_processed = normalize_frame(df_processed, normalization)
+
+    # 出力はCSVのため型は保たれない（比較項目は比較処理で読み込むときにカテゴリ型にする）
+    df_processed = df_processed[['手術日', '患者ID', '氏名', '入外', '術眼', '手術', '医師', '麻酔', SHEET_COLUMN]]
 
     df_processed = df_processed.sort_values(by=['手術日', '患者ID'])
 
     df_processed.to_csv(processed_surgery_schedule, index=False, encoding='cp932')
 
     logging.info(f"手術予定表の処理が完了しました: {processed_surgery_schedule}")
+    if low_memory:
+        log_memory_usage("手術予定表の処理", estimate_peak_bytes([surgery_schedule]), peak_before)
 
 
 if __name__ == '__main__':
-    from utils.config_manager import load_config, get_paths
+    from utils.config_manager import get_paths, get_schedule_settings, load_config
 
     config = load_config()
     paths = get_paths(config)
+    schedule_settings = get_schedule_settings(config)
 
     process_surgery_schedule(
         paths['surgery_schedule'],
-        paths['processed_surgery_schedule']
+        paths['processed_surgery_schedule'],
+        sheet_name=schedule_settings['sheet_names'] or None,
+        sheet_pattern=schedule_settings['sheet_pattern']
     )
@@ -1,9 +1,12 @@
 import configparser
+import json
 import logging
-import unicodedata
 
 import pandas as pd
 
+from service.input_schema import InputSchema, read_csv_header
+from service.normalization import NormalizationRules, normalization_steps
+from service.replacement_engine import REPLACEMENT_KEYS, compile_replacements
 from utils.config_manager import (
     get_exclusion_line_keywords,
     get_paths,
@@ -11,6 +14,26 @@ from utils.config_manager import (
     get_surgery_strings_to_remove,
     load_config,
 )
+from utils.memory_budget import (
+    create_partition_directory,
+    downcast_numeric_columns,
+    estimate_peak_bytes,
+    exceeds_budget,
+    get_peak_memory_bytes,
+    log_memory_usage,
+    partition_csv_by_month,
+)
+from utils.partition_cache import PartitionCache, run_partitioned
+from utils.step_plan import Step, order_steps, run_steps
+
+REQUIRED_COLUMNS = [
+    '手術日', '患者ID', '氏名', '手術', '医師',
+    '麻酔', '病名', '入外', '右', '左', '術前'
+]
+INPUT_SCHEMA = InputSchema('手術検索データ', tuple(REQUIRED_COLUMNS))
+OUTPUT_COLUMNS = ['手術日', '患者ID', '氏名', '入外', '術眼', '手術', '医師', '麻酔', '術前']
+# 低メモリモードで読み込み時にカテゴリ型にする列（記号のみで値の種類が少ない）
+LOW_MEMORY_DTYPES = {'右': 'category', '左': 'category'}
 
 
 def _determine_eye_side(row: pd.Series) -> str:
@@ -28,13 +51,23 @@ def _determine_eye_side(row: pd.Series) -> str:
         return ''
 
 
-def _select_required_columns(df: pd.DataFrame) -> pd.DataFrame:
+def validate_search_data(input_file_path: str) -> None:
+    """
+    見出し行だけを読み込み、文字コードと必要な列を確認
+
+    Raises:
+        SchemaValidationError: cp932で読み込めない場合、または必要な列が不足している場合
+    """
+    INPUT_SCHEMA.validate(read_csv_header(input_file_path, INPUT_SCHEMA.name), input_file_path)
+
+
+def _select_required_columns(df: pd.DataFrame, copy: bool = True) -> pd.DataFrame:
     """必要な列を選択"""
-    required_columns = [
-        '手術日', '患者ID', '氏名', '手術', '医師',
-        '麻酔', '病名', '入外', '右', '左', '術前'
-    ]
-    result = df[required_columns].copy()
+    # usecolsで必要な列だけを読み込んだ場合はコピーを作らずにそのまま使う
+    if not copy and set(df.columns) == set(REQUIRED_COLUMNS):
+        return df
+
+    result = df[REQUIRED_COLUMNS].copy()
     if not isinstance(result, pd.DataFrame):
         raise TypeError('Expected DataFrame')
     return result
@@ -46,52 +79,17 @@ def _convert_surgery_date_format(df: pd.DataFrame) -> pd.DataFrame:
     return df
 
 
-def _apply_replacements(df: pd.DataFrame, config: configparser.ConfigParser) -> pd.DataFrame:
-    """麻酔、術者、入外の値を置換"""
-    anesthesia_replacements = get_replacement_dict(config, 'Replacements', 'anesthesia_replacements')
-    df['麻酔'] = df['麻酔'].map(
-        lambda x: anesthesia_replacements.get(x, x) if pd.notna(x) else x
-    )
-
-    surgeon_replacements = get_replacement_dict(config, 'Replacements', 'surgeon_replacements')
-    df['医師'] = df['医師'].replace(surgeon_replacements)
-
-    inpatient_replacements = get_replacement_dict(config, 'Replacements', 'inpatient_replacements')
-    df['入外'] = df['入外'].map(
-        lambda x: inpatient_replacements.get(x, x) if pd.notna(x) else x
-    )
-
-    return df
-
-
-def _remove_surgery_strings(df: pd.DataFrame, config: configparser.ConfigParser) -> pd.DataFrame:
-    """手術列から特定の文字列を削除"""
-    surgery_strings_to_remove = get_surgery_strings_to_remove(config)
-    for string in surgery_strings_to_remove:
-        df['手術'] = df['手術'].str.replace(string, '', regex=False)
-    return df
-
-
-def _filter_exclusion_keywords(df: pd.DataFrame, config: configparser.ConfigParser) -> pd.DataFrame:
-    """氏名列または手術列で特定の文字列が含まれている行を削除"""
-    exclusion_line_keywords = get_exclusion_line_keywords(config)
-    columns_to_filter = ['氏名', '手術']
-
-    for column in columns_to_filter:
-        for keyword in exclusion_line_keywords:
-            result = df[~df[column].str.contains(keyword, na=False)]
-            if isinstance(result, pd.DataFrame):
-                df = result
-
-    return df
-
-
-def _normalize_surgery_text(df: pd.DataFrame) -> pd.DataFrame:
-    """手術列の値を全角カナに変換"""
-    df['手術'] = df['手術'].apply(
-        lambda x: unicodedata.normalize('NFKC', x) if pd.notna(x) else x
+def build_normalization_rules(config: configparser.ConfigParser) -> NormalizationRules:
+    """置換項目・除外項目ファイルのルールをコンパイル（手術予定表の正規化にも使う）"""
+    replacements = compile_replacements({
+        column: get_replacement_dict(config, 'Replacements', key)
+        for column, key in REPLACEMENT_KEYS.items()
+    })
+    return NormalizationRules(
+        replacements=replacements,
+        surgery_strings_to_remove=tuple(get_surgery_strings_to_remove(config)),
+        exclusion_keywords=tuple(get_exclusion_line_keywords(config)),
     )
-    return df
 
 
 def _create_eye_side_column(df: pd.DataFrame) -> pd.DataFrame:
@@ -119,35 +117,142 @@ def _handle_duplicates(df: pd.DataFrame) -> pd.DataFrame:
 
 def _reorder_and_sort(df: pd.DataFrame) -> pd.DataFrame:
     """列の順番を並び替えてソート"""
-    column_order = ['手術日', '患者ID', '氏名', '入外', '術眼', '手術', '医師', '麻酔', '術前']
-    df = df[column_order]
+    df = df[OUTPUT_COLUMNS]
     df = df.sort_values(by=['手術日', '患者ID'])
     return df
 
 
-def process_eye_surgery_data(input_file_path: str, output_file_path: str) -> None:
+def search_steps(rules: NormalizationRules) -> list[Step]:
+    """手術検索データの処理と、各処理が読み書きする列（宣言順は処理の意味上の順序）"""
+    return [
+        Step('手術日の変換', _convert_surgery_date_format, frozenset({'手術日'}), frozenset({'手術日'})),
+        *normalization_steps(rules),
+        Step('術眼の作成', _create_eye_side_column, frozenset({'右', '左'}), frozenset({'術眼'})),
+        Step(
+            '重複の処理', _handle_duplicates,
+            frozenset({'手術日', '患者ID', '右', '左', '術眼'}), frozenset({'術眼', '右', '左'}),
+            filters_rows=True, row_dependent=True
+        ),
+        Step('列の並び替え', _reorder_and_sort, frozenset(OUTPUT_COLUMNS), row_dependent=True),
+    ]
+
+
+def _process_search_frame(
+        df: pd.DataFrame,
+        rules: NormalizationRules,
+        copy: bool = True
+) -> pd.DataFrame:
+    """
+    読み込んだ手術検索データに一連の処理を適用
+
+    除外キーワードによる行削除は、列の依存関係が許す範囲で手術日の変換や置換より先に実行し、
+    処理する行数を減らす。
+    """
+    df_processed = _select_required_columns(df, copy=copy)
+    return run_steps(df_processed, order_steps(search_steps(rules)))
+
+
+def _process_by_month(input_file_path: str, output_file_path: str, rules: NormalizationRules) -> None:
+    """手術月ごとに分割して処理し、結果を順に追記"""
+    with create_partition_directory() as work_dir:
+        partitions = partition_csv_by_month(
+            input_file_path, '手術日', work_dir, date_format='%y/%m/%d',
+            usecols=REQUIRED_COLUMNS, dtype=LOW_MEMORY_DTYPES
+        )
+
+        for index, (month, partition_path) in enumerate(partitions):
+            logging.info(f"手術月 {month} を処理します")
+            df = downcast_numeric_columns(pd.read_csv(partition_path, encoding='cp932', dtype=LOW_MEMORY_DTYPES))
+            df_processed = _process_search_frame(df, rules, copy=False)
+            df_processed.to_csv(
+                output_file_path, index=False, encoding='cp932',
+                mode='w' if index == 0 else 'a', header=index == 0
+            )
+
+    if not partitions:
+        pd.DataFrame(columns=OUTPUT_COLUMNS).to_csv(output_file_path, index=False, encoding='cp932')
+
+
+def _rules_digest(config: configparser.ConfigParser) -> str:
+    """処理結果に影響するルール（置換・削除文字列・除外キーワード）を表す文字列"""
+    rules = {
+        'exclusion_line_keywords': get_exclusion_line_keywords(config),
+        'surgery_strings_to_remove': get_surgery_strings_to_remove(config),
+        'replacements': {
+            key: get_replacement_dict(config, 'Replacements', key)
+            for key in REPLACEMENT_KEYS.values()
+        },
+    }
+    return json.dumps(rules, ensure_ascii=False, sort_keys=True)
+
+
+def _process_incremental(
+        input_file_path: str,
+        output_file_path: str,
+        config: configparser.ConfigParser,
+        rules: NormalizationRules,
+        cache_dir: str
+) -> None:
+    """入力の行が変わった手術日だけを処理し、それ以外は前回の処理結果を使う"""
+    df = pd.read_csv(input_file_path, encoding='cp932', usecols=REQUIRED_COLUMNS)
+    date_keys = pd.to_datetime(df['手術日'], format='%y/%m/%d', errors='coerce').dt.strftime('%Y/%m/%d')
+
+    df_processed = run_partitioned(
+        PartitionCache(cache_dir, 'surgery_search'),
+        [(df, date_keys)],
+        lambda df_changed: _process_search_frame(df_changed, rules, copy=False),
+        '手術日',
+        context=_rules_digest(config)
+    )
+    df_processed.to_csv(output_file_path, index=False, encoding='cp932')
+
+
+def process_eye_surgery_data(
+        input_file_path: str,
+        output_file_path: str,
+        low_memory: bool = False,
+        memory_budget_mb: int = 0,
+        cache_dir: str = ''
+) -> None:
     """
     手術検索データのCSVファイルを処理
 
     Args:
         input_file_path: 入力ファイルのパス
         output_file_path: 出力ファイルのパス
+        low_memory: Trueの場合、必要な列だけを読み込んで型を縮小し、
+            推定ピークメモリがmemory_budget_mbを超えると手術月ごとに処理
+        memory_budget_mb: 低メモリモードでのメモリ予算（MB）
+        cache_dir: 指定した場合、手術日ごとの処理結果をキャッシュし、入力が変わった手術日だけを処理
+            （低メモリモードより優先）
     """
     config = load_config()
-    df = pd.read_csv(input_file_path, encoding='cp932')
-
-    df_processed = _select_required_columns(df)
-    df_processed = _convert_surgery_date_format(df_processed)
-    df_processed = _apply_replacements(df_processed, config)
-    df_processed = _remove_surgery_strings(df_processed, config)
-    df_processed = _filter_exclusion_keywords(df_processed, config)
-    df_processed = _normalize_surgery_text(df_processed)
-    df_processed = _create_eye_side_column(df_processed)
-    df_processed = _handle_duplicates(df_processed)
-    df_processed = _reorder_and_sort(df_processed)
+    rules = build_normalization_rules(config)
+
+    if cache_dir:
+        _process_incremental(input_file_path, output_file_path, config, rules, cache_dir)
+        logging.info(f"手術検索データの処理が完了しました: {output_file_path}")
+        return
+
+    if not low_memory:
+        df = pd.read_csv(input_file_path, encoding='cp932')
+        df_processed = _process_search_frame(df, rules)
+        df_processed.to_csv(output_file_path, index=False, encoding='cp932')
+        logging.info(f"手術検索データの処理が完了しました: {output_file_path}")
+        return
+
+    peak_before = get_peak_memory_bytes()
+    estimated_bytes = estimate_peak_bytes([input_file_path])
+    if exceeds_budget(estimated_bytes, memory_budget_mb):
+        logging.info(f"推定ピークメモリがメモリ予算 {memory_budget_mb}MB を超えるため、手術月ごとに処理します")
+        _process_by_month(input_file_path, output_file_path, rules)
+    else:
+        df = pd.read_csv(input_file_path, encoding='cp932', usecols=REQUIRED_COLUMNS, dtype=LOW_MEMORY_DTYPES)
+        df_processed = _process_search_frame(downcast_numeric_columns(df), rules, copy=False)
+        df_processed.to_csv(output_file_path, index=False, encoding='cp932')
 
-    df_processed.to_csv(output_file_path, index=False, encoding='cp932')
     logging.info(f"手術検索データの処理が完了しました: {output_file_path}")
+    log_memory_usage("手術検索データの処理", estimated_bytes, peak_before)
 
 if __name__ == '__main__':
     config = load_config()
@@ -0,0 +1,143 @@
+import json
+import logging
+import os
+
+import numpy as np
+import pandas as pd
+
+from service.surgery_equivalence import normalize_surgery_name
+
+SIMILARITY_CACHE_FILENAME = 'surgery_similarity.json'
+# 手術_比較で表記が似ている手術名を表す値
+SIMILAR_LABEL = '類似'
+DEFAULT_THRESHOLD = 0.8
+DEFAULT_NGRAM_SIZE = 2
+
+
+def get_similarity_cache_path(log_directory: str, cache_file: str = '') -> str:
+    """類似度キャッシュのパス（未指定の場合はログディレクトリ）"""
+    return cache_file or os.path.join(log_directory, SIMILARITY_CACHE_FILENAME)
+
+
+def _ngrams(name: str, ngram_size: int) -> frozenset[str]:
+    """文字n-gramの集合（n文字未満の名前は名前全体を1つのn-gramとする）"""
+    if len(name) <= ngram_size:
+        return frozenset([name])
+    return frozenset(name[index:index + ngram_size] for index in range(len(name) - ngram_size + 1))
+
+
+class SurgerySimilarity:
+    """
+    表記が似ている手術名を判定する
+
+    手術名を正規化して文字n-gramの集合に変換し、Dice係数が閾値以上の組を類似とする。
+    n-gramの集合は手術名ごとに一度だけ作成し、組ごとの類似度はファイルに保存して次回の実行でも使う。
+    """
+
+    def __init__(
+            self,
+            threshold: float = DEFAULT_THRESHOLD,
+            ngram_size: int = DEFAULT_NGRAM_SIZE,
+            cache_path: str = ''
+    ):
+        if not 0 < threshold <= 1:
+            raise ValueError(f"類似度の閾値が不正です: {threshold}（0より大きく1以下）")
+        if ngram_size < 1:
+            raise ValueError(f"n-gramの文字数が不正です: {ngram_size}（1以上）")
+
+        self.threshold = threshold
+        self.ngram_size = ngram_size
+        self.cache_path = cache_path
+        self._index: dict[str, frozenset[str]] = {}
+        self._scores = self._load_cache()
+        self._dirty = False
+
+    @property
+    def digest(self) -> str:
+        """結果に影響する設定（キャッシュした比較結果を使えるかの判定用）"""
+        return f'{self.threshold}|{self.ngram_size}'
+
+    def _load_cache(self) -> dict[str, float]:
+        if not self.cache_path:
+            return {}
+        try:
+            with open(self.cache_path, encoding='utf-8') as f:
+                cache = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        # n-gramの文字数が異なる場合の類似度は使えない
+        if cache.get('ngram_size') != self.ngram_size:
+            return {}
+        return dict(cache.get('scores', {}))
+
+    def save(self) -> None:
+        """新しく計算した類似度をキャッシュファイルに保存"""
+        if not self.cache_path or not self._dirty:
+            return
+        try:
+            directory = os.path.dirname(self.cache_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(self.cache_path, 'w', encoding='utf-8') as f:
+                json.dump({'ngram_size': self.ngram_size, 'scores': self._scores}, f, ensure_ascii=False)
+            self._dirty = False
+        except OSError as e:
+            logging.warning(f"手術名の類似度キャッシュを保存できませんでした: {self.cache_path}: {str(e)}")
+
+    def _profile(self, name: str) -> frozenset[str]:
+        profile = self._index.get(name)
+        if profile is None:
+            profile = _ngrams(name, self.ngram_size)
+            self._index[name] = profile
+        return profile
+
+    def score(self, name_a: str, name_b: str) -> float:
+        """2つの手術名の類似度（正規化した名前のn-gramのDice係数、0～1）"""
+        a = normalize_surgery_name(name_a)
+        b = normalize_surgery_name(name_b)
+        if a == b:
+            return 1.0
+
+        # Dice係数は対称なので、名前の順序を揃えてキャッシュする
+        key = '\t'.join(sorted((a, b)))
+        cached = self._scores.get(key)
+        if cached is not None:
+            return cached
+
+        profile_a = self._profile(a)
+        profile_b = self._profile(b)
+        score = 2 * len(profile_a & profile_b) / (len(profile_a) + len(profile_b))
+        self._scores[key] = score
+        self._dirty = True
+        return score
+
+    def find_similar(self, search: pd.Series, schedule: pd.Series, candidates: np.ndarray) -> np.ndarray:
+        """
+        候補の行のうち、検索データと予定表の手術名が似ている行を判定
+
+        行ごとではなく一意な (検索データ, 予定表) の手術名の組ごとに一度だけ類似度を計算する。
+
+        Args:
+            search: 検索データの手術名
+            schedule: 予定表の手術名
+            candidates: 判定する行（両方の手術名があり、一致しなかった行）
+
+        Returns:
+            類似と判定した行をTrueとする配列
+        """
+        similar = np.zeros(len(search), dtype=bool)
+        if not candidates.any():
+            return similar
+
+        pairs = pd.MultiIndex.from_arrays([
+            search.to_numpy()[candidates].astype(str),
+            schedule.to_numpy()[candidates].astype(str),
+        ])
+        unique_pairs = pairs.unique()
+        scores = pd.Series([self.score(a, b) for a, b in unique_pairs], index=unique_pairs)
+
+        similar[candidates] = scores.reindex(pairs).to_numpy() >= self.threshold
+        logging.info(
+            f"手術名の類似度: {len(unique_pairs)}組を判定し、{int(similar.sum())}件を{SIMILAR_LABEL}としました"
+        )
+        return similar
@@ -0,0 +1,57 @@
+from scripts.benchmark import compare_results, format_comparison_table
+
+
+def _results(seconds: float, memory_mb: float) -> dict:
+    return {
+        'meta': {'commit': 'abc1234'},
+        'results': {
+            '10000': {
+                'compare_surgery_data': {'median_seconds': seconds, 'peak_memory_mb': memory_mb},
+            },
+        },
+    }
+
+
+def test_compare_results_no_regression():
+    """閾値内の変化は回帰と判定されない"""
+    comparisons = compare_results(_results(1.1, 10.5), _results(1.0, 10.0))
+
+    assert len(comparisons) == 1
+    assert comparisons[0]['regressed'] is False
+
+
+def test_compare_results_time_regression():
+    """実行時間の中央値が閾値を超えて増加すると回帰と判定される"""
+    comparisons = compare_results(_results(3.0, 10.0), _results(1.0, 10.0))
+
+    assert comparisons[0]['regressed'] is True
+    assert comparisons[0]['time_delta'] == 2.0
+
+
+def test_compare_results_memory_regression():
+    """ピークメモリが閾値を超えて増加すると回帰と判定される"""
+    comparisons = compare_results(_results(1.0, 20.0), _results(1.0, 10.0), memory_threshold=0.5)
+
+    assert comparisons[0]['regressed'] is True
+
+
+def test_compare_results_ignores_small_absolute_delta():
+    """計測誤差程度の小さな差は増加率が大きくても回帰と判定されない"""
+    comparisons = compare_results(_results(0.02, 1.0), _results(0.01, 1.0))
+
+    assert comparisons[0]['regressed'] is False
+
+
+def test_compare_results_skips_stages_missing_in_baseline():
+    """ベースラインに無いステージは比較対象外"""
+    baseline = {'meta': {}, 'results': {'10000': {}}}
+
+    assert compare_results(_results(1.0, 10.0), baseline) == []
+
+
+def test_format_comparison_table():
+    """差分表にステージ名と判定が含まれる"""
+    table = format_comparison_table(compare_results(_results(3.0, 10.0), _results(1.0, 10.0)))
+
+    assert 'compare_surgery_data' in table
+    assert '回帰' in table
@@ -0,0 +1,67 @@
+import tempfile
+from pathlib import Path
+
+import pytest
+
+from service.input_schema import InputSchema, SchemaValidationError, read_csv_header
+
+SCHEMA = InputSchema('手術検索データ', ('手術日', '患者ID', '右', '左'))
+
+
+@pytest.fixture
+def temp_dir():
+    """一時ディレクトリを作成"""
+    directory = Path(tempfile.mkdtemp())
+
+    yield directory
+
+    # クリーンアップ
+    import shutil
+    try:
+        shutil.rmtree(directory)
+    except:
+        pass
+
+
+def test_validate_accepts_extra_columns():
+    """必要な列がすべてあれば、ほかの列があってもエラーにならない"""
+    SCHEMA.validate(['手術日', '患者ID', '右', '左', '病名'], 'search.csv')
+
+
+def test_validate_lists_missing_and_unknown_columns():
+    """不足している列と想定外の列、名前が似ている列を候補としてメッセージに含める"""
+    with pytest.raises(SchemaValidationError) as excinfo:
+        SCHEMA.validate(['手術日', '患者ID', '右眼', '左眼'], 'search.csv')
+
+    message = str(excinfo.value)
+    assert 'search.csv' in message
+    assert '不足: 「右」（候補: 「右眼」）' in message
+    assert '不足: 「左」（候補: 「左眼」）' in message
+    assert '想定外の列: 「右眼」, 「左眼」' in message
+    assert '「手術日」' not in message
+
+
+def test_read_csv_header_reads_only_header(temp_dir):
+    """見出し行の列名だけを返す"""
+    csv_path = temp_dir / 'search.csv'
+    csv_path.write_text('手術日,患者ID\n25/01/15,12345\n', encoding='cp932')
+
+    assert read_csv_header(str(csv_path), '手術検索データ') == ['手術日', '患者ID']
+
+
+def test_read_csv_header_rejects_other_encoding(temp_dir):
+    """cp932で読み込めないファイルは文字コードのエラーになる"""
+    csv_path = temp_dir / 'search.csv'
+    csv_path.write_text('手術日,患者ID,術前\n', encoding='utf-8')
+
+    with pytest.raises(SchemaValidationError, match='文字コードがcp932ではありません'):
+        read_csv_header(str(csv_path), '手術検索データ')
+
+
+def test_read_csv_header_rejects_empty_file(temp_dir):
+    """空のファイルは見出し行が無いエラーになる"""
+    csv_path = temp_dir / 'search.csv'
+    csv_path.write_bytes(b'')
+
+    with pytest.raises(SchemaValidationError, match='見出し行がありません'):
+        read_csv_header(str(csv_path), '手術検索データ')
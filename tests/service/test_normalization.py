@@ -0,0 +1,58 @@
+import unicodedata
+
+import pandas as pd
+
+from service.normalization import NormalizationRules, filter_exclusion_keywords, normalize_frame
+from service.replacement_engine import compile_replacements
+
+
+def _rules():
+    return NormalizationRules(
+        replacements=compile_replacements({'麻酔': {'球後麻酔': '局所'}, '医師': {'橋本義弘': '橋本'}}),
+        surgery_strings_to_remove=('(トーリック)', '(inject)'),
+        exclusion_keywords=('★', '霰粒腫'),
+    )
+
+
+def test_normalize_frame_applies_all_rules():
+    """置換・文字列削除・除外・全角カナ変換が順に適用される"""
+    df = pd.DataFrame({
+        '氏名': ['患者A', '★患者B', '患者C', '患者D'],
+        '手術': ['PEA+IOL(トーリック)', '白内障手術', '霰粒腫切除', 'ｶﾞﾗｽ体手術(inject)'],
+        '麻酔': ['球後麻酔', '球後麻酔', '全身', None],
+        '医師': ['橋本義弘', '植田', '橋本義弘', '橋本義弘'],
+    })
+
+    result = normalize_frame(df, _rules())
+
+    assert result['氏名'].tolist() == ['患者A', '患者D']
+    assert result['手術'].tolist() == ['PEA+IOL', 'ガラス体手術']
+    assert result['麻酔'].tolist() == ['局所', None]
+    assert result['医師'].tolist() == ['橋本', '橋本']
+
+
+def test_normalize_frame_matches_row_wise_processing():
+    """一意な値ごとの処理は、行ごとに処理した結果と一致する"""
+    df = pd.DataFrame({
+        '氏名': ['患者A', '患者B', None, '患者★'] * 50,
+        '手術': ['PEA+IOL(トーリック)', None, 'ﾄﾗﾍﾞｸﾛﾐｰ', '白内障手術'] * 50,
+    })
+    rules = _rules()
+
+    expected = df.copy()
+    for string in rules.surgery_strings_to_remove:
+        expected['手術'] = expected['手術'].str.replace(string, '', regex=False)
+    for column in ['氏名', '手術']:
+        for keyword in rules.exclusion_keywords:
+            expected = expected[~expected[column].str.contains(keyword, na=False)]
+    expected['手術'] = expected['手術'].apply(lambda x: x if pd.isna(x) else unicodedata.normalize('NFKC', x))
+
+    actual = normalize_frame(df.copy(), rules)
+
+    pd.testing.assert_frame_equal(actual, expected, check_dtype=False)
+
+
+def test_filter_exclusion_keywords_without_keywords_keeps_rows():
+    df = pd.DataFrame({'氏名': ['★患者A'], '手術': ['霰粒腫']})
+
+    assert len(filter_exclusion_keywords(df, NormalizationRules())) == 1
@@ -0,0 +1,330 @@
+import configparser
+import tempfile
+from pathlib import Path
+
+from unittest.mock import patch
+
+import pytest
+from openpyxl import Workbook
+
+from service.input_schema import SchemaValidationError
+from service.pipeline import run_pipeline
+
+
+@pytest.fixture
+def temp_pipeline_files():
+    """パイプライン実行用の一時的な入力ファイルと設定を作成"""
+    temp_dir = Path(tempfile.mkdtemp())
+
+    search_data = """手術日,患者ID,氏名,手術,医師,麻酔,病名,入外,右,左,術前
+25/01/15,12345,患者A,白内障手術,橋本義弘,球後麻酔,白内障,外来,○,,検査A
+25/01/16,12346,患者B,緑内障手術,植田芳樹,全身麻酔,緑内障,あやめ,,○,検査B
+"""
+    (temp_dir / 'search.csv').write_text(search_data, encoding='cp932')
+
+    wb = Workbook()
+    ws = wb.active
+    ws.title = '南館2'
+    ws.append(['手術予定表'])
+    ws.append(['日付', 'ID', '氏名', '入外', '術式', '麻酔', '術者'])
+    ws.append(['2025/01/15', 12345, '患者A', '外来', 'R)白内障手術', '局所', '橋本'])
+    ws.append(['2025/01/16', 12346, '患者B', '入院', 'R)緑内障手術', '全身', '植田'])
+    wb.save(temp_dir / 'schedule.xlsx')
+
+    template = Workbook()
+    template_ws = template.active
+    template_ws.append(['手術日', '患者ID', '氏名', '入外', '術眼', '手術', '医師', '麻酔', '術前',
+                        '入外', '術眼', '手術', '医師', '麻酔'])
+    template.save(temp_dir / 'template.xlsx')
+
+    paths = {
+        'surgery_search_data': str(temp_dir / 'search.csv'),
+        'processed_surgery_search_data': str(temp_dir / 'processed_search.csv'),
+        'surgery_schedule': str(temp_dir / 'schedule.xlsx'),
+        'processed_surgery_schedule': str(temp_dir / 'processed_schedule.csv'),
+        'comparison_result': str(temp_dir / 'comparison.csv'),
+        'template_path': str(temp_dir / 'template.xlsx'),
+        'output_path': str(temp_dir / 'output'),
+    }
+
+    config = configparser.ConfigParser()
+    config.read_dict({
+        'LOGGING': {'log_directory': str(temp_dir / 'logs')},
+        'Profiling': {'enabled': 'false', 'top_n': '10'},
+        'Snapshot': {'enabled': 'true', 'cache_directory': str(temp_dir / 'snapshot')},
+    })
+
+    yield {'dir': temp_dir, 'paths': paths, 'config': config}
+
+    # クリーンアップ
+    import shutil
+    try:
+        shutil.rmtree(temp_dir)
+    except:
+        pass
+
+
+def test_run_pipeline_creates_instruction_file(temp_pipeline_files):
+    """全ステップが実行され、眼科手術指示確認ファイルが作成される"""
+    instruction_file = run_pipeline(temp_pipeline_files['config'], temp_pipeline_files['paths'])
+
+    assert instruction_file
+    assert Path(instruction_file).exists()
+    assert Path(temp_pipeline_files['paths']['comparison_result']).exists()
+
+
+def test_run_pipeline_uses_step_executor(temp_pipeline_files):
+    """各ステップが指定した実行関数を通して呼ばれる"""
+    step_names = []
+
+    def execute_step(step_num, total_steps, step_name, func, *args, **kwargs):
+        step_names.append(step_name)
+        return func(*args, **kwargs)
+
+    run_pipeline(temp_pipeline_files['config'], temp_pipeline_files['paths'], execute_step=execute_step)
+
+    assert len(step_names) == 4
+
+
+def test_run_pipeline_profile_writes_files_per_stage(temp_pipeline_files):
+    """プロファイルを有効にするとステージごとに.profファイルが出力される"""
+    run_pipeline(temp_pipeline_files['config'], temp_pipeline_files['paths'], profile=True)
+
+    prof_files = list((temp_pipeline_files['dir'] / 'logs').glob('*.prof'))
+    assert len(prof_files) == 4
+
+
+def test_run_pipeline_profile_with_parallel_setting_runs_steps_in_order(temp_pipeline_files):
+    """以前の設定ファイルにparallel_with_searchが残っていても、プロファイル時は各ステップを順に計測する"""
+    config = temp_pipeline_files['config']
+    config.read_dict({'Schedule': {'parallel_with_search': 'true'}})
+    events = []
+
+    def execute_step(step_num, total_steps, step_name, func, *args, **kwargs):
+        events.append(('start', step_num))
+        result = func(*args, **kwargs)
+        events.append(('end', step_num))
+        return result
+
+    run_pipeline(config, temp_pipeline_files['paths'], execute_step=execute_step, profile=True)
+
+    assert events == [(event, step_num) for step_num in range(1, 5) for event in ('start', 'end')]
+    assert len(list((temp_pipeline_files['dir'] / 'logs').glob('*.prof'))) == 4
+
+
+def test_run_pipeline_profile_follows_config(temp_pipeline_files):
+    """profileを指定しない場合は[Profiling]の設定に従う"""
+    run_pipeline(temp_pipeline_files['config'], temp_pipeline_files['paths'])
+
+    assert not list((temp_pipeline_files['dir'] / 'logs').glob('*.prof'))
+
+
+def _counting_executor(step_names):
+    def execute_step(step_num, total_steps, step_name, func, *args, **kwargs):
+        step_names.append(step_name)
+        return func(*args, **kwargs)
+    return execute_step
+
+
+def test_run_pipeline_skips_when_unchanged(temp_pipeline_files):
+    """入力ファイルと設定に変更が無ければ処理を省略して前回の出力ファイルを返す"""
+    first = run_pipeline(temp_pipeline_files['config'], temp_pipeline_files['paths'])
+
+    step_names = []
+    unchanged = []
+    second = run_pipeline(
+        temp_pipeline_files['config'],
+        temp_pipeline_files['paths'],
+        execute_step=_counting_executor(step_names),
+        on_unchanged=unchanged.append
+    )
+
+    assert second == first
+    assert step_names == []
+    assert unchanged == [first]
+
+
+def test_run_pipeline_profile_runs_when_unchanged(temp_pipeline_files):
+    """変更が無くても、プロファイルを取得する場合はすべての処理を実行してプロファイルを出力する"""
+    run_pipeline(temp_pipeline_files['config'], temp_pipeline_files['paths'])
+
+    step_names = []
+    run_pipeline(
+        temp_pipeline_files['config'],
+        temp_pipeline_files['paths'],
+        execute_step=_counting_executor(step_names),
+        profile=True
+    )
+
+    assert len(step_names) == 4
+    assert len(list((temp_pipeline_files['dir'] / 'logs').glob('profile_*.prof'))) == 4
+
+
+def test_run_pipeline_force_runs_all_steps(temp_pipeline_files):
+    """forceを指定すると変更が無くてもすべての処理を実行する"""
+    run_pipeline(temp_pipeline_files['config'], temp_pipeline_files['paths'])
+
+    step_names = []
+    run_pipeline(
+        temp_pipeline_files['config'],
+        temp_pipeline_files['paths'],
+        execute_step=_counting_executor(step_names),
+        force=True
+    )
+
+    assert len(step_names) == 4
+
+
+def test_run_pipeline_reruns_when_input_changes(temp_pipeline_files):
+    """入力ファイルが更新されると再実行する"""
+    run_pipeline(temp_pipeline_files['config'], temp_pipeline_files['paths'])
+
+    search_path = Path(temp_pipeline_files['paths']['surgery_search_data'])
+    search_path.write_text(search_path.read_text(encoding='cp932') + '\n', encoding='cp932')
+
+    step_names = []
+    run_pipeline(
+        temp_pipeline_files['config'],
+        temp_pipeline_files['paths'],
+        execute_step=_counting_executor(step_names)
+    )
+
+    assert len(step_names) == 4
+
+
+def test_run_pipeline_reruns_when_settings_change(temp_pipeline_files):
+    """設定が変更されると再実行する"""
+    run_pipeline(temp_pipeline_files['config'], temp_pipeline_files['paths'])
+
+    temp_pipeline_files['config']['Profiling']['top_n'] = '20'
+
+    step_names = []
+    run_pipeline(
+        temp_pipeline_files['config'],
+        temp_pipeline_files['paths'],
+        execute_step=_counting_executor(step_names)
+    )
+
+    assert len(step_names) == 4
+
+
+def test_run_pipeline_reads_inputs_from_snapshot(temp_pipeline_files):
+    """入力ファイルはローカルのスナップショットにコピーしてから処理する"""
+    paths = []
+
+    def execute_step(step_num, total_steps, step_name, func, *args, **kwargs):
+        paths.extend(args)
+        return func(*args, **kwargs)
+
+    run_pipeline(temp_pipeline_files['config'], temp_pipeline_files['paths'], execute_step=execute_step)
+
+    snapshot_dir = temp_pipeline_files['dir'] / 'snapshot'
+    assert len(list(snapshot_dir.glob('search_*.csv'))) == 1
+    assert len(list(snapshot_dir.glob('schedule_*.xlsx'))) == 1
+    assert temp_pipeline_files['paths']['surgery_search_data'] not in paths
+    assert any(str(path).startswith(str(snapshot_dir)) for path in paths)
+
+
+def test_run_pipeline_logs_snapshot_failure(temp_pipeline_files, caplog):
+    """スナップショットを作成できない場合は、元ファイルと再試行回数をログに出力して中断する"""
+    from service import pipeline
+    from utils.input_snapshot import SnapshotError
+
+    step_names = []
+    error = SnapshotError('入力ファイルを読み込めませんでした')
+    with patch.object(pipeline, 'snapshot_inputs', side_effect=error), \
+            pytest.raises(SnapshotError) as excinfo:
+        run_pipeline(
+            temp_pipeline_files['config'], temp_pipeline_files['paths'], execute_step=_counting_executor(step_names)
+        )
+
+    assert excinfo.value is error
+    assert step_names == []
+    message = caplog.records[-1].getMessage()
+    assert caplog.records[-1].levelname == 'ERROR'
+    assert temp_pipeline_files['paths']['surgery_search_data'] in message
+    assert temp_pipeline_files['paths']['surgery_schedule'] in message
+    assert '再試行' in message
+
+
+def test_run_pipeline_stores_comparison_results(temp_pipeline_files):
+    """比較結果がログディレクトリの結果データベースに保存される"""
+    run_pipeline(temp_pipeline_files['config'], temp_pipeline_files['paths'])
+
+    assert (temp_pipeline_files['dir'] / 'logs' / 'comparison_results.sqlite3').exists()
+
+
+def test_run_pipeline_validates_inputs_before_steps(temp_pipeline_files):
+    """入力ファイルの列が不足している場合は、どのステップも実行せずにエラーになる"""
+    search_path = Path(temp_pipeline_files['paths']['surgery_search_data'])
+    search_path.write_text(
+        search_path.read_text(encoding='cp932').replace('右,左', '右眼,左眼', 1), encoding='cp932'
+    )
+    step_names = []
+
+    def execute_step(step_num, total_steps, step_name, func, *args, **kwargs):
+        step_names.append(step_name)
+        return func(*args, **kwargs)
+
+    with pytest.raises(SchemaValidationError, match='不足: 「右」'):
+        run_pipeline(temp_pipeline_files['config'], temp_pipeline_files['paths'], execute_step=execute_step)
+
+    assert step_names == []
+
+
+def test_run_pipeline_validates_snapshot_inputs(temp_pipeline_files):
+    """列構成の確認は各ステップと同じスナップショットのコピーを読み込む"""
+    from service import pipeline
+
+    validated = []
+
+    def record(func):
+        def wrapper(path, *args, **kwargs):
+            validated.append(path)
+            return func(path, *args, **kwargs)
+        return wrapper
+
+    with patch.object(pipeline, 'validate_search_data', record(pipeline.validate_search_data)), \
+            patch.object(pipeline, 'validate_surgery_schedule', record(pipeline.validate_surgery_schedule)):
+        run_pipeline(temp_pipeline_files['config'], temp_pipeline_files['paths'])
+
+    snapshot_dir = str(temp_pipeline_files['dir'] / 'snapshot')
+    assert len(validated) == 2
+    assert all(path.startswith(snapshot_dir) for path in validated)
+
+
+def test_run_pipeline_does_not_write_disabled_result_store(temp_pipeline_files):
+    """[ResultStore]が無効の場合は結果データベースを作成しない"""
+    config = temp_pipeline_files['config']
+    config.read_dict({'ResultStore': {'enabled': 'false'}})
+
+    run_pipeline(config, temp_pipeline_files['paths'])
+
+    assert not (temp_pipeline_files['dir'] / 'logs' / 'comparison_results.sqlite3').exists()
+
+
+def test_run_pipeline_delta_requires_result_store(temp_pipeline_files):
+    """差分出力で結果データベースが無効の場合は、どのステップも実行せずにエラーになる"""
+    config = temp_pipeline_files['config']
+    config.read_dict({'ResultStore': {'enabled': 'false'}, 'Report': {'report_mode': 'delta'}})
+    step_names = []
+
+    with pytest.raises(ValueError, match='ResultStore'):
+        run_pipeline(config, temp_pipeline_files['paths'], execute_step=_counting_executor(step_names))
+
+    assert step_names == []
+
+
+def test_run_pipeline_delta_reports_unchanged_errors(temp_pipeline_files):
+    """差分出力で前回から変化が無い場合は、変化の無い不一致・未入力の件数を通知する"""
+    config = temp_pipeline_files['config']
+    config.read_dict({'Report': {'report_mode': 'delta'}})
+    assert run_pipeline(config, temp_pipeline_files['paths'])
+
+    unchanged_counts = []
+    instruction_file = run_pipeline(
+        config, temp_pipeline_files['paths'], force=True, on_unchanged_errors=unchanged_counts.append
+    )
+
+    assert instruction_file == ''
+    assert unchanged_counts and unchanged_counts[0] > 0
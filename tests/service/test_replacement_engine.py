@@ -0,0 +1,69 @@
+import pandas as pd
+import pytest
+
+from service.replacement_engine import ReplacementRule, compile_replacements, parse_replacement_rules
+
+
+def test_parse_replacement_rules():
+    """/で囲んだ置換元は正規表現、*で終わる置換元は前方一致になる"""
+    rules = parse_replacement_rules({'球後麻酔': '局所', '全身*': '全身', '/^点眼/': '局所'})
+
+    assert rules == [
+        ReplacementRule('球後麻酔', '局所', 'exact'),
+        ReplacementRule('全身', '全身', 'prefix'),
+        ReplacementRule('^点眼', '局所', 'regex'),
+    ]
+
+
+def test_compile_replacements_applies_each_rule_kind():
+    engine = compile_replacements({
+        '麻酔': {'球後麻酔': '局所', '全身*': '全身', '/点眼/': '局所'},
+        '医師': {'橋本義弘': '橋本'},
+    })
+    df = pd.DataFrame({
+        '麻酔': ['球後麻酔', '全身麻酔(挿管)', '両眼点眼', None, 'その他'],
+        '医師': ['橋本義弘', '植田', None, '橋本義弘', '増子'],
+    })
+
+    result = engine.apply(df)
+
+    assert result['麻酔'].tolist() == ['局所', '全身', '局所', None, 'その他']
+    assert result['医師'].tolist() == ['橋本', '植田', None, '橋本', '増子']
+
+
+def test_compile_replacements_prefers_exact_and_longer_prefix():
+    engine = compile_replacements({'入外': {'外来': '外来', '外*': '入院', '外来2*': '日帰り'}})
+
+    result = engine.apply(pd.DataFrame({'入外': ['外来', '外来2階', '外科']}))
+
+    assert result['入外'].tolist() == ['外来', '日帰り', '入院']
+
+
+def test_compile_replacements_resolves_chains():
+    """A→B、B→Cの置換は1回でCに置換される"""
+    engine = compile_replacements({'医師': {'橋本義弘': 'ハシモト', 'ハシモト': '橋本', '/芳樹$/': '植田医師', '植田医師': '植田'}})
+
+    result = engine.apply(pd.DataFrame({'医師': ['橋本義弘', 'ハシモト', '植田芳樹']}))
+
+    assert result['医師'].tolist() == ['橋本', '橋本', '植田']
+
+
+def test_compile_replacements_rejects_cycle():
+    with pytest.raises(ValueError, match='循環'):
+        compile_replacements({'医師': {'橋本': 'ハシモト', 'ハシモト': '橋本'}})
+
+
+def test_compile_replacements_rejects_invalid_pattern():
+    with pytest.raises(ValueError):
+        compile_replacements({'麻酔': {'/(/': '局所'}})
+
+
+def test_apply_leaves_unmatched_column_unchanged():
+    """置換する値が無い列と、置換ルールが無い列はそのまま"""
+    engine = compile_replacements({'麻酔': {'球後麻酔': '局所'}, '入外': {}})
+    df = pd.DataFrame({'麻酔': [float('nan'), float('nan')], '入外': ['あやめ', '外来']})
+
+    result = engine.apply(df)
+
+    assert result['麻酔'].dtype == 'float64'
+    assert result['入外'].tolist() == ['あやめ', '外来']
@@ -0,0 +1,102 @@
+import os
+import tempfile
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+from openpyxl import Workbook, load_workbook
+from openpyxl.styles import Font, PatternFill
+
+from service.report_template import clear_template_cache, load_template_skeleton
+
+
+@pytest.fixture
+def temp_template_file():
+    """書式付きの一時的なテンプレートファイルを作成"""
+    clear_template_cache()
+    temp_dir = tempfile.mkdtemp()
+
+    wb = Workbook()
+    ws = wb.active
+    ws.title = '指示確認'
+    ws.append(['手術日', '患者ID', '氏名'])
+    for cell in ws[1]:
+        cell.font = Font(bold=True)
+        cell.fill = PatternFill(fill_type='solid', fgColor='FFFF00')
+    ws.cell(row=2, column=1).number_format = 'yyyy/mm/dd'
+    ws.column_dimensions['C'].width = 25
+    ws.freeze_panes = 'A2'
+
+    template_path = Path(temp_dir) / 'template.xlsx'
+    wb.save(template_path)
+
+    yield str(template_path)
+
+    # クリーンアップ
+    clear_template_cache()
+    import shutil
+    try:
+        shutil.rmtree(temp_dir)
+    except:
+        pass
+
+
+def test_load_template_skeleton_reads_header_and_layout(temp_template_file):
+    """ヘッダー・列書式・列幅・ウィンドウ枠の固定を取得できる"""
+    skeleton = load_template_skeleton(temp_template_file)
+
+    assert skeleton.sheet_title == '指示確認'
+    assert [value for value, _ in skeleton.header] == ['手術日', '患者ID', '氏名']
+    assert skeleton.column_styles[0] is not None
+    assert skeleton.column_styles[0].number_format == 'yyyy/mm/dd'
+    assert skeleton.column_styles[1] is None
+    assert {letter: width for letter, _, _, width in skeleton.column_widths}['C'] == 25
+    assert skeleton.freeze_panes == 'A2'
+
+
+def test_load_template_skeleton_is_cached(temp_template_file):
+    """同じテンプレートは一度だけ解析される"""
+    with patch('service.report_template.load_workbook', wraps=load_workbook) as mock_load:
+        first = load_template_skeleton(temp_template_file)
+        second = load_template_skeleton(temp_template_file)
+
+    assert first is second
+    assert mock_load.call_count == 1
+
+
+def test_load_template_skeleton_reloads_when_modified(temp_template_file):
+    """テンプレートの更新日時が変わると再解析される"""
+    first = load_template_skeleton(temp_template_file)
+
+    stat = os.stat(temp_template_file)
+    os.utime(temp_template_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+    assert load_template_skeleton(temp_template_file) is not first
+
+
+def test_create_workbook_reproduces_template(temp_template_file):
+    """骨格から作成したブックにヘッダーと書式が反映される"""
+    skeleton = load_template_skeleton(temp_template_file)
+
+    wb = skeleton.create_workbook()
+    ws = wb.active
+    cell = ws.cell(row=2, column=1)
+    skeleton.apply_column_style(cell, 1)
+
+    assert ws.title == '指示確認'
+    assert ws.cell(row=1, column=2).value == '患者ID'
+    assert ws.cell(row=1, column=1).font.bold is True
+    assert ws.cell(row=1, column=1).fill.fgColor.rgb == '00FFFF00'
+    assert cell.number_format == 'yyyy/mm/dd'
+    assert ws.column_dimensions['C'].width == 25
+    assert ws.freeze_panes == 'A2'
+
+
+def test_create_workbook_does_not_parse_template(temp_template_file):
+    """キャッシュした骨格からブックを作成し、テンプレートを再度解析しない"""
+    skeleton = load_template_skeleton(temp_template_file)
+
+    with patch('service.report_template.load_workbook', side_effect=AssertionError('load_workbook')):
+        wb = skeleton.create_workbook()
+
+    assert wb.active.title == '指示確認'
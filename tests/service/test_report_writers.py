@@ -0,0 +1,250 @@
+import tempfile
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+import pytest
+from openpyxl import Workbook, load_workbook
+from openpyxl.styles import Font, PatternFill
+
+from service.report_template import clear_template_cache, load_template_skeleton
+from service.report_writers import (
+    ExtraSheet,
+    ReportData,
+    iter_report_rows,
+    render_report_rows,
+    write_csv,
+    write_html,
+    write_reports,
+    write_xlsx,
+    write_xlsx_streaming,
+)
+
+
+@pytest.fixture
+def temp_dir():
+    """書式付きテンプレートを含む一時ディレクトリを作成"""
+    clear_template_cache()
+    temp_dir = tempfile.mkdtemp()
+
+    wb = Workbook()
+    ws = wb.active
+    ws.title = '指示確認'
+    ws.append(['手術日', '患者ID', '氏名', '術眼_比較'])
+    for cell in ws[1]:
+        cell.font = Font(bold=True)
+        cell.fill = PatternFill(fill_type='solid', fgColor='FFFF00')
+    ws.cell(row=2, column=1).number_format = 'yyyy/mm/dd'
+    ws.cell(row=2, column=4).font = Font(color='FF0000')
+    ws.column_dimensions['C'].width = 25
+    ws.freeze_panes = 'A2'
+    wb.save(Path(temp_dir) / 'template.xlsx')
+
+    yield temp_dir
+
+    # クリーンアップ
+    clear_template_cache()
+    import shutil
+    try:
+        shutil.rmtree(temp_dir)
+    except:
+        pass
+
+
+@pytest.fixture
+def sample_output():
+    return pd.DataFrame({
+        '手術日': ['2024/01/15', '2024/01/16', '2024/01/17'],
+        '患者ID': [12345, 67890, 11111],
+        '氏名': ['山田太郎', '佐藤花子', '鈴木一郎'],
+        '術眼_比較': [True, False, '未入力'],
+    })
+
+
+def _read_sheet(path):
+    wb = load_workbook(path)
+    ws = wb.active
+    return ws, [[cell.value for cell in row] for row in ws.iter_rows()]
+
+
+def test_iter_report_rows_renders_values(sample_output):
+    """手術日はdatetime、比較結果は一致・不一致に変換される"""
+    rows = list(iter_report_rows(sample_output))
+
+    assert rows[0] == (datetime(2024, 1, 15), 12345, '山田太郎', '一致')
+    assert rows[1][3] == '不一致'
+    assert rows[2][3] == '未入力'
+
+
+def test_streaming_output_matches_normal_output(temp_dir, sample_output):
+    """書き込み専用モードでも通常モードと同じ値・書式で出力される"""
+    skeleton = load_template_skeleton(str(Path(temp_dir) / 'template.xlsx'))
+    normal_path = Path(temp_dir) / 'normal.xlsx'
+    streaming_path = Path(temp_dir) / 'streaming.xlsx'
+
+    assert write_xlsx(skeleton, iter_report_rows(sample_output), str(normal_path)) == 3
+    assert write_xlsx_streaming(skeleton, iter_report_rows(sample_output), str(streaming_path)) == 3
+
+    normal_ws, normal_values = _read_sheet(normal_path)
+    streaming_ws, streaming_values = _read_sheet(streaming_path)
+
+    assert streaming_values == normal_values
+    assert streaming_values[0] == ['手術日', '患者ID', '氏名', '術眼_比較']
+    assert streaming_ws.title == normal_ws.title == '指示確認'
+
+    for ws in (normal_ws, streaming_ws):
+        assert ws.cell(row=1, column=1).font.bold is True
+        assert ws.cell(row=1, column=1).fill.fgColor.rgb == '00FFFF00'
+        assert ws.cell(row=2, column=1).number_format == 'yyyy/mm/dd'
+        assert ws.cell(row=3, column=4).font.color.rgb == '00FF0000'
+        assert ws.column_dimensions['C'].width == 25
+        assert ws.freeze_panes == 'A2'
+
+
+def test_write_csv_formats_values(temp_dir, sample_output):
+    """CSVには手術日が文字列、比較結果が一致・不一致で出力される"""
+    output_path = Path(temp_dir) / 'report.csv'
+
+    assert write_csv(list(sample_output.columns), render_report_rows(sample_output), str(output_path)) == 3
+
+    df = pd.read_csv(output_path, encoding='cp932')
+    assert list(df.columns) == ['手術日', '患者ID', '氏名', '術眼_比較']
+    assert df['手術日'].tolist() == ['2024/01/15', '2024/01/16', '2024/01/17']
+    assert df['術眼_比較'].tolist() == ['一致', '不一致', '未入力']
+
+
+def test_write_csv_utf8_bom(temp_dir, sample_output):
+    """utf-8-sigを指定するとBOM付きUTF-8で出力される"""
+    output_path = Path(temp_dir) / 'report.csv'
+
+    write_csv(list(sample_output.columns), render_report_rows(sample_output), str(output_path), encoding='utf-8-sig')
+
+    assert output_path.read_bytes().startswith(b'\xef\xbb\xbf')
+
+
+def test_write_csv_rejects_unknown_encoding(temp_dir, sample_output):
+    with pytest.raises(ValueError):
+        write_csv(list(sample_output.columns), [], str(Path(temp_dir) / 'report.csv'), encoding='euc-jp')
+
+
+def test_write_html_highlights_cells(temp_dir, sample_output):
+    """HTMLでは不一致・未入力のセルが強調される"""
+    output_path = Path(temp_dir) / 'report.html'
+
+    assert write_html(list(sample_output.columns), render_report_rows(sample_output), str(output_path)) == 3
+
+    content = output_path.read_text(encoding='utf-8')
+    assert '<th>術眼_比較</th>' in content
+    assert '<td class="mismatch">不一致</td>' in content
+    assert '<td class="missing">未入力</td>' in content
+    assert '<td>一致</td>' in content
+    assert '<td>2024/01/15</td>' in content
+
+
+def test_write_reports_writes_all_targets(temp_dir, sample_output):
+    """共有した抽出結果からすべての形式が出力され、結果は指定順に返る"""
+    report = ReportData(
+        header=tuple(sample_output.columns),
+        rows=render_report_rows(sample_output),
+        row_count=len(sample_output),
+        df_comparison=sample_output,
+    )
+    targets = {
+        fmt: str(Path(temp_dir) / f'report_{fmt}.{ext}')
+        for fmt, ext in [('xlsx', 'xlsx'), ('csv', 'csv'), ('html', 'html'), ('comparison', 'csv')]
+    }
+
+    results = write_reports(report, targets, str(Path(temp_dir) / 'template.xlsx'))
+
+    assert [result.output_format for result in results] == list(targets)
+    assert all(result.succeeded for result in results)
+    assert all(result.row_count == 3 for result in results)
+    assert all(Path(path).exists() for path in targets.values())
+
+
+def test_write_reports_isolates_failures(temp_dir, sample_output):
+    """1つの形式の出力に失敗しても他の形式は出力される"""
+    report = ReportData(
+        header=tuple(sample_output.columns),
+        rows=render_report_rows(sample_output),
+        row_count=len(sample_output),
+    )
+    targets = {
+        'xlsx': str(Path(temp_dir) / 'report.xlsx'),
+        'csv': str(Path(temp_dir) / 'report.csv'),
+    }
+
+    results = write_reports(report, targets, str(Path(temp_dir) / 'missing_template.xlsx'))
+
+    assert not results[0].succeeded
+    assert results[0].error
+    assert results[1].succeeded
+    assert Path(targets['csv']).exists()
+
+
+@pytest.mark.parametrize('writer', [write_xlsx, write_xlsx_streaming])
+def test_write_xlsx_appends_extra_sheets(temp_dir, sample_output, writer):
+    """追加のシートが本体のシートの後に、テンプレートの列書式で出力される"""
+    skeleton = load_template_skeleton(str(Path(temp_dir) / 'template.xlsx'))
+    output_path = Path(temp_dir) / 'report.xlsx'
+    extra_sheet = ExtraSheet(
+        title='予定のみ',
+        header=('手術日', '患者ID', '氏名'),
+        rows=((datetime(2024, 1, 20), 99999, '高橋次郎'),),
+    )
+
+    assert writer(skeleton, iter_report_rows(sample_output), str(output_path), (extra_sheet,)) == 3
+
+    wb = load_workbook(output_path)
+    assert wb.sheetnames == ['指示確認', '予定のみ']
+    ws = wb['予定のみ']
+    assert [[cell.value for cell in row] for row in ws.iter_rows()] == [
+        ['手術日', '患者ID', '氏名'],
+        [datetime(2024, 1, 20), 99999, '高橋次郎'],
+    ]
+    assert ws.cell(row=1, column=1).font.bold is True
+    assert ws.cell(row=2, column=1).number_format == 'yyyy/mm/dd'
+
+
+@pytest.mark.parametrize('writer', [write_xlsx, write_xlsx_streaming])
+def test_write_xlsx_keeps_template_settings(temp_dir, sample_output, writer):
+    """入力規則・セルの結合・印刷設定・名前の定義・列幅のまとまり・本体以外のシートがテンプレートから引き継がれる"""
+    from openpyxl.workbook.defined_name import DefinedName
+    from openpyxl.worksheet.datavalidation import DataValidation
+
+    template_path = Path(temp_dir) / 'template_full.xlsx'
+    wb = load_workbook(Path(temp_dir) / 'template.xlsx')
+    ws = wb.active
+    validation = DataValidation(type='list', formula1='"済,未"', allow_blank=True)
+    validation.add('E2:E1000')
+    ws.add_data_validation(validation)
+    ws.merge_cells('F1:G1')
+    ws.page_setup.orientation = 'landscape'
+    ws.print_title_rows = '1:1'
+    ws.column_dimensions.group('H', 'J', hidden=False)
+    ws.column_dimensions['H'].width = 12
+    wb.defined_names['確認欄'] = DefinedName('確認欄', attr_text="'指示確認'!$E$2:$E$1000")
+    notes = wb.create_sheet('凡例')
+    notes.append(['一致', '項目が一致'])
+    notes['A1'].font = Font(bold=True)
+    wb.save(template_path)
+
+    skeleton = load_template_skeleton(str(template_path))
+    output_path = Path(temp_dir) / 'report.xlsx'
+    extra_sheet = ExtraSheet(title='予定のみ', header=('手術日',), rows=((datetime(2024, 1, 20),),))
+
+    writer(skeleton, iter_report_rows(sample_output), str(output_path), (extra_sheet,))
+
+    result = load_workbook(output_path)
+    assert result.sheetnames == ['指示確認', '凡例', '予定のみ']
+    ws = result['指示確認']
+    assert [str(v.sqref) for v in ws.data_validations.dataValidation] == ['E2:E1000']
+    assert ws.data_validations.dataValidation[0].formula1 == '"済,未"'
+    assert [str(cell_range) for cell_range in ws.merged_cells.ranges] == ['F1:G1']
+    assert ws.page_setup.orientation == 'landscape'
+    assert ws.print_title_rows == '$1:$1'
+    assert (ws.column_dimensions['H'].min, ws.column_dimensions['H'].max) == (8, 10)
+    assert ws.column_dimensions['H'].width == 12
+    assert '確認欄' in result.defined_names
+    assert result['凡例']['B1'].value == '項目が一致'
+    assert result['凡例']['A1'].font.bold is True
@@ -0,0 +1,113 @@
+import sqlite3
+import tempfile
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from service.result_store import (
+    compute_masks,
+    count_results,
+    find_changed_rows,
+    store_comparison_results,
+    update_report_state,
+)
+
+
+@pytest.fixture
+def temp_comparison_file():
+    """一時的な比較結果ファイルを作成"""
+    temp_dir = Path(tempfile.mkdtemp())
+
+    df = pd.DataFrame({
+        '手術日': ['2025/01/15', '2025/01/16', '2025/02/03', '2025/04/10'],
+        '患者ID': ['12345', '12346', '12347', '12348'],
+        '氏名': ['患者A', '患者B', '患者C', '患者D'],
+        '入外': ['外来', '入院', '外来', '外来'],
+        '術眼': ['右', '左', '右', '左'],
+        '手術': ['PEA+IOL', '緑内障手術', 'PEA+IOL', 'PEA+IOL'],
+        '医師': ['橋本', '植田', '橋本', '橋本'],
+        '麻酔': ['局所', '全身', '局所', '局所'],
+        '術前': ['', '', '', ''],
+        '手術日_比較': [True, True, True, True],
+        '入外_比較': [True, False, True, True],
+        '術眼_比較': [True, True, '未入力', True],
+        '手術_比較': [True, True, '未入力', True],
+        '医師_比較': [True, True, '未入力', True],
+        '麻酔_比較': ['未入力', False, '未入力', '未入力'],
+    })
+    comparison_path = temp_dir / 'comparison.csv'
+    df.to_csv(comparison_path, index=False, encoding='cp932')
+
+    yield {'dir': temp_dir, 'comparison': str(comparison_path), 'db': str(temp_dir / 'results.sqlite3')}
+
+    # クリーンアップ
+    import shutil
+    try:
+        shutil.rmtree(temp_dir)
+    except:
+        pass
+
+
+def test_compute_masks():
+    """不一致・未入力の項目がビットで表される"""
+    df = pd.DataFrame({
+        '入外_比較': [True, 'False'],
+        '術眼_比較': [False, True],
+        '手術_比較': [True, True],
+        '医師_比較': [True, '未入力'],
+        '麻酔_比較': ['未入力', True],
+    })
+
+    mismatch_mask, missing_mask = compute_masks(df)
+
+    assert mismatch_mask.tolist() == [2, 1]
+    assert missing_mask.tolist() == [16, 8]
+
+
+def test_store_comparison_results_inserts_run(temp_comparison_file):
+    """1回の実行として全行が保存される"""
+    run_id = store_comparison_results(temp_comparison_file['db'], temp_comparison_file['comparison'])
+
+    conn = sqlite3.connect(temp_comparison_file['db'])
+    try:
+        assert conn.execute("SELECT row_count FROM runs WHERE run_id = ?", (run_id,)).fetchone()[0] == 4
+        rows = conn.execute(
+            "SELECT patient_id, surgeon, mismatch_mask, missing_mask FROM comparison_results ORDER BY patient_id"
+        ).fetchall()
+        indexes = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    finally:
+        conn.close()
+
+    assert rows[0] == ('12345', '橋本', 0, 16)
+    assert rows[1] == ('12346', '植田', 1 | 16, 0)
+    assert {'idx_results_date_patient', 'idx_results_surgeon', 'idx_results_mismatch'} <= indexes
+
+
+def test_count_results(temp_comparison_file):
+    """医師・期間で絞り込んで未入力の件数を集計できる（同じ手術は1件として数える）"""
+    store_comparison_results(temp_comparison_file['db'], temp_comparison_file['comparison'])
+    store_comparison_results(temp_comparison_file['db'], temp_comparison_file['comparison'])
+
+    assert count_results(temp_comparison_file['db'], '麻酔', 'missing', surgeon='橋本') == 3
+    assert count_results(
+        temp_comparison_file['db'], '麻酔', 'missing', surgeon='橋本',
+        start_date='2025/01/01', end_date='2025/03/31'
+    ) == 2
+    assert count_results(temp_comparison_file['db'], '入外', 'mismatch') == 1
+
+
+def test_count_results_rejects_unknown_column(temp_comparison_file):
+    with pytest.raises(ValueError):
+        count_results(temp_comparison_file['db'], '術前')
+
+
+def test_find_changed_rows_after_update(temp_comparison_file):
+    """保存した状態と同じ行は変更なし、内容が変わった行は変更ありと判定される"""
+    df = pd.read_csv(temp_comparison_file['comparison'], encoding='cp932')
+    update_report_state(temp_comparison_file['db'], df, df)
+
+    df.loc[1, '医師'] = '増子'
+    changed = find_changed_rows(temp_comparison_file['db'], df)
+
+    assert changed.tolist() == [False, True, False, False]
@@ -1,10 +1,13 @@
 import tempfile
 from pathlib import Path
+from unittest.mock import patch
 
 import pandas as pd
 import pytest
 
 from service.surgery_comparator import compare_surgery_data
+from service.surgery_equivalence import compile_equivalence_table
+from service.surgery_similarity import SurgerySimilarity
 
 
 @pytest.fixture
@@ -182,3 +185,298 @@ def test_compare_surgery_data_handles_empty_schedule():
             shutil.rmtree(temp_dir)
         except:
             pass
+
+
+def test_compare_surgery_data_by_month_matches_default(temp_csv_files):
+    """メモリ予算を超える場合は手術月ごとに比較し、通常モードと同じ結果が出力される"""
+    search_path = Path(temp_csv_files['search'])
+    search_path.write_text(
+        search_path.read_text(encoding='cp932') + "2025/02/01,12348,患者D,外来,L,白内障手術,橋本,局所,検査D\n",
+        encoding='cp932'
+    )
+    monthly_path = str(Path(temp_csv_files['comparison']).with_name('comparison_monthly.csv'))
+
+    compare_surgery_data(temp_csv_files['search'], temp_csv_files['schedule'], temp_csv_files['comparison'])
+    with patch('service.surgery_comparator.exceeds_budget', return_value=True):
+        compare_surgery_data(
+            temp_csv_files['search'], temp_csv_files['schedule'], monthly_path,
+            low_memory=True, memory_budget_mb=1
+        )
+
+    expected = pd.read_csv(temp_csv_files['comparison'], encoding='cp932')
+    actual = pd.read_csv(monthly_path, encoding='cp932')
+    pd.testing.assert_frame_equal(actual, expected)
+    assert actual.iloc[3]['入外_比較'] == '未入力'
+
+
+def test_compare_surgery_data_incremental_matches_default(temp_csv_files):
+    """手術日ごとのキャッシュを使っても、入力の変更後に通常モードと同じ結果が出力される"""
+    cache_dir = str(Path(temp_csv_files['comparison']).with_name('cache'))
+    incremental_path = str(Path(temp_csv_files['comparison']).with_name('comparison_incremental.csv'))
+
+    compare_surgery_data(temp_csv_files['search'], temp_csv_files['schedule'], incremental_path, cache_dir=cache_dir)
+
+    search_path = Path(temp_csv_files['search'])
+    search_path.write_text(
+        search_path.read_text(encoding='cp932').replace('2025/01/16,12346,患者B,入院,L', '2025/01/16,12346,患者B,入院,R')
+        + "2025/02/01,12348,患者D,外来,L,白内障手術,橋本,局所,検査D\n",
+        encoding='cp932'
+    )
+
+    compare_surgery_data(temp_csv_files['search'], temp_csv_files['schedule'], temp_csv_files['comparison'])
+    compare_surgery_data(temp_csv_files['search'], temp_csv_files['schedule'], incremental_path, cache_dir=cache_dir)
+
+    expected = pd.read_csv(temp_csv_files['comparison'], encoding='cp932')
+    actual = pd.read_csv(incremental_path, encoding='cp932')
+    pd.testing.assert_frame_equal(actual, expected)
+    assert str(actual.iloc[1]['術眼_比較']) == 'False'
+
+
+def test_compare_surgery_data_date_tolerance(temp_csv_files):
+    """許容日数以内で手術日が異なる予定と照合し、手術日_比較をFalseとする"""
+    Path(temp_csv_files['schedule']).write_text(
+        """手術日,患者ID,氏名,入外,術眼,手術,医師,麻酔
+2025/01/15,12345,患者A,外来,R,白内障手術,橋本,局所
+2025/01/17,12346,患者B,入院,L,緑内障手術,植田,全身
+2025/01/10,12347,患者C,外来,B,白内障手術,増子,局所
+2025/01/18,12347,患者C,外来,L,白内障手術,増子,局所
+""", encoding='cp932')
+
+    compare_surgery_data(
+        temp_csv_files['search'], temp_csv_files['schedule'], temp_csv_files['comparison'],
+        date_tolerance_days=1
+    )
+
+    df = pd.read_csv(temp_csv_files['comparison'], encoding='cp932', dtype=str)
+    assert df['患者ID'].tolist() == ['12345', '12346', '12347']
+    assert df['手術日'].tolist() == ['2025/01/15', '2025/01/16', '2025/01/17']
+    assert df['手術日_比較'].tolist() == ['True', 'False', 'False']
+    # 患者Bは1日後の予定と照合されるため、他の項目は一致
+    assert df.iloc[1]['麻酔_比較'] == 'True'
+    # 患者Cは最も近い1日後の予定（術眼L）と照合される
+    assert df.iloc[2]['術眼_比較'] == 'False'
+
+
+def test_compare_surgery_data_date_tolerance_outside_window(temp_csv_files):
+    """許容日数を超えて離れた予定とは照合しない"""
+    Path(temp_csv_files['schedule']).write_text(
+        """手術日,患者ID,氏名,入外,術眼,手術,医師,麻酔
+2025/01/20,12346,患者B,入院,L,緑内障手術,植田,全身
+""", encoding='cp932')
+
+    compare_surgery_data(
+        temp_csv_files['search'], temp_csv_files['schedule'], temp_csv_files['comparison'],
+        date_tolerance_days=2
+    )
+
+    df = pd.read_csv(temp_csv_files['comparison'], encoding='cp932')
+    assert df['手術日_比較'].tolist() == ['未入力', '未入力', '未入力']
+    assert df['入外_比較'].tolist() == ['未入力', '未入力', '未入力']
+
+
+def test_compare_surgery_data_date_tolerance_unparsable_date(temp_csv_files):
+    """手術日が無く照合できない検索データの行も、検索データの値を同じ列に出力する"""
+    search_path = Path(temp_csv_files['search'])
+    search_path.write_text(
+        search_path.read_text(encoding='cp932').replace('2025/01/16,12346', ',12346'), encoding='cp932'
+    )
+
+    compare_surgery_data(
+        temp_csv_files['search'], temp_csv_files['schedule'], temp_csv_files['comparison'],
+        date_tolerance_days=1
+    )
+
+    df = pd.read_csv(temp_csv_files['comparison'], encoding='cp932', dtype=str)
+    assert list(df.columns) == [
+        '手術日', '患者ID', '氏名', '入外', '術眼', '手術', '医師', '麻酔', '術前',
+        '手術日_比較', '入外_比較', '術眼_比較', '手術_比較', '医師_比較', '麻酔_比較'
+    ]
+    assert df['患者ID'].tolist() == ['12345', '12346', '12347']
+    assert df['手術日'].isna().tolist() == [False, True, False]
+    assert df.iloc[1][['氏名', '入外', '術眼', '手術', '医師', '麻酔']].tolist() == [
+        '患者B', '入院', 'L', '緑内障手術', '植田', '全身'
+    ]
+    assert df.iloc[1]['入外_比較'] == '未入力'
+
+
+def test_compare_surgery_data_rejects_negative_tolerance(temp_csv_files):
+    with pytest.raises(ValueError):
+        compare_surgery_data(
+            temp_csv_files['search'], temp_csv_files['schedule'], temp_csv_files['comparison'],
+            date_tolerance_days=-1
+        )
+
+
+def test_compare_surgery_data_outer_join_reports_schedule_only(temp_csv_files):
+    """外部結合では予定表のみの手術を別のCSVに出力し、比較結果は通常モードと同じになる"""
+    schedule_path = Path(temp_csv_files['schedule'])
+    schedule_path.write_text(
+        schedule_path.read_text(encoding='cp932')
+        + "2025/01/15,99999,患者X,入院,R,硝子体手術,植田,全身\n"
+        + "2025/01/20,12345,患者A,外来,L,白内障手術,橋本,局所\n",
+        encoding='cp932'
+    )
+    outer_path = str(Path(temp_csv_files['comparison']).with_name('comparison_outer.csv'))
+    schedule_only_path = str(Path(temp_csv_files['comparison']).with_name('schedule_only.csv'))
+
+    compare_surgery_data(temp_csv_files['search'], temp_csv_files['schedule'], temp_csv_files['comparison'])
+    compare_surgery_data(
+        temp_csv_files['search'], temp_csv_files['schedule'], outer_path,
+        join_mode='outer', schedule_only_result=schedule_only_path
+    )
+
+    expected = pd.read_csv(temp_csv_files['comparison'], encoding='cp932')
+    actual = pd.read_csv(outer_path, encoding='cp932')
+    pd.testing.assert_frame_equal(actual, expected)
+
+    df_schedule_only = pd.read_csv(schedule_only_path, encoding='cp932', dtype=str)
+    assert list(df_schedule_only.columns) == ['手術日', '患者ID', '氏名', '入外', '術眼', '手術', '医師', '麻酔']
+    assert df_schedule_only['患者ID'].tolist() == ['99999', '12345']
+    assert df_schedule_only['手術日'].tolist() == ['2025/01/15', '2025/01/20']
+    assert df_schedule_only.iloc[0]['手術'] == '硝子体手術'
+
+
+def test_compare_surgery_data_outer_join_with_date_tolerance(temp_csv_files):
+    """許容日数以内で照合された予定は予定表のみの手術に含まれない"""
+    Path(temp_csv_files['schedule']).write_text(
+        """手術日,患者ID,氏名,入外,術眼,手術,医師,麻酔
+2025/01/15,12345,患者A,外来,R,白内障手術,橋本,局所
+2025/01/17,12346,患者B,入院,L,緑内障手術,植田,全身
+2025/01/25,12347,患者C,外来,B,白内障手術,増子,局所
+""", encoding='cp932')
+
+    compare_surgery_data(
+        temp_csv_files['search'], temp_csv_files['schedule'], temp_csv_files['comparison'],
+        date_tolerance_days=1, join_mode='outer'
+    )
+
+    df = pd.read_csv(temp_csv_files['comparison'], encoding='cp932', dtype=str)
+    assert df['手術日_比較'].tolist() == ['True', 'False', '未入力']
+
+    schedule_only_path = Path(temp_csv_files['comparison']).with_name('comparison_予定のみ.csv')
+    df_schedule_only = pd.read_csv(schedule_only_path, encoding='cp932', dtype=str)
+    assert df_schedule_only['患者ID'].tolist() == ['12347']
+    assert df_schedule_only['手術日'].tolist() == ['2025/01/25']
+
+
+def test_compare_surgery_data_rejects_unknown_join_mode(temp_csv_files):
+    with pytest.raises(ValueError):
+        compare_surgery_data(
+            temp_csv_files['search'], temp_csv_files['schedule'], temp_csv_files['comparison'],
+            join_mode='right'
+        )
+
+
+def test_compare_surgery_data_pairs_same_day_rows(temp_csv_files):
+    """同じ手術日・患者IDの行が複数あっても行は増えず、項目の一致数が多い行どうしが対応付けられる"""
+    Path(temp_csv_files['search']).write_text(
+        """手術日,患者ID,氏名,入外,術眼,手術,医師,麻酔,術前
+2025/01/15,12345,患者A,外来,R,白内障手術,橋本,局所,検査A
+2025/01/15,12345,患者A,外来,L,硝子体手術,植田,全身,検査A
+""", encoding='cp932')
+    Path(temp_csv_files['schedule']).write_text(
+        """手術日,患者ID,氏名,入外,術眼,手術,医師,麻酔
+2025/01/15,12345,患者A,外来,L,硝子体手術,植田,全身
+2025/01/15,12345,患者A,外来,R,白内障手術,橋本,局所
+2025/01/15,12345,患者A,外来,B,緑内障手術,増子,局所
+""", encoding='cp932')
+    schedule_only_path = str(Path(temp_csv_files['comparison']).with_name('schedule_only.csv'))
+
+    with patch('service.surgery_comparator.logging') as mock_logging:
+        compare_surgery_data(
+            temp_csv_files['search'], temp_csv_files['schedule'], temp_csv_files['comparison'],
+            join_mode='outer', schedule_only_result=schedule_only_path
+        )
+
+    df = pd.read_csv(temp_csv_files['comparison'], encoding='cp932', dtype=str)
+    assert df['手術'].tolist() == ['白内障手術', '硝子体手術']
+    for column in ['入外', '術眼', '手術', '医師', '麻酔']:
+        assert df[f'{column}_比較'].tolist() == ['True', 'True']
+
+    # 対応しなかった予定表の行は予定表のみの手術として出力される
+    df_schedule_only = pd.read_csv(schedule_only_path, encoding='cp932')
+    assert df_schedule_only['手術'].tolist() == ['緑内障手術']
+
+    warnings = ' '.join(str(call.args[0]) for call in mock_logging.warning.call_args_list)
+    assert '患者ID=12345: 検索データ2件, 予定表3件' in warnings
+
+
+def test_compare_surgery_data_pairs_large_groups_by_order(temp_csv_files):
+    """組み合わせが多いキーは出現順に1対1で対応付けられる"""
+    rows = 12
+    Path(temp_csv_files['search']).write_text(
+        "手術日,患者ID,氏名,入外,術眼,手術,医師,麻酔,術前\n"
+        + ''.join(f"2025/01/15,12345,患者A,外来,R,手術{index},橋本,局所,検査A\n" for index in range(rows)),
+        encoding='cp932'
+    )
+    Path(temp_csv_files['schedule']).write_text(
+        "手術日,患者ID,氏名,入外,術眼,手術,医師,麻酔\n"
+        + ''.join(f"2025/01/15,12345,患者A,外来,R,手術{index},橋本,局所\n" for index in range(rows)),
+        encoding='cp932'
+    )
+
+    compare_surgery_data(temp_csv_files['search'], temp_csv_files['schedule'], temp_csv_files['comparison'])
+
+    df = pd.read_csv(temp_csv_files['comparison'], encoding='cp932')
+    assert len(df) == rows
+    assert df['手術_比較'].all()
+
+
+def test_compare_surgery_data_categories_differ_between_files(temp_csv_files):
+    """検索データと予定表で値の種類が異なっても、共通のカテゴリで正しく比較される"""
+    Path(temp_csv_files['schedule']).write_text(
+        """手術日,患者ID,氏名,入外,術眼,手術,医師,麻酔
+2025/01/15,12345,患者A,入院,R,白内障手術,佐藤,局所
+2025/01/16,12346,患者B,入院,L,緑内障手術,植田,
+2025/01/17,12347,患者C,外来,B,白内障手術,増子,局所
+""", encoding='cp932')
+
+    compare_surgery_data(temp_csv_files['search'], temp_csv_files['schedule'], temp_csv_files['comparison'])
+
+    df = pd.read_csv(temp_csv_files['comparison'], encoding='cp932', dtype=str)
+    assert df['入外_比較'].tolist() == ['False', 'True', 'True']
+    assert df['術眼_比較'].tolist() == ['True', 'True', 'True']
+    assert df['医師_比較'].tolist() == ['False', 'True', 'True']
+    assert df['麻酔_比較'].tolist() == ['True', '未入力', 'True']
+
+
+def test_compare_surgery_data_surgery_equivalence(temp_csv_files):
+    """同じクラスの手術名は表記が異なっても一致と判定される"""
+    schedule_path = Path(temp_csv_files['schedule'])
+    schedule_path.write_text(
+        schedule_path.read_text(encoding='cp932').replace('2025/01/15,12345,患者A,外来,R,白内障手術',
+                                                          '2025/01/15,12345,患者A,外来,R,水晶体再建術'),
+        encoding='cp932'
+    )
+    table = compile_equivalence_table({'白内障手術': ['水晶体再建術']})
+
+    compare_surgery_data(temp_csv_files['search'], temp_csv_files['schedule'], temp_csv_files['comparison'])
+    df_default = pd.read_csv(temp_csv_files['comparison'], encoding='cp932')
+    compare_surgery_data(
+        temp_csv_files['search'], temp_csv_files['schedule'], temp_csv_files['comparison'],
+        surgery_equivalence=table
+    )
+    df = pd.read_csv(temp_csv_files['comparison'], encoding='cp932')
+
+    assert df_default['手術_比較'].tolist() == [False, True, True]
+    assert df['手術_比較'].tolist() == [True, True, True]
+    # 出力する手術名は検索データのまま
+    assert df['手術'].tolist() == df_default['手術'].tolist()
+
+
+def test_compare_surgery_data_surgery_similarity(temp_csv_files):
+    """手術名が似ている場合は手術_比較が類似になる"""
+    schedule_path = Path(temp_csv_files['schedule'])
+    schedule_path.write_text(
+        schedule_path.read_text(encoding='cp932').replace('2025/01/16,12346,患者B,入院,L,緑内障手術',
+                                                          '2025/01/16,12346,患者B,入院,L,緑内障手術(左)'),
+        encoding='cp932'
+    )
+
+    compare_surgery_data(
+        temp_csv_files['search'], temp_csv_files['schedule'], temp_csv_files['comparison'],
+        surgery_similarity=SurgerySimilarity(threshold=0.7)
+    )
+
+    df = pd.read_csv(temp_csv_files['comparison'], encoding='cp932', dtype=str)
+    assert df['手術_比較'].tolist() == ['True', '類似', 'True']
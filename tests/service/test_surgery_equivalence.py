@@ -0,0 +1,54 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from service.surgery_equivalence import (
+    MISSING_CLASS_ID,
+    compile_equivalence_table,
+    map_to_class_ids,
+    normalize_surgery_name,
+)
+
+
+def test_normalize_surgery_name():
+    """全角・半角を揃え、空白を除去する"""
+    assert normalize_surgery_name('ＰＥＡ＋ＩＯＬ') == 'PEA+IOL'
+    assert normalize_surgery_name(' 白内障　手術 ') == '白内障手術'
+
+
+def test_compile_equivalence_table_maps_aliases_to_same_class():
+    table = compile_equivalence_table(
+        {'白内障手術': ['水晶体再建術', 'PEA+IOL'], '緑内障手術': ['線維柱帯切除術']},
+        [('硝子体手術', r'^硝子体')]
+    )
+
+    assert table.class_id('水晶体再建術') == table.class_id('白内障手術')
+    assert table.class_id('ｐｅａ＋ｉｏｌ') is None
+    assert table.class_id('ＰＥＡ＋ＩＯＬ') == table.class_id('白内障手術')
+    assert table.class_id('線維柱帯切除術') != table.class_id('白内障手術')
+    assert table.class_id('硝子体切除術') == table.class_id('硝子体手術')
+    assert table.class_id('斜視手術') is None
+
+
+def test_compile_equivalence_table_rejects_conflicting_alias():
+    with pytest.raises(ValueError):
+        compile_equivalence_table({'白内障手術': ['PEA'], '緑内障手術': ['PEA']})
+
+
+def test_compile_equivalence_table_rejects_invalid_pattern():
+    with pytest.raises(ValueError):
+        compile_equivalence_table({}, [('硝子体手術', '(')])
+
+
+def test_map_to_class_ids_shares_ids_between_columns():
+    """クラスに無い手術名も両方の列で同じIDになり、欠損はMISSING_CLASS_IDになる"""
+    table = compile_equivalence_table({'白内障手術': ['水晶体再建術']})
+    search = pd.Series(['白内障手術', '斜視手術', None, '斜視 手術'], index=[10, 11, 12, 13])
+    schedule = pd.Series(['水晶体再建術', '斜視手術', '白内障手術', '眼瞼下垂手術'])
+
+    search_ids, schedule_ids = map_to_class_ids(table, search, schedule)
+
+    assert (search_ids == schedule_ids).tolist() == [True, True, False, False]
+    assert search_ids[2] == MISSING_CLASS_ID
+    assert search_ids[3] == search_ids[1]
+    assert search_ids.dtype == np.int64
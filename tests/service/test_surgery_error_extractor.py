@@ -1,6 +1,5 @@
 import tempfile
 from pathlib import Path
-from unittest.mock import patch
 
 import pandas as pd
 import pytest
@@ -78,26 +77,15 @@ def temp_template_file():
 
 def test_surgery_error_extractor_creates_file_with_errors(temp_comparison_file, temp_template_file):
     """エラーがある場合にファイルが作成される"""
-    # テンプレートファイルのパスを直接書き換える
-    import service.surgery_error_extractor as extractor_module
-    original_path = r'C:\Shinseikai\OPHChecker\眼科手術指示確認.xlsx'
+    result = surgery_error_extractor(
+        temp_comparison_file['comparison'],
+        temp_comparison_file['output_dir'],
+        temp_template_file
+    )
 
-    # モジュール内のハードコードされたパスをパッチ
-    with patch.object(extractor_module, '__file__', temp_comparison_file['temp_dir']):
-        # load_workbookをモックしてテンプレートファイルを使用
-        with patch('service.surgery_error_extractor.load_workbook') as mock_load:
-            from openpyxl import load_workbook
-            mock_load.return_value = load_workbook(temp_template_file)
-
-            result = surgery_error_extractor(
-                temp_comparison_file['comparison'],
-                temp_comparison_file['output_dir'],
-                temp_template_file
-            )
-
-            # ファイルパスが返される
-            assert result != ""
-            assert Path(result).exists()
+    # ファイルパスが返される
+    assert result != ""
+    assert Path(result).exists()
 
 
 def test_surgery_error_extractor_returns_empty_without_errors(temp_template_file):
@@ -135,86 +123,70 @@ def test_surgery_error_extractor_returns_empty_without_errors(temp_template_file
 
 def test_surgery_error_extractor_extracts_false_records(temp_comparison_file, temp_template_file):
     """未入力のレコードが抽出される"""
-    with patch('service.surgery_error_extractor.load_workbook') as mock_load:
-        from openpyxl import load_workbook
-        mock_load.return_value = load_workbook(temp_template_file)
+    result = surgery_error_extractor(
+        temp_comparison_file['comparison'],
+        temp_comparison_file['output_dir'],
+        temp_template_file
+    )
 
-        result = surgery_error_extractor(
-            temp_comparison_file['comparison'],
-            temp_comparison_file['output_dir'],
-            temp_template_file
-        )
+    # 結果ファイルを読み込み
+    df = pd.read_excel(result)
 
-        # 結果ファイルを読み込み
-        df = pd.read_excel(result)
+    # 未入力のレコードが抽出される（現在の実装ではFalse文字列は抽出されない）
+    assert len(df) >= 1
 
-        # 未入力のレコードが抽出される（現在の実装ではFalse文字列は抽出されない）
-        assert len(df) >= 1
-
-        # 患者Cが含まれる（未入力）
-        assert '患者C' in df['氏名'].values
+    # 患者Cが含まれる（未入力）
+    assert '患者C' in df['氏名'].values
 
 
 def test_surgery_error_extractor_extracts_uninput_records(temp_comparison_file, temp_template_file):
     """未入力のレコードが抽出される"""
-    with patch('service.surgery_error_extractor.load_workbook') as mock_load:
-        from openpyxl import load_workbook
-        mock_load.return_value = load_workbook(temp_template_file)
+    result = surgery_error_extractor(
+        temp_comparison_file['comparison'],
+        temp_comparison_file['output_dir'],
+        temp_template_file
+    )
 
-        result = surgery_error_extractor(
-            temp_comparison_file['comparison'],
-            temp_comparison_file['output_dir'],
-            temp_template_file
-        )
+    # 結果ファイルを読み込み
+    df = pd.read_excel(result)
 
-        # 結果ファイルを読み込み
-        df = pd.read_excel(result)
-
-        # 患者Cが含まれる（未入力）
-        assert '患者C' in df['氏名'].values
+    # 患者Cが含まれる（未入力）
+    assert '患者C' in df['氏名'].values
 
 
 def test_surgery_error_extractor_correct_columns(temp_comparison_file, temp_template_file):
     """正しい列が出力される"""
-    with patch('service.surgery_error_extractor.load_workbook') as mock_load:
-        from openpyxl import load_workbook
-        mock_load.return_value = load_workbook(temp_template_file)
-
-        result = surgery_error_extractor(
-            temp_comparison_file['comparison'],
-            temp_comparison_file['output_dir'],
-            temp_template_file
-        )
+    result = surgery_error_extractor(
+        temp_comparison_file['comparison'],
+        temp_comparison_file['output_dir'],
+        temp_template_file
+    )
 
-        # 結果ファイルを読み込み
-        df = pd.read_excel(result)
+    # 結果ファイルを読み込み
+    df = pd.read_excel(result)
 
-        expected_columns = [
-            '手術日', '患者ID', '氏名', '入外', '術眼', '手術', '医師', '麻酔', '術前',
-            '入外_比較', '術眼_比較', '手術_比較', '医師_比較', '麻酔_比較'
-        ]
+    expected_columns = [
+        '手術日', '患者ID', '氏名', '入外', '術眼', '手術', '医師', '麻酔', '術前',
+        '入外_比較', '術眼_比較', '手術_比較', '医師_比較', '麻酔_比較'
+    ]
 
-        assert list(df.columns) == expected_columns
+    assert list(df.columns) == expected_columns
 
 
 def test_surgery_error_extractor_filename_format(temp_comparison_file, temp_template_file):
     """ファイル名が正しい形式で作成される"""
-    with patch('service.surgery_error_extractor.load_workbook') as mock_load:
-        from openpyxl import load_workbook
-        mock_load.return_value = load_workbook(temp_template_file)
+    result = surgery_error_extractor(
+        temp_comparison_file['comparison'],
+        temp_comparison_file['output_dir'],
+        temp_template_file
+    )
 
-        result = surgery_error_extractor(
-            temp_comparison_file['comparison'],
-            temp_comparison_file['output_dir'],
-            temp_template_file
-        )
+    filename = Path(result).name
 
-        filename = Path(result).name
-
-        # ファイル名の形式を確認
-        assert filename.startswith('眼科手術指示確認')
-        assert filename.endswith('.xlsx')
-        assert len(filename) == len('眼科手術指示確認YYYYMMDD_HHMM.xlsx')
+    # ファイル名の形式を確認
+    assert filename.startswith('眼科手術指示確認')
+    assert filename.endswith('.xlsx')
+    assert len(filename) == len('眼科手術指示確認YYYYMMDD_HHMM.xlsx')
 
 
 def test_surgery_error_extractor_creates_output_directory(temp_comparison_file, temp_template_file):
@@ -223,16 +195,269 @@ def test_surgery_error_extractor_creates_output_directory(temp_comparison_file,
     import shutil
     shutil.rmtree(temp_comparison_file['output_dir'])
 
-    with patch('service.surgery_error_extractor.load_workbook') as mock_load:
-        from openpyxl import load_workbook
-        mock_load.return_value = load_workbook(temp_template_file)
+    result = surgery_error_extractor(
+        temp_comparison_file['comparison'],
+        temp_comparison_file['output_dir'],
+        temp_template_file
+    )
+
+    # ディレクトリが作成されている
+    assert Path(temp_comparison_file['output_dir']).exists()
+    assert Path(result).exists()
+
+
+def test_surgery_error_extractor_streaming_matches_normal(temp_comparison_file, temp_template_file):
+    """閾値を超えて書き込み専用モードになっても同じ内容が出力される"""
+    normal_result = surgery_error_extractor(
+        temp_comparison_file['comparison'],
+        temp_comparison_file['output_dir'],
+        temp_template_file
+    )
+    df_normal = pd.read_excel(normal_result)
+    Path(normal_result).unlink()
+
+    streaming_result = surgery_error_extractor(
+        temp_comparison_file['comparison'],
+        temp_comparison_file['output_dir'],
+        temp_template_file,
+        streaming_row_threshold=0
+    )
+    df_streaming = pd.read_excel(streaming_result)
+
+    pd.testing.assert_frame_equal(df_streaming, df_normal)
+
+
+def test_surgery_error_extractor_multiple_formats(temp_comparison_file, temp_template_file):
+    """複数の出力形式を指定すると同じ内容のxlsx・csv・htmlが作成される"""
+    result = surgery_error_extractor(
+        temp_comparison_file['comparison'],
+        temp_comparison_file['output_dir'],
+        temp_template_file,
+        output_formats=['xlsx', 'csv', 'html']
+    )
+
+    xlsx_path = Path(result)
+    csv_path = xlsx_path.with_suffix('.csv')
+    html_path = xlsx_path.with_suffix('.html')
+
+    assert xlsx_path.suffix == '.xlsx'
+    assert csv_path.exists()
+    assert html_path.exists()
+
+    df_xlsx = pd.read_excel(xlsx_path)
+    df_csv = pd.read_csv(csv_path, encoding='cp932')
+    assert df_csv['氏名'].tolist() == df_xlsx['氏名'].tolist()
+    assert '未入力' in html_path.read_text(encoding='utf-8')
+
+
+def test_surgery_error_extractor_rejects_unknown_format(temp_comparison_file, temp_template_file):
+    """不正な出力形式を指定するとValueErrorが発生する"""
+    with pytest.raises(ValueError):
+        surgery_error_extractor(
+            temp_comparison_file['comparison'],
+            temp_comparison_file['output_dir'],
+            temp_template_file,
+            output_formats=['pdf']
+        )
+
+
+def test_surgery_error_extractor_writes_comparison_copy(temp_comparison_file, temp_template_file):
+    """comparisonを指定すると比較結果全体のCSVが出力され、形式ごとの結果が通知される"""
+    results = []
+    result = surgery_error_extractor(
+        temp_comparison_file['comparison'],
+        temp_comparison_file['output_dir'],
+        temp_template_file,
+        output_formats=['xlsx', 'csv', 'comparison'],
+        on_writer_done=results.append
+    )
+
+    assert Path(result).suffix == '.xlsx'
+    assert [writer_result.output_format for writer_result in results] == ['xlsx', 'csv', 'comparison']
+    assert all(writer_result.succeeded for writer_result in results)
+
+    comparison_copy = Path(results[2].output_filepath)
+    assert comparison_copy.name.startswith('比較結果')
+    df_original = pd.read_csv(temp_comparison_file['comparison'], encoding='cp932')
+    df_copy = pd.read_csv(comparison_copy, encoding='cp932')
+    pd.testing.assert_frame_equal(df_copy, df_original)
+
+
+def test_surgery_error_extractor_raises_when_all_writers_fail(temp_comparison_file):
+    """すべての形式の出力に失敗した場合はRuntimeErrorが発生する"""
+    with pytest.raises(RuntimeError):
+        surgery_error_extractor(
+            temp_comparison_file['comparison'],
+            temp_comparison_file['output_dir'],
+            str(Path(temp_comparison_file['output_dir']) / 'missing_template.xlsx')
+        )
+
+
+def test_surgery_error_extractor_delta_reports_only_new_rows(temp_comparison_file, temp_template_file):
+    """差分出力では前回から新規・変更された不一致・未入力の行のみ出力される"""
+    state_db_path = str(Path(temp_comparison_file['temp_dir']) / 'results.sqlite3')
+
+    first = surgery_error_extractor(
+        temp_comparison_file['comparison'],
+        temp_comparison_file['output_dir'],
+        temp_template_file,
+        report_mode='delta',
+        state_db_path=state_db_path
+    )
+    assert '患者C' in pd.read_excel(first)['氏名'].values
+    Path(first).unlink()
+
+    # 変更が無ければ出力せず、変化の無い不一致・未入力の件数を通知する
+    unchanged_counts = []
+    assert surgery_error_extractor(
+        temp_comparison_file['comparison'],
+        temp_comparison_file['output_dir'],
+        temp_template_file,
+        report_mode='delta',
+        state_db_path=state_db_path,
+        on_unchanged_errors=unchanged_counts.append
+    ) == ""
+    assert unchanged_counts == [1]
+
+    # 新たに未入力となった行だけが出力される
+    df = pd.read_csv(temp_comparison_file['comparison'], encoding='cp932')
+    df.loc[0, '麻酔_比較'] = '未入力'
+    df.to_csv(temp_comparison_file['comparison'], index=False, encoding='cp932')
+
+    delta = surgery_error_extractor(
+        temp_comparison_file['comparison'],
+        temp_comparison_file['output_dir'],
+        temp_template_file,
+        report_mode='delta',
+        state_db_path=state_db_path
+    )
+    assert pd.read_excel(delta)['氏名'].tolist() == ['患者A']
+
+
+def test_surgery_error_extractor_delta_keeps_state_when_all_writers_fail(temp_comparison_file, temp_template_file):
+    """すべての形式の出力に失敗した場合は前回の状態を更新せず、次回の差分出力で同じ行を出力する"""
+    state_db_path = str(Path(temp_comparison_file['temp_dir']) / 'results.sqlite3')
+
+    with pytest.raises(RuntimeError):
+        surgery_error_extractor(
+            temp_comparison_file['comparison'],
+            temp_comparison_file['output_dir'],
+            str(Path(temp_comparison_file['output_dir']) / 'missing_template.xlsx'),
+            report_mode='delta',
+            state_db_path=state_db_path
+        )
+
+    result = surgery_error_extractor(
+        temp_comparison_file['comparison'],
+        temp_comparison_file['output_dir'],
+        temp_template_file,
+        report_mode='delta',
+        state_db_path=state_db_path
+    )
+    assert '患者C' in pd.read_excel(result)['氏名'].values
 
+
+def test_surgery_error_extractor_full_report_with_state(temp_comparison_file, temp_template_file):
+    """全件出力では前回の状態にかかわらずすべての行が出力される"""
+    state_db_path = str(Path(temp_comparison_file['temp_dir']) / 'results.sqlite3')
+
+    for _ in range(2):
         result = surgery_error_extractor(
             temp_comparison_file['comparison'],
             temp_comparison_file['output_dir'],
-            temp_template_file
+            temp_template_file,
+            report_mode='full',
+            state_db_path=state_db_path
         )
+        assert '患者C' in pd.read_excel(result)['氏名'].values
+        Path(result).unlink()
+
+
+def test_surgery_error_extractor_delta_requires_state_db(temp_comparison_file, temp_template_file):
+    with pytest.raises(ValueError):
+        surgery_error_extractor(
+            temp_comparison_file['comparison'],
+            temp_comparison_file['output_dir'],
+            temp_template_file,
+            report_mode='delta'
+        )
+
 
-        # ディレクトリが作成されている
-        assert Path(temp_comparison_file['output_dir']).exists()
-        assert Path(result).exists()
+@pytest.mark.parametrize('streaming_row_threshold', [20_000, 0])
+def test_surgery_error_extractor_writes_schedule_only_sheet(
+        temp_comparison_file, temp_template_file, streaming_row_threshold):
+    """予定表のみの手術はxlsxの「予定のみ」シートに出力される"""
+    schedule_only_path = Path(temp_comparison_file['temp_dir']) / 'schedule_only.csv'
+    pd.DataFrame({
+        '手術日': ['2025/01/20'],
+        '患者ID': [99999],
+        '氏名': ['患者X'],
+        '入外': ['入院'],
+        '術眼': ['R'],
+        '手術': ['硝子体手術'],
+        '医師': ['植田'],
+        '麻酔': ['全身'],
+    }).to_csv(schedule_only_path, index=False, encoding='cp932')
+
+    result = surgery_error_extractor(
+        temp_comparison_file['comparison'],
+        temp_comparison_file['output_dir'],
+        temp_template_file,
+        streaming_row_threshold=streaming_row_threshold,
+        schedule_only_result=str(schedule_only_path)
+    )
+
+    sheets = pd.read_excel(result, sheet_name=None)
+    assert list(sheets) == ['Sheet', '予定のみ']
+    assert '患者C' in sheets['Sheet']['氏名'].values
+    df_schedule_only = sheets['予定のみ']
+    assert df_schedule_only['患者ID'].tolist() == [99999]
+    assert df_schedule_only['手術'].tolist() == ['硝子体手術']
+
+
+def test_surgery_error_extractor_writes_parse_error_sheet(temp_comparison_file, temp_template_file):
+    """術式を分割できなかった予定表の行はxlsxの「術式エラー」シートに出力される"""
+    temp_dir = Path(temp_comparison_file['temp_dir'])
+    schedule_only_path = temp_dir / 'schedule_only.csv'
+    pd.DataFrame(columns=['手術日', '患者ID', '氏名', '入外', '術眼', '手術', '医師', '麻酔']).to_csv(
+        schedule_only_path, index=False, encoding='cp932'
+    )
+    parse_error_path = temp_dir / 'parse_error.csv'
+    pd.DataFrame({
+        'シート': ['南館2'],
+        '行': [5],
+        '手術日': ['2025/01/20'],
+        '患者ID': [99999],
+        '氏名': ['患者X'],
+        '術式': ['白内障手術'],
+    }).to_csv(parse_error_path, index=False, encoding='cp932')
+
+    result = surgery_error_extractor(
+        temp_comparison_file['comparison'],
+        temp_comparison_file['output_dir'],
+        temp_template_file,
+        schedule_only_result=str(schedule_only_path),
+        parse_error_result=str(parse_error_path)
+    )
+
+    sheets = pd.read_excel(result, sheet_name=None)
+    assert list(sheets) == ['Sheet', '術式エラー']
+    assert sheets['術式エラー']['行'].tolist() == [5]
+    assert sheets['術式エラー']['術式'].tolist() == ['白内障手術']
+
+
+def test_surgery_error_extractor_extracts_similar_records(temp_comparison_file, temp_template_file):
+    """手術名が類似の行も確認のため抽出される"""
+    df = pd.read_csv(temp_comparison_file['comparison'], encoding='cp932')
+    df['手術_比較'] = ['類似', 'True', '未入力']
+    df.to_csv(temp_comparison_file['comparison'], index=False, encoding='cp932')
+
+    result = surgery_error_extractor(
+        temp_comparison_file['comparison'],
+        temp_comparison_file['output_dir'],
+        temp_template_file
+    )
+
+    df_result = pd.read_excel(result)
+    assert '患者A' in df_result['氏名'].values
+    assert df_result.loc[df_result['氏名'] == '患者A', '手術_比較'].tolist() == ['類似']
@@ -4,7 +4,15 @@ from pathlib import Path
 import pandas as pd
 import pytest
 
-from service.surgery_schedule_processor import process_surgery_schedule
+from service.input_schema import SchemaValidationError
+from service.normalization import NormalizationRules
+from service.replacement_engine import compile_replacements
+from service.surgery_schedule_processor import (
+    get_parse_error_path,
+    process_surgery_schedule,
+    split_surgery_field,
+    validate_surgery_schedule,
+)
 
 
 @pytest.fixture
@@ -67,7 +75,7 @@ def test_process_surgery_schedule_correct_columns(temp_excel_file):
 
     df = pd.read_csv(temp_excel_file['output'], encoding='cp932')
 
-    expected_columns = ['手術日', '患者ID', '氏名', '入外', '術眼', '手術', '医師', '麻酔']
+    expected_columns = ['手術日', '患者ID', '氏名', '入外', '術眼', '手術', '医師', '麻酔', 'シート']
     assert list(df.columns) == expected_columns
 
 
@@ -84,6 +92,99 @@ def test_process_surgery_schedule_splits_surgery_field(temp_excel_file):
     assert df.iloc[0]['手術'] == '白内障手術'
 
 
+def test_split_surgery_field():
+    """術式を最初の閉じ括弧で分割し、閉じ括弧が無い術式は分割できなかった行とする"""
+    surgery = pd.Series(['R)白内障手術', ' L ) 緑内障手術 ', 'B)PEA)IOL', '白内障手術', None])
+
+    parts, unparsed = split_surgery_field(surgery)
+
+    assert parts['術眼'].tolist()[:3] == ['R', 'L', 'B']
+    assert parts['手術'].tolist()[:4] == ['白内障手術', '緑内障手術', 'PEA)IOL', '白内障手術']
+    assert pd.isna(parts['術眼'].iloc[3])
+    assert parts.iloc[4].isna().all()
+    assert unparsed.tolist() == [False, False, False, True, False]
+
+
+def test_process_surgery_schedule_reports_unparsable_surgery(temp_excel_file):
+    """閉じ括弧の無い術式は術眼を欠損とし、シート名と行番号を術式エラーのCSVに出力する"""
+    from openpyxl import load_workbook
+
+    wb = load_workbook(temp_excel_file['input'])
+    wb['南館2'].append(['2025/01/17', 12347, '患者C', '外来', '白内障手術', '局所', '橋本', 'データ3'])
+    wb.save(temp_excel_file['input'])
+
+    process_surgery_schedule(temp_excel_file['input'], temp_excel_file['output'])
+
+    df = pd.read_csv(temp_excel_file['output'], encoding='cp932')
+    row = df[df['患者ID'] == 12347].iloc[0]
+    assert pd.isna(row['術眼'])
+    assert row['手術'] == '白内障手術'
+
+    df_parse_errors = pd.read_csv(get_parse_error_path(temp_excel_file['output']), encoding='cp932')
+    assert df_parse_errors.to_dict('records') == [{
+        'シート': '南館2', '行': 5, '手術日': '2025/01/17', '患者ID': 12347, '氏名': '患者C', '術式': '白内障手術'
+    }]
+
+
+def test_process_surgery_schedule_parse_errors_after_blank_rows(temp_excel_file):
+    """途中に空の行があってもExcelの行番号を出力し、術式が空欄の行も術式エラーとする"""
+    from openpyxl import load_workbook
+
+    wb = load_workbook(temp_excel_file['input'])
+    ws = wb['南館2']
+    ws.cell(row=7, column=1, value='2025/01/17')
+    ws.cell(row=7, column=2, value=12347)
+    ws.cell(row=7, column=3, value='患者C')
+    ws.cell(row=7, column=5, value='白内障手術')
+    ws.cell(row=9, column=1, value='2025/01/18')
+    ws.cell(row=9, column=2, value=12348)
+    ws.cell(row=9, column=3, value='患者D')
+    wb.save(temp_excel_file['input'])
+
+    process_surgery_schedule(temp_excel_file['input'], temp_excel_file['output'])
+
+    df_parse_errors = pd.read_csv(get_parse_error_path(temp_excel_file['output']), encoding='cp932')
+    assert df_parse_errors['行'].tolist() == [7, 9]
+    assert df_parse_errors['患者ID'].tolist() == [12347, 12348]
+    assert pd.isna(df_parse_errors['術式'].iloc[1])
+
+
+def test_process_surgery_schedule_writes_empty_parse_errors(temp_excel_file):
+    """分割できない術式が無い場合も、見出しだけの術式エラーのCSVを出力する"""
+    process_surgery_schedule(temp_excel_file['input'], temp_excel_file['output'])
+
+    df_parse_errors = pd.read_csv(get_parse_error_path(temp_excel_file['output']), encoding='cp932')
+    assert len(df_parse_errors) == 0
+    assert list(df_parse_errors.columns) == ['シート', '行', '手術日', '患者ID', '氏名', '術式']
+
+
+def test_process_surgery_schedule_low_memory_matches_default(temp_excel_file):
+    """低メモリモードでも通常モードと同じ結果が出力される"""
+    process_surgery_schedule(temp_excel_file['input'], temp_excel_file['output'])
+    expected = pd.read_csv(temp_excel_file['output'], encoding='cp932')
+
+    process_surgery_schedule(temp_excel_file['input'], temp_excel_file['output'], low_memory=True)
+    actual = pd.read_csv(temp_excel_file['output'], encoding='cp932')
+
+    pd.testing.assert_frame_equal(actual, expected)
+
+
+def test_process_surgery_schedule_applies_normalization(temp_excel_file):
+    """正規化のルールを指定すると、予定表にも手術検索データと同じ置換・除外が適用される"""
+    normalization = NormalizationRules(
+        replacements=compile_replacements({'麻酔': {'局所': '局所麻酔'}, '医師': {'/^植/': '植田医師'}}),
+        surgery_strings_to_remove=('手術',),
+        exclusion_keywords=('緑内障',),
+    )
+
+    process_surgery_schedule(temp_excel_file['input'], temp_excel_file['output'], normalization=normalization)
+
+    df = pd.read_csv(temp_excel_file['output'], encoding='cp932')
+    assert df['麻酔'].tolist() == ['局所麻酔']
+    assert df['医師'].tolist() == ['橋本']
+    assert df['手術'].tolist() == ['白内障']
+
+
 def test_process_surgery_schedule_date_format(temp_excel_file):
     """日付がYYYY/MM/DD形式に変換される"""
     process_surgery_schedule(
@@ -151,3 +252,131 @@ def test_process_surgery_schedule_with_different_sheet_name():
             shutil.rmtree(temp_dir)
         except:
             pass
+
+
+@pytest.fixture
+def temp_multi_sheet_excel_file():
+    """複数シートを持つ一時的なExcelファイルを作成"""
+    temp_dir = tempfile.mkdtemp()
+
+    from openpyxl import Workbook
+
+    excel_path = Path(temp_dir) / 'schedule.xlsx'
+
+    wb = Workbook()
+    sheets = {
+        '南館2': [['2025/01/16', 12346, '患者B', '入院', 'L)緑内障手術', '全身', '植田']],
+        '南館3': [['2025/01/15', 12345, '患者A', '外来', 'R)白内障手術', '局所', '橋本']],
+        '集計': [],
+    }
+    for index, (title, rows) in enumerate(sheets.items()):
+        ws = wb.active if index == 0 else wb.create_sheet()
+        ws.title = title
+        ws.append(['削除される行1'])
+        ws.append(['日付', 'ID', '氏名', '入外', '術式', '麻酔', '術者'])
+        for row in rows:
+            ws.append(row)
+
+    wb.save(excel_path)
+
+    yield {
+        'input': str(excel_path),
+        'output': str(Path(temp_dir) / 'output.csv')
+    }
+
+    import shutil
+    try:
+        shutil.rmtree(temp_dir)
+    except:
+        pass
+
+
+def test_process_surgery_schedule_multiple_sheets(temp_multi_sheet_excel_file):
+    """複数シートを結合し、シート列に元のシート名が入る"""
+    process_surgery_schedule(
+        temp_multi_sheet_excel_file['input'],
+        temp_multi_sheet_excel_file['output'],
+        sheet_name=['南館2', '南館3']
+    )
+
+    df = pd.read_csv(temp_multi_sheet_excel_file['output'], encoding='cp932')
+
+    assert len(df) == 2
+    assert list(df['シート']) == ['南館3', '南館2']
+    assert list(df['患者ID']) == [12345, 12346]
+
+
+def test_process_surgery_schedule_sheet_pattern(temp_multi_sheet_excel_file):
+    """シート名の正規表現に一致するシートのみ処理される"""
+    process_surgery_schedule(
+        temp_multi_sheet_excel_file['input'],
+        temp_multi_sheet_excel_file['output'],
+        sheet_name=None,
+        sheet_pattern='^南館'
+    )
+
+    df = pd.read_csv(temp_multi_sheet_excel_file['output'], encoding='cp932')
+
+    assert set(df['シート']) == {'南館2', '南館3'}
+
+
+def test_process_surgery_schedule_missing_sheet(temp_multi_sheet_excel_file):
+    """存在しないシートを指定するとエラーになる"""
+    with pytest.raises(ValueError, match='南館9'):
+        process_surgery_schedule(
+            temp_multi_sheet_excel_file['input'],
+            temp_multi_sheet_excel_file['output'],
+            sheet_name=['南館2', '南館9']
+        )
+
+
+def test_validate_surgery_schedule_missing_column(temp_multi_sheet_excel_file):
+    """対象シートの見出しに必要な列が無い場合は、シート名と不足している列を示す"""
+    from openpyxl import load_workbook
+
+    validate_surgery_schedule(temp_multi_sheet_excel_file['input'], sheet_name=['南館2', '南館3'])
+
+    wb = load_workbook(temp_multi_sheet_excel_file['input'])
+    wb['南館3'].cell(row=2, column=7, value='執刀医')
+    wb.save(temp_multi_sheet_excel_file['input'])
+
+    with pytest.raises(SchemaValidationError, match='シート: 南館3') as excinfo:
+        validate_surgery_schedule(temp_multi_sheet_excel_file['input'], sheet_name=['南館2', '南館3'])
+    assert '不足: 「術者」' in str(excinfo.value)
+    assert '「執刀医」' in str(excinfo.value)
+
+
+def test_validate_surgery_schedule_missing_sheet(temp_multi_sheet_excel_file):
+    """存在しないシートを指定するとエラーになる"""
+    with pytest.raises(SchemaValidationError, match='南館9'):
+        validate_surgery_schedule(temp_multi_sheet_excel_file['input'], sheet_name=['南館9'])
+
+
+def test_validate_surgery_schedule_reads_xlsx_header_only(temp_multi_sheet_excel_file):
+    """xlsx形式はpandasでシートを解析せず、読み取り専用のブックから見出し行だけを読み込む"""
+    from unittest.mock import patch
+
+    with patch('service.surgery_schedule_processor.pd.ExcelFile', side_effect=AssertionError('ExcelFile')):
+        validate_surgery_schedule(temp_multi_sheet_excel_file['input'], sheet_name=None, sheet_pattern='^南館')
+
+
+def test_validate_surgery_schedule_reads_xls_header_on_demand(temp_multi_sheet_excel_file):
+    """xls形式はpandasでブック全体を解析せず、xlrdで対象シートだけを読み込む"""
+    from unittest.mock import MagicMock, patch
+
+    header = ['日付', 'ID', '氏名', '入外', '術式', '麻酔', '']
+    book = MagicMock()
+    book.sheet_names.return_value = ['南館2', '集計']
+    book.sheet_by_name.return_value.nrows = 2
+    book.sheet_by_name.return_value.row_values.return_value = header
+    xls_path = str(Path(temp_multi_sheet_excel_file['input']).with_suffix('.xls'))
+
+    with patch('service.surgery_schedule_processor.xlrd.open_workbook', return_value=book) as open_workbook, \
+            patch('service.surgery_schedule_processor.pd.ExcelFile', side_effect=AssertionError('ExcelFile')), \
+            pytest.raises(SchemaValidationError, match='不足: 「術者」'):
+        validate_surgery_schedule(xls_path)
+
+    open_workbook.assert_called_once_with(xls_path, on_demand=True)
+    book.sheet_by_name.assert_called_once_with('南館2')
+    book.sheet_by_name.return_value.row_values.assert_called_once_with(1)
+    book.release_resources.assert_called_once()
@@ -5,7 +5,11 @@ from unittest.mock import MagicMock, patch
 import pandas as pd
 import pytest
 
-from service.surgery_search_processor import process_eye_surgery_data
+from scripts.benchmark_data import generate_search_data
+from scripts.benchmark_search_steps import build_benchmark_rules, run_in_cost_order, run_in_declared_order
+from service.input_schema import SchemaValidationError
+from service.surgery_search_processor import process_eye_surgery_data, validate_search_data
+from utils.memory_budget import partition_csv_by_month
 
 
 @pytest.fixture
@@ -279,3 +283,111 @@ def test_process_eye_surgery_data_excludes_keywords(temp_csv_file):
 
     # ★を含む患者は除外される
     assert '★除外患者' not in df['氏名'].values
+
+
+@pytest.fixture
+def temp_multi_month_csv_file():
+    """複数月にまたがる一時的なCSVファイルを作成"""
+    temp_dir = tempfile.mkdtemp()
+
+    data = """手術日,患者ID,氏名,手術,医師,麻酔,病名,入外,右,左,術前,備考
+25/02/03,12349,患者D,白内障手術,橋本義弘,球後麻酔,白内障,外来,,○,検査D,
+25/01/15,12345,患者A,白内障手術(トーリック),橋本義弘,球後麻酔,白内障,あやめ,○,,検査A,
+25/01/15,12345,患者A,白内障手術,橋本義弘,球後麻酔,白内障,あやめ,,○,検査A,
+25/01/16,12346,★除外患者,緑内障手術,植田芳樹,点眼麻酔,緑内障,外来,,○,検査B,
+25/02/01,12347,患者C,白内障手術,増子杏,全身麻酔,白内障,さくら,○,○,検査C,
+"""
+    input_path = Path(temp_dir) / 'input.csv'
+    input_path.write_text(data, encoding='cp932')
+
+    yield {
+        'input': str(input_path),
+        'output': str(Path(temp_dir) / 'output.csv'),
+        'low_memory_output': str(Path(temp_dir) / 'low_memory_output.csv')
+    }
+
+    # クリーンアップ
+    import shutil
+    try:
+        shutil.rmtree(temp_dir)
+    except:
+        pass
+
+
+def test_process_eye_surgery_data_low_memory_matches_default(temp_multi_month_csv_file):
+    """低メモリモードでも通常モードと同じ結果が出力される"""
+    process_eye_surgery_data(temp_multi_month_csv_file['input'], temp_multi_month_csv_file['output'])
+    process_eye_surgery_data(
+        temp_multi_month_csv_file['input'],
+        temp_multi_month_csv_file['low_memory_output'],
+        low_memory=True,
+        memory_budget_mb=1200
+    )
+
+    expected = pd.read_csv(temp_multi_month_csv_file['output'], encoding='cp932')
+    actual = pd.read_csv(temp_multi_month_csv_file['low_memory_output'], encoding='cp932')
+    pd.testing.assert_frame_equal(actual, expected)
+
+
+def test_process_eye_surgery_data_by_month_matches_default(temp_multi_month_csv_file):
+    """メモリ予算を超える場合は手術月ごとに処理し、通常モードと同じ結果が出力される"""
+    process_eye_surgery_data(temp_multi_month_csv_file['input'], temp_multi_month_csv_file['output'])
+
+    with patch('service.surgery_search_processor.exceeds_budget', return_value=True):
+        with patch('service.surgery_search_processor.partition_csv_by_month',
+                   wraps=partition_csv_by_month) as mock_partition:
+            process_eye_surgery_data(
+                temp_multi_month_csv_file['input'],
+                temp_multi_month_csv_file['low_memory_output'],
+                low_memory=True,
+                memory_budget_mb=1
+            )
+
+    assert mock_partition.called
+    expected = pd.read_csv(temp_multi_month_csv_file['output'], encoding='cp932')
+    actual = pd.read_csv(temp_multi_month_csv_file['low_memory_output'], encoding='cp932')
+    pd.testing.assert_frame_equal(actual, expected)
+
+
+def test_process_eye_surgery_data_incremental_matches_default(temp_multi_month_csv_file):
+    """手術日ごとのキャッシュを使っても、入力の変更後に通常モードと同じ結果が出力される"""
+    cache_dir = str(Path(temp_multi_month_csv_file['input']).with_name('cache'))
+    incremental_output = temp_multi_month_csv_file['low_memory_output']
+
+    process_eye_surgery_data(temp_multi_month_csv_file['input'], incremental_output, cache_dir=cache_dir)
+
+    input_path = Path(temp_multi_month_csv_file['input'])
+    input_path.write_text(
+        input_path.read_text(encoding='cp932').replace('全身麻酔', '局所麻酔'),
+        encoding='cp932'
+    )
+
+    process_eye_surgery_data(temp_multi_month_csv_file['input'], temp_multi_month_csv_file['output'])
+    process_eye_surgery_data(temp_multi_month_csv_file['input'], incremental_output, cache_dir=cache_dir)
+
+    expected = pd.read_csv(temp_multi_month_csv_file['output'], encoding='cp932')
+    actual = pd.read_csv(incremental_output, encoding='cp932')
+    pd.testing.assert_frame_equal(actual, expected)
+
+
+def test_cost_order_matches_declared_order():
+    """除外キーワードによる行削除を先に実行しても、宣言順に処理した結果と一致する"""
+    df = generate_search_data(5_000, seed=1, exclusion_rate=0.5)
+    rules = build_benchmark_rules()
+
+    expected = run_in_declared_order(df, rules)
+    actual = run_in_cost_order(df, rules)
+
+    assert len(actual) < len(df) * 0.6
+    pd.testing.assert_frame_equal(actual, expected)
+
+
+def test_validate_search_data(temp_csv_file):
+    """必要な列がそろっていればエラーにならず、列名が変わっている場合は不足している列を示す"""
+    validate_search_data(temp_csv_file['input'])
+
+    df = pd.read_csv(temp_csv_file['input'], encoding='cp932').rename(columns={'術前': '術前検査'})
+    df.to_csv(temp_csv_file['input'], index=False, encoding='cp932')
+
+    with pytest.raises(SchemaValidationError, match='不足: 「術前」（候補: 「術前検査」）'):
+        validate_search_data(temp_csv_file['input'])
@@ -0,0 +1,80 @@
+import json
+import tempfile
+from pathlib import Path
+from unittest.mock import patch
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from service.surgery_similarity import SurgerySimilarity
+
+
+@pytest.fixture
+def temp_dir():
+    """一時ディレクトリを作成"""
+    temp_dir = tempfile.mkdtemp()
+
+    yield temp_dir
+
+    # クリーンアップ
+    import shutil
+    try:
+        shutil.rmtree(temp_dir)
+    except:
+        pass
+
+
+def test_score_near_match():
+    """表記が似ている手術名は類似度が高く、異なる手術名は低い"""
+    similarity = SurgerySimilarity()
+
+    assert similarity.score('PEA+IOL', 'PEA+IOL挿入') >= 0.8
+    assert similarity.score('ＰＥＡ＋ＩＯＬ', 'PEA+IOL') == 1.0
+    assert similarity.score('白内障手術', '緑内障手術') < 0.8
+    assert similarity.score('PEA+IOL', 'PEA+IOL挿入') == similarity.score('PEA+IOL挿入', 'PEA+IOL')
+
+
+def test_find_similar_scores_unique_pairs_once():
+    """同じ手術名の組が複数行にあっても類似度は一度だけ計算される"""
+    similarity = SurgerySimilarity()
+    search = pd.Series(['PEA+IOL'] * 1000 + ['白内障手術'])
+    schedule = pd.Series(['PEA+IOL挿入'] * 1000 + ['緑内障手術'])
+    candidates = np.ones(len(search), dtype=bool)
+    candidates[0] = False
+
+    with patch.object(similarity, 'score', wraps=similarity.score) as mock_score:
+        similar = similarity.find_similar(search, schedule, candidates)
+
+    assert mock_score.call_count == 2
+    assert not similar[0]
+    assert similar[1:1000].all()
+    assert not similar[1000]
+
+
+def test_similarity_cache_is_persisted(temp_dir):
+    """計算した類似度はファイルに保存され、次回は再計算しない"""
+    cache_path = str(Path(temp_dir) / 'similarity.json')
+    first = SurgerySimilarity(cache_path=cache_path)
+    score = first.score('PEA+IOL', 'PEA+IOL挿入')
+    first.save()
+
+    assert json.loads(Path(cache_path).read_text(encoding='utf-8'))['ngram_size'] == 2
+
+    second = SurgerySimilarity(cache_path=cache_path)
+    with patch('service.surgery_similarity._ngrams') as mock_ngrams:
+        assert second.score('PEA+IOL挿入', 'PEA+IOL') == score
+    mock_ngrams.assert_not_called()
+
+    # n-gramの文字数が異なる場合はキャッシュを使わない
+    third = SurgerySimilarity(ngram_size=3, cache_path=cache_path)
+    with patch('service.surgery_similarity._ngrams', return_value=frozenset(['x'])) as mock_ngrams:
+        third.score('PEA+IOL挿入', 'PEA+IOL')
+    assert mock_ngrams.called
+
+
+def test_invalid_settings():
+    with pytest.raises(ValueError):
+        SurgerySimilarity(threshold=0)
+    with pytest.raises(ValueError):
+        SurgerySimilarity(ngram_size=0)
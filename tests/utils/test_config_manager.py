@@ -7,10 +7,14 @@ import pytest
 
 from utils.config_manager import (
     get_appearance_settings,
+    get_comparison_settings,
     get_dialog_settings,
     get_exclusion_line_keywords,
     get_paths,
     get_replacement_dict,
+    get_report_settings,
+    get_schedule_settings,
+    get_surgery_equivalence_settings,
     get_surgery_strings_to_remove,
     load_config,
     save_config,
@@ -126,6 +130,64 @@ def test_get_paths(temp_config_file):
         assert paths['output_path'] == 'C:\\test\\output'
 
 
+def test_get_schedule_settings(temp_config_file):
+    """手術予定表の設定を取得できる（未設定の場合はデフォルト値）"""
+    with patch('utils.config_manager.CONFIG_PATH', temp_config_file):
+        config = load_config()
+        settings = get_schedule_settings(config)
+
+        assert settings['sheet_names'] == ['南館2']
+        assert settings['sheet_pattern'] == ''
+        assert settings['normalize'] is False
+
+
+def test_get_report_settings(temp_config_file):
+    """レポート出力の設定を取得できる（未設定の場合はデフォルト値）"""
+    with patch('utils.config_manager.CONFIG_PATH', temp_config_file):
+        config = load_config()
+        config['Report']['output_formats'] = 'XLSX, csv,html'
+        settings = get_report_settings(config)
+
+        assert settings['streaming_row_threshold'] == 20000
+        assert settings['output_formats'] == ['xlsx', 'csv', 'html']
+        assert settings['csv_encoding'] == 'cp932'
+        assert settings['report_mode'] == 'full'
+
+
+def test_get_comparison_settings(temp_config_file):
+    """照合方法の設定を取得できる（負の許容日数は0として扱う）"""
+    with patch('utils.config_manager.CONFIG_PATH', temp_config_file):
+        config = load_config()
+        assert get_comparison_settings(config)['date_tolerance_days'] == 0
+        assert get_comparison_settings(config)['join_mode'] == 'left'
+
+        config['Comparison']['join_mode'] = ' Outer'
+        assert get_comparison_settings(config)['join_mode'] == 'outer'
+
+        config['Comparison']['date_tolerance_days'] = '-3'
+        assert get_comparison_settings(config)['date_tolerance_days'] == 0
+
+        config['Comparison']['date_tolerance_days'] = '2'
+        assert get_comparison_settings(config)['date_tolerance_days'] == 2
+
+
+def test_get_surgery_equivalence_settings(temp_config_file):
+    """手術名のクラスと正規表現を取得できる（正規表現は1行に1つ）"""
+    with patch('utils.config_manager.CONFIG_PATH', temp_config_file):
+        config = load_config()
+        assert get_surgery_equivalence_settings(config) == {'classes': {}, 'patterns': []}
+
+        config['SurgeryEquivalence']['classes'] = '白内障手術:水晶体再建術|PEA+IOL, 緑内障手術:線維柱帯切除術'
+        config['SurgeryEquivalence']['patterns'] = '\n硝子体手術:^硝子体.{1,3}術$\n'
+        settings = get_surgery_equivalence_settings(config)
+
+        assert settings['classes'] == {
+            '白内障手術': ['水晶体再建術', 'PEA+IOL'],
+            '緑内障手術': ['線維柱帯切除術'],
+        }
+        assert settings['patterns'] == [('硝子体手術', '^硝子体.{1,3}術$')]
+
+
 def test_get_exclusion_line_keywords(temp_config_file):
     """行除外キーワードを取得できる"""
     with patch('utils.config_manager.CONFIG_PATH', temp_config_file):
@@ -0,0 +1,105 @@
+import os
+import tempfile
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+from utils import input_snapshot
+from utils.input_snapshot import SnapshotError, snapshot_file, snapshot_inputs
+
+
+@pytest.fixture
+def temp_dir():
+    """入力ファイルを含む一時ディレクトリを作成"""
+    temp_dir = Path(tempfile.mkdtemp())
+    (temp_dir / 'share').mkdir()
+    (temp_dir / 'share' / 'search.csv').write_bytes('手術日,患者ID\n25/01/15,12345\n'.encode('cp932'))
+
+    yield temp_dir
+
+    # クリーンアップ
+    import shutil
+    try:
+        shutil.rmtree(temp_dir)
+    except:
+        pass
+
+
+def test_snapshot_file_copies_source(temp_dir):
+    """元ファイルと同じ内容のコピーが拡張子を保って作成される"""
+    source = temp_dir / 'share' / 'search.csv'
+
+    snapshot_path = snapshot_file(str(source), str(temp_dir / 'cache'))
+
+    assert Path(snapshot_path).parent == temp_dir / 'cache'
+    assert Path(snapshot_path).suffix == '.csv'
+    assert Path(snapshot_path).read_bytes() == source.read_bytes()
+
+
+def test_snapshot_file_reuses_unchanged_snapshot(temp_dir):
+    """元ファイルが変わっていなければ再度読み込まない"""
+    source = str(temp_dir / 'share' / 'search.csv')
+    first = snapshot_file(source, str(temp_dir / 'cache'))
+
+    with patch('utils.input_snapshot._read_source') as mock_read:
+        second = snapshot_file(source, str(temp_dir / 'cache'))
+
+    assert second == first
+    mock_read.assert_not_called()
+
+
+def test_snapshot_file_refreshes_modified_source(temp_dir):
+    """元ファイルが更新されるとコピーし直す"""
+    source = temp_dir / 'share' / 'search.csv'
+    snapshot_path = snapshot_file(str(source), str(temp_dir / 'cache'))
+
+    source.write_bytes(source.read_bytes() + '25/01/16,12346\n'.encode('cp932'))
+    stat = os.stat(source)
+    os.utime(source, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+    assert snapshot_file(str(source), str(temp_dir / 'cache')) == snapshot_path
+    assert Path(snapshot_path).read_bytes() == source.read_bytes()
+
+
+def test_snapshot_file_retries_locked_source(temp_dir):
+    """ロックされている場合は待ち時間を倍にしながら再試行する"""
+    source = str(temp_dir / 'share' / 'search.csv')
+    read_source = input_snapshot._read_source
+
+    with patch('utils.input_snapshot._read_source',
+               side_effect=[PermissionError('locked'), PermissionError('locked'), read_source(source)]), \
+            patch('utils.input_snapshot.time.sleep') as mock_sleep:
+        snapshot_path = snapshot_file(source, str(temp_dir / 'cache'), retries=3, backoff_seconds=0.5)
+
+    assert Path(snapshot_path).exists()
+    assert [call.args[0] for call in mock_sleep.call_args_list] == [0.5, 1.0]
+
+
+def test_snapshot_file_gives_up_after_retries(temp_dir):
+    """再試行しても読み込めない場合はSnapshotErrorが発生する"""
+    source = str(temp_dir / 'share' / 'search.csv')
+
+    with patch('utils.input_snapshot._read_source', side_effect=PermissionError('locked')), \
+            patch('utils.input_snapshot.time.sleep'):
+        with pytest.raises(SnapshotError):
+            snapshot_file(source, str(temp_dir / 'cache'), retries=2)
+
+
+def test_snapshot_file_missing_source(temp_dir):
+    with pytest.raises(FileNotFoundError):
+        snapshot_file(str(temp_dir / 'share' / 'missing.csv'), str(temp_dir / 'cache'))
+
+
+def test_snapshot_inputs_replaces_only_given_keys(temp_dir):
+    """指定したキーのパスだけがスナップショットに置き換わる"""
+    paths = {
+        'surgery_search_data': str(temp_dir / 'share' / 'search.csv'),
+        'output_path': str(temp_dir / 'output'),
+    }
+
+    snapshot_paths = snapshot_inputs(paths, ('surgery_search_data',), str(temp_dir / 'cache'))
+
+    assert snapshot_paths['surgery_search_data'].startswith(str(temp_dir / 'cache'))
+    assert snapshot_paths['output_path'] == paths['output_path']
+    assert paths['surgery_search_data'] == str(temp_dir / 'share' / 'search.csv')
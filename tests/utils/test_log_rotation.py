@@ -60,6 +60,27 @@ def test_cleanup_old_logs_removes_old_files(temp_log_directory):
     assert main_log.exists()
 
 
+def test_cleanup_old_logs_removes_old_profiles(temp_log_directory):
+    """保持期間を過ぎたプロファイルのファイルも削除される"""
+    old_time = (datetime.now() - timedelta(days=10)).timestamp()
+    old_files = [Path(temp_log_directory) / f'profile_20200101_000000_データ比較{suffix}' for suffix in ('.prof', '.txt')]
+    for old_file in old_files:
+        old_file.write_text('profile', encoding='utf-8')
+        os.utime(old_file, (old_time, old_time))
+
+    recent_profile = Path(temp_log_directory) / 'profile_20991231_000000_データ比較.prof'
+    recent_profile.write_text('profile', encoding='utf-8')
+    other_file = Path(temp_log_directory) / 'comparison_results.txt'
+    other_file.write_text('other', encoding='utf-8')
+    os.utime(other_file, (old_time, old_time))
+
+    cleanup_old_logs(temp_log_directory, 7)
+
+    assert not any(old_file.exists() for old_file in old_files)
+    assert recent_profile.exists()
+    assert other_file.exists()
+
+
 def test_cleanup_old_logs_keeps_recent_files(temp_log_directory):
     """新しいログファイルは保持される"""
     # 新しいログファイルを作成
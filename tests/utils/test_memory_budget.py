@@ -0,0 +1,123 @@
+import tempfile
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from utils.memory_budget import (
+    CSV_ESTIMATE_FACTOR,
+    XLS_ESTIMATE_FACTOR,
+    XLSX_ESTIMATE_FACTOR,
+    downcast_numeric_columns,
+    estimate_peak_bytes,
+    exceeds_budget,
+    get_peak_memory_bytes,
+    log_memory_usage,
+    partition_csv_by_month,
+    share_categories,
+)
+
+
+@pytest.fixture
+def temp_directory():
+    """一時ディレクトリを作成"""
+    temp_dir = tempfile.mkdtemp()
+    yield temp_dir
+
+    # クリーンアップ
+    import shutil
+    try:
+        shutil.rmtree(temp_dir)
+    except:
+        pass
+
+
+def test_estimate_peak_bytes_uses_file_size(temp_directory):
+    """ファイルサイズに係数を掛けた値を推定値とする"""
+    path = Path(temp_directory) / 'data.csv'
+    path.write_bytes(b'x' * 100)
+
+    assert estimate_peak_bytes([str(path)], factor=3) == 300
+    assert estimate_peak_bytes([str(path), str(Path(temp_directory) / 'missing.csv')], factor=1) == 100
+
+
+def test_estimate_peak_bytes_factor_by_format(temp_directory):
+    """係数を省略した場合は、CSV・xls・xlsxで形式ごとの倍率を使う"""
+    paths = {name: Path(temp_directory) / name for name in ('data.csv', 'schedule.xls', 'schedule.xlsx')}
+    for path in paths.values():
+        path.write_bytes(b'x' * 100)
+
+    assert estimate_peak_bytes([str(paths['data.csv'])]) == 100 * CSV_ESTIMATE_FACTOR
+    assert estimate_peak_bytes([str(paths['schedule.xls'])]) == 100 * XLS_ESTIMATE_FACTOR
+    assert estimate_peak_bytes([str(paths['schedule.xlsx'])]) == 100 * XLSX_ESTIMATE_FACTOR
+
+
+def test_log_memory_usage_reports_increase_during_stage(caplog):
+    """処理の開始時からのプロセスのピークの増加を、処理中の実測値として記録する"""
+    from unittest.mock import patch
+
+    with caplog.at_level('INFO'), \
+            patch('utils.memory_budget.get_peak_memory_bytes', return_value=300 * 1024 * 1024):
+        log_memory_usage('比較', 50 * 1024 * 1024, 200 * 1024 * 1024)
+        log_memory_usage('比較', 50 * 1024 * 1024, None)
+
+    assert caplog.records[0].getMessage() == (
+        '比較のメモリ使用量: 推定増加=50.0MB, 実測増加=100.0MB（プロセスのピーク=300.0MB）'
+    )
+    assert '実測増加=取得不可' in caplog.records[1].getMessage()
+
+
+def test_exceeds_budget():
+    """メモリ予算を超えるかを判定する（0以下は無制限）"""
+    assert exceeds_budget(2 * 1024 * 1024, 1) is True
+    assert exceeds_budget(1024, 1) is False
+    assert exceeds_budget(10 ** 12, 0) is False
+
+
+def test_get_peak_memory_bytes():
+    """ピークメモリを取得できる"""
+    peak = get_peak_memory_bytes()
+
+    assert peak is None or peak > 0
+
+
+def test_downcast_numeric_columns():
+    """数値列が値の収まる最小の型に変換される"""
+    df = pd.DataFrame({'患者ID': [1234567, 2345678], '氏名': ['患者A', '患者B']})
+
+    result = downcast_numeric_columns(df)
+
+    assert result['患者ID'].dtype == 'int32'
+    assert result['氏名'].dtype == object
+
+
+def test_share_categories():
+    """比較項目が両方の値を含む共通のカテゴリ型になり、同じ値は同じコードになる"""
+    df_search = pd.DataFrame({'医師': ['橋本', '植田', None]})
+    df_schedule = pd.DataFrame({'医師': pd.Series(['植田', '増子']).astype('category'), '術眼': ['R', 'L']})
+
+    share_categories([df_search, df_schedule])
+
+    assert df_search['医師'].dtype == df_schedule['医師'].dtype
+    assert set(df_search['医師'].cat.categories) == {'橋本', '植田', '増子'}
+    assert df_search['医師'].cat.codes[1] == df_schedule['医師'].cat.codes[0]
+    assert df_search['医師'].cat.codes[2] == -1
+    # 片方にしかない列もカテゴリ型になる
+    assert isinstance(df_schedule['術眼'].dtype, pd.CategoricalDtype)
+
+
+def test_partition_csv_by_month(temp_directory):
+    """手術月ごとのファイルに分割される"""
+    source = Path(temp_directory) / 'source.csv'
+    pd.DataFrame({
+        '手術日': ['2025/02/01', '2025/01/15', '2025/02/20', '不明'],
+        '患者ID': [1, 2, 3, 4],
+    }).to_csv(source, index=False, encoding='cp932')
+    work_dir = Path(temp_directory) / 'partitions'
+    work_dir.mkdir()
+
+    partitions = partition_csv_by_month(str(source), '手術日', str(work_dir), date_format='%Y/%m/%d', chunksize=2)
+
+    assert [month for month, _ in partitions] == ['202501', '202502', 'unknown']
+    february = pd.read_csv(dict(partitions)['202502'], encoding='cp932')
+    assert list(february['患者ID']) == [1, 3]
@@ -0,0 +1,91 @@
+import tempfile
+
+import pandas as pd
+import pytest
+
+from utils.partition_cache import PartitionCache, run_partitioned
+
+
+@pytest.fixture
+def temp_dir():
+    """一時ディレクトリを作成"""
+    temp_dir = tempfile.mkdtemp()
+
+    yield temp_dir
+
+    # クリーンアップ
+    import shutil
+    try:
+        shutil.rmtree(temp_dir)
+    except:
+        pass
+
+
+def _frame(rows):
+    return pd.DataFrame(rows, columns=['手術日', '患者ID', '値'])
+
+
+def _run(temp_dir, df, calls):
+    def compute(subset):
+        calls.append(sorted(subset['手術日'].unique()))
+        result = subset.copy()
+        result['結果'] = result['値'] * 2
+        return result
+
+    cache = PartitionCache(temp_dir, 'test')
+    return run_partitioned(cache, [(df, df['手術日'])], compute, '手術日')
+
+
+def test_run_partitioned_recomputes_only_changed_dates(temp_dir):
+    """2回目の実行では入力が変わった手術日だけが再計算される"""
+    df = _frame([
+        ['2025/01/15', 1, 10],
+        ['2025/01/16', 2, 20],
+        ['2025/01/17', 3, 30],
+    ])
+    calls = []
+    _run(temp_dir, df, calls)
+    assert calls == [['2025/01/15', '2025/01/16', '2025/01/17']]
+
+    df.loc[1, '値'] = 25
+    result = _run(temp_dir, df, calls)
+
+    assert calls[1] == ['2025/01/16']
+    assert result['結果'].tolist() == [20, 50, 60]
+
+
+def test_run_partitioned_unchanged_input_uses_cache(temp_dir):
+    """入力が変わっていなければ再計算しない"""
+    df = _frame([['2025/01/15', 1, 10], ['2025/01/16', 2, 20]])
+    calls = []
+    expected = _run(temp_dir, df, calls)
+    actual = _run(temp_dir, df, calls)
+
+    assert len(calls) == 1
+    pd.testing.assert_frame_equal(actual, expected)
+
+
+def test_run_partitioned_prunes_removed_dates(temp_dir):
+    """入力から無くなった手術日のキャッシュは削除される"""
+    calls = []
+    _run(temp_dir, _frame([['2025/01/15', 1, 10], ['2025/01/16', 2, 20]]), calls)
+    result = _run(temp_dir, _frame([['2025/01/16', 2, 20]]), calls)
+
+    assert len(calls) == 1
+    assert result['手術日'].tolist() == ['2025/01/16']
+    assert PartitionCache(temp_dir, 'test').load('2025/01/15', 'any') is None
+
+
+def test_run_partitioned_context_change_recomputes_all(temp_dir):
+    """設定（context）が変わるとすべての手術日が再計算される"""
+    df = _frame([['2025/01/15', 1, 10], ['2025/01/16', 2, 20]])
+    calls = []
+
+    def compute(subset):
+        calls.append(len(subset))
+        return subset
+
+    run_partitioned(PartitionCache(temp_dir, 'test'), [(df, df['手術日'])], compute, '手術日', context='a')
+    run_partitioned(PartitionCache(temp_dir, 'test'), [(df, df['手術日'])], compute, '手術日', context='b')
+
+    assert calls == [2, 2]
@@ -0,0 +1,50 @@
+import tempfile
+from pathlib import Path
+
+import pytest
+
+from utils.profiler import profile_stage, profiled
+
+
+@pytest.fixture
+def temp_profile_directory():
+    """一時的なプロファイル出力ディレクトリを作成"""
+    temp_dir = tempfile.mkdtemp()
+    yield temp_dir
+
+    # クリーンアップ
+    import shutil
+    try:
+        shutil.rmtree(temp_dir)
+    except:
+        pass
+
+
+def test_profile_stage_writes_prof_and_summary(temp_profile_directory):
+    """.profファイルと集計テキストが出力される"""
+    with profile_stage('comparison', temp_profile_directory, top_n=5):
+        sum(range(1000))
+
+    prof_files = list(Path(temp_profile_directory).glob('profile_*_comparison.prof'))
+    summary_files = list(Path(temp_profile_directory).glob('profile_*_comparison.txt'))
+
+    assert len(prof_files) == 1
+    assert len(summary_files) == 1
+    assert 'function calls' in summary_files[0].read_text(encoding='utf-8')
+
+
+def test_profile_stage_writes_output_on_exception(temp_profile_directory):
+    """処理中に例外が発生してもプロファイルが出力され、例外は再送出される"""
+    with pytest.raises(ValueError):
+        with profile_stage('failing', temp_profile_directory):
+            raise ValueError('テストエラー')
+
+    assert list(Path(temp_profile_directory).glob('profile_*_failing.prof'))
+
+
+def test_profiled_returns_result(temp_profile_directory):
+    """profiledで包んだ関数は元の戻り値を返す"""
+    wrapped = profiled(lambda x, y=1: x + y, 'add', temp_profile_directory)
+
+    assert wrapped(1, y=2) == 3
+    assert list(Path(temp_profile_directory).glob('profile_*_add.prof'))
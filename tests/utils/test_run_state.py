@@ -0,0 +1,78 @@
+import configparser
+import tempfile
+from pathlib import Path
+
+import pytest
+
+from utils.run_state import compute_fingerprint, find_unchanged_output, get_run_state_path, save_run_state
+
+
+@pytest.fixture
+def temp_dir():
+    """一時ディレクトリを作成"""
+    temp_dir = Path(tempfile.mkdtemp())
+    (temp_dir / 'input.csv').write_text('a,b\n1,2\n', encoding='utf-8')
+    (temp_dir / 'output.xlsx').write_bytes(b'dummy')
+
+    yield temp_dir
+
+    # クリーンアップ
+    import shutil
+    try:
+        shutil.rmtree(temp_dir)
+    except:
+        pass
+
+
+@pytest.fixture
+def config():
+    config = configparser.ConfigParser()
+    config.read_dict({'Report': {'output_formats': 'xlsx'}})
+    return config
+
+
+def test_find_unchanged_output_returns_previous_output(temp_dir, config):
+    """指紋が一致すれば前回の出力ファイルを返す"""
+    state_path = get_run_state_path(str(temp_dir / 'logs'))
+    fingerprint = compute_fingerprint({'input': str(temp_dir / 'input.csv')}, config)
+    save_run_state(state_path, fingerprint, str(temp_dir / 'output.xlsx'))
+
+    assert find_unchanged_output(state_path, fingerprint) == str(temp_dir / 'output.xlsx')
+
+
+def test_find_unchanged_output_without_state(temp_dir, config):
+    """実行状態が保存されていなければNoneを返す"""
+    fingerprint = compute_fingerprint({'input': str(temp_dir / 'input.csv')}, config)
+
+    assert find_unchanged_output(str(temp_dir / 'missing.json'), fingerprint) is None
+
+
+def test_find_unchanged_output_detects_file_change(temp_dir, config):
+    """入力ファイルのサイズが変わるとNoneを返す"""
+    state_path = get_run_state_path(str(temp_dir))
+    file_paths = {'input': str(temp_dir / 'input.csv')}
+    save_run_state(state_path, compute_fingerprint(file_paths, config), str(temp_dir / 'output.xlsx'))
+
+    (temp_dir / 'input.csv').write_text('a,b\n1,2\n3,4\n', encoding='utf-8')
+
+    assert find_unchanged_output(state_path, compute_fingerprint(file_paths, config)) is None
+
+
+def test_find_unchanged_output_requires_previous_output(temp_dir, config):
+    """前回の出力ファイルが削除されているとNoneを返す"""
+    state_path = get_run_state_path(str(temp_dir))
+    fingerprint = compute_fingerprint({'input': str(temp_dir / 'input.csv')}, config)
+    save_run_state(state_path, fingerprint, str(temp_dir / 'output.xlsx'))
+
+    (temp_dir / 'output.xlsx').unlink()
+
+    assert find_unchanged_output(state_path, fingerprint) is None
+
+
+def test_find_unchanged_output_without_previous_errors(temp_dir, config):
+    """前回不一致が無かった場合は空文字を返す"""
+    state_path = get_run_state_path(str(temp_dir))
+    fingerprint = compute_fingerprint({'input': str(temp_dir / 'input.csv')}, config)
+    save_run_state(state_path, fingerprint, '')
+
+    assert find_unchanged_output(state_path, fingerprint) == ''
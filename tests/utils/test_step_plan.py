@@ -0,0 +1,56 @@
+import pandas as pd
+
+from utils.step_plan import Step, order_steps, run_steps
+
+
+def _names(steps):
+    return [step.name for step in steps]
+
+
+def _noop(df):
+    return df
+
+
+def test_order_steps_moves_filter_before_independent_steps():
+    """行を削除する処理は、読む列を書き換えない処理より先に実行される"""
+    steps = [
+        Step('手術日', _noop, frozenset({'手術日'}), frozenset({'手術日'})),
+        Step('置換', _noop, frozenset({'麻酔'}), frozenset({'麻酔'})),
+        Step('氏名で削除', _noop, frozenset({'氏名'}), filters_rows=True),
+    ]
+
+    assert _names(order_steps(steps)) == ['氏名で削除', '手術日', '置換']
+
+
+def test_order_steps_keeps_filter_after_its_dependency():
+    """削除処理が読む列を書き換える処理は先に実行し、その処理も他の処理より先に実行される"""
+    steps = [
+        Step('手術日', _noop, frozenset({'手術日'}), frozenset({'手術日'})),
+        Step('文字列削除', _noop, frozenset({'手術'}), frozenset({'手術'})),
+        Step('手術で削除', _noop, frozenset({'手術'}), filters_rows=True),
+        Step('全角変換', _noop, frozenset({'手術'}), frozenset({'手術'})),
+    ]
+
+    assert _names(order_steps(steps)) == ['文字列削除', '手術で削除', '手術日', '全角変換']
+
+
+def test_order_steps_does_not_cross_row_dependent_step():
+    """他の行に依存する処理を越えて削除処理を移動しない"""
+    steps = [
+        Step('重複', _noop, frozenset({'患者ID'}), filters_rows=True, row_dependent=True),
+        Step('置換', _noop, frozenset({'麻酔'}), frozenset({'麻酔'})),
+        Step('氏名で削除', _noop, frozenset({'氏名'}), filters_rows=True),
+    ]
+
+    assert _names(order_steps(steps)) == ['重複', '氏名で削除', '置換']
+
+
+def test_run_steps_applies_in_order():
+    steps = [
+        Step('加算', lambda df: df.assign(値=df['値'] + 1), frozenset({'値'}), frozenset({'値'})),
+        Step('削除', lambda df: df[df['値'] > 2], frozenset({'値'}), filters_rows=True),
+    ]
+
+    result = run_steps(pd.DataFrame({'値': [1, 2, 3]}), order_steps(steps))
+
+    assert result['値'].tolist() == [3, 4]
@@ -43,6 +43,53 @@ DEFAULT_CONFIG = {
         'excludeitems_file': '',
         'replacements_file': '',
     },
+    'Schedule': {
+        'sheet_names': '南館2',
+        'sheet_pattern': '',
+        'normalize': 'false',
+    },
+    'Profiling': {
+        'enabled': 'false',
+        'top_n': '30',
+    },
+    'Memory': {
+        'low_memory_mode': 'false',
+        'memory_budget_mb': '1200',
+    },
+    'Report': {
+        'streaming_row_threshold': '20000',
+        'output_formats': 'xlsx',
+        'csv_encoding': 'cp932',
+        'report_mode': 'full',
+    },
+    'Snapshot': {
+        'enabled': 'true',
+        'cache_directory': '',
+        'retries': '5',
+        'backoff_seconds': '0.5',
+    },
+    'ResultStore': {
+        'enabled': 'true',
+        'database_path': '',
+    },
+    'Incremental': {
+        'enabled': 'false',
+        'cache_directory': '',
+    },
+    'Comparison': {
+        'date_tolerance_days': '0',
+        'join_mode': 'left',
+    },
+    'SurgeryEquivalence': {
+        'classes': '',
+        'patterns': '',
+    },
+    'SurgerySimilarity': {
+        'enabled': 'false',
+        'threshold': '0.8',
+        'ngram_size': '2',
+        'cache_file': '',
+    },
     'Replacements': {
         'anesthesia_replacements': '球後麻酔:局所,局所麻酔:局所,点眼麻酔:局所,全身麻酔:全身,結膜下:局所',
         'surgeon_replacements': '橋本義弘:橋本,植田芳樹:植田,増子杏:増子,田中伸弥:田中,渡辺裕士:渡辺,鈴木貴文:鈴木',
@@ -212,6 +259,106 @@ def get_paths(config: configparser.ConfigParser) -> dict:
     }
 
 
+def get_schedule_settings(config: configparser.ConfigParser) -> dict:
+    sheet_names_str = config.get('Schedule', 'sheet_names', fallback='南館2')
+    return {
+        'sheet_names': [name.strip() for name in sheet_names_str.split(',') if name.strip()],
+        'sheet_pattern': config.get('Schedule', 'sheet_pattern', fallback=''),
+        'normalize': config.getboolean('Schedule', 'normalize', fallback=False),
+    }
+
+
+def get_profiling_settings(config: configparser.ConfigParser) -> dict:
+    return {
+        'enabled': config.getboolean('Profiling', 'enabled', fallback=False),
+        'top_n': config.getint('Profiling', 'top_n', fallback=30),
+    }
+
+
+def get_memory_settings(config: configparser.ConfigParser) -> dict:
+    return {
+        'low_memory_mode': config.getboolean('Memory', 'low_memory_mode', fallback=False),
+        'memory_budget_mb': config.getint('Memory', 'memory_budget_mb', fallback=1200),
+    }
+
+
+def get_report_settings(config: configparser.ConfigParser) -> dict:
+    return {
+        'streaming_row_threshold': config.getint('Report', 'streaming_row_threshold', fallback=20000),
+        'output_formats': [
+            fmt.strip().lower()
+            for fmt in config.get('Report', 'output_formats', fallback='xlsx').split(',')
+            if fmt.strip()
+        ],
+        'csv_encoding': config.get('Report', 'csv_encoding', fallback='cp932'),
+        'report_mode': config.get('Report', 'report_mode', fallback='full').strip().lower(),
+    }
+
+
+def get_snapshot_settings(config: configparser.ConfigParser) -> dict:
+    return {
+        'enabled': config.getboolean('Snapshot', 'enabled', fallback=True),
+        'cache_directory': config.get('Snapshot', 'cache_directory', fallback=''),
+        'retries': config.getint('Snapshot', 'retries', fallback=5),
+        'backoff_seconds': config.getfloat('Snapshot', 'backoff_seconds', fallback=0.5),
+    }
+
+
+def get_result_store_settings(config: configparser.ConfigParser) -> dict:
+    return {
+        'enabled': config.getboolean('ResultStore', 'enabled', fallback=True),
+        'database_path': config.get('ResultStore', 'database_path', fallback=''),
+    }
+
+
+def get_incremental_settings(config: configparser.ConfigParser) -> dict:
+    return {
+        'enabled': config.getboolean('Incremental', 'enabled', fallback=False),
+        'cache_directory': config.get('Incremental', 'cache_directory', fallback=''),
+    }
+
+
+def get_comparison_settings(config: configparser.ConfigParser) -> dict:
+    return {
+        'date_tolerance_days': max(0, config.getint('Comparison', 'date_tolerance_days', fallback=0)),
+        'join_mode': config.get('Comparison', 'join_mode', fallback='left').strip().lower(),
+    }
+
+
+def get_surgery_equivalence_settings(config: configparser.ConfigParser) -> dict:
+    """
+    同じ手術として扱う手術名の設定を取得
+
+    classesは「代表名:別名|別名」をカンマ区切り、patternsは「代表名:正規表現」を1行に1つ記述する
+    （正規表現にカンマを使えるよう、patternsは改行で区切る）。
+
+    Returns:
+        classes（代表名と別名のリストの辞書）とpatterns（(代表名, 正規表現) のリスト）
+    """
+    classes = {}
+    for entry in config.get('SurgeryEquivalence', 'classes', fallback='').split(','):
+        if ':' in entry:
+            canonical, aliases = entry.split(':', 1)
+            classes[canonical.strip()] = [alias.strip() for alias in aliases.split('|') if alias.strip()]
+
+    patterns = []
+    for line in config.get('SurgeryEquivalence', 'patterns', fallback='').splitlines():
+        if ':' in line:
+            canonical, pattern = line.split(':', 1)
+            patterns.append((canonical.strip(), pattern.strip()))
+
+    return {'classes': classes, 'patterns': patterns}
+
+
+def get_surgery_similarity_settings(config: configparser.ConfigParser) -> dict:
+    return {
+        'enabled': config.getboolean('SurgerySimilarity', 'enabled', fallback=False),
+        'threshold': config.getfloat('SurgerySimilarity', 'threshold', fallback=0.8),
+        'ngram_size': config.getint('SurgerySimilarity', 'ngram_size', fallback=2),
+        'cache_file': config.get('SurgerySimilarity', 'cache_file', fallback=''),
+    }
+
+
 def get_exclude_items(config: configparser.ConfigParser) -> list:
     items_str = config.get('ExcludeItems', 'list', fallback='')
     return [item.strip() for item in items_str.split(',') if item.strip()]
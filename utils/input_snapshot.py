@@ -0,0 +1,170 @@
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import time
+
+DEFAULT_RETRIES = 5
+DEFAULT_BACKOFF_SECONDS = 0.5
+SNAPSHOT_DIRECTORY_NAME = 'ophchecker_snapshot'
+
+
+class SnapshotError(OSError):
+    """入力ファイルのスナップショットを作成できない場合の例外"""
+
+
+def get_snapshot_directory(cache_directory: str = '') -> str:
+    """スナップショットの保存先（未指定の場合はローカルの一時ディレクトリ）"""
+    return cache_directory or os.path.join(tempfile.gettempdir(), SNAPSHOT_DIRECTORY_NAME)
+
+
+def _snapshot_paths(source_path: str, cache_dir: str) -> tuple[str, str]:
+    """元ファイルごとのスナップショットとメタデータのパス（拡張子は読み込み方法の判定に使うため残す）"""
+    source_key = hashlib.sha1(os.path.abspath(source_path).encode('utf-8')).hexdigest()[:12]
+    stem, suffix = os.path.splitext(os.path.basename(source_path))
+    snapshot_path = os.path.join(cache_dir, f'{stem}_{source_key}{suffix}')
+    return snapshot_path, snapshot_path + '.json'
+
+
+def _file_sha256(path: str) -> str:
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def _load_metadata(metadata_path: str) -> dict | None:
+    try:
+        with open(metadata_path, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _is_snapshot_current(snapshot_path: str, metadata: dict | None, size: int, mtime_ns: int) -> bool:
+    """元ファイルのサイズ・更新日時が前回と同じで、スナップショットが破損していないか"""
+    if metadata is None or metadata.get('size') != size or metadata.get('mtime_ns') != mtime_ns:
+        return False
+    if not os.path.isfile(snapshot_path) or os.path.getsize(snapshot_path) != size:
+        return False
+    return _file_sha256(snapshot_path) == metadata.get('sha256')
+
+
+def _read_source(source_path: str) -> tuple[bytes, os.stat_result]:
+    """
+    元ファイルを一度に読み込む
+
+    読み込みの前後でサイズ・更新日時が変わった場合は、書き込み中のファイルを読んだとみなして失敗とする。
+    """
+    before = os.stat(source_path)
+    with open(source_path, 'rb') as f:
+        data = f.read()
+    after = os.stat(source_path)
+
+    if (before.st_size, before.st_mtime_ns) != (after.st_size, after.st_mtime_ns) or len(data) != after.st_size:
+        raise SnapshotError(f"読み込み中に入力ファイルが変更されました: {source_path}")
+    return data, after
+
+
+def snapshot_file(
+        source_path: str,
+        cache_dir: str,
+        retries: int = DEFAULT_RETRIES,
+        backoff_seconds: float = DEFAULT_BACKOFF_SECONDS
+) -> str:
+    """
+    入力ファイルをローカルのキャッシュにコピーし、コピーのパスを返す
+
+    ネットワーク上のファイルを一度の読み込みでコピーし、サイズ・更新日時・ハッシュを検証する。
+    元ファイルが前回から変わっていなければコピーを省略する。
+    Excelなどで開かれていて読み込めない場合は、待ち時間を倍にしながら再試行する。
+
+    Args:
+        source_path: 元ファイルのパス
+        cache_dir: スナップショットの保存先ディレクトリ
+        retries: 読み込みに失敗した場合の再試行回数
+        backoff_seconds: 最初の再試行までの待ち時間（秒）
+
+    Returns:
+        スナップショットのパス
+
+    Raises:
+        FileNotFoundError: 元ファイルが存在しない場合
+        SnapshotError: 再試行しても読み込めない場合
+    """
+    if not os.path.isfile(source_path):
+        raise FileNotFoundError(f"入力ファイルが見つかりません: {source_path}")
+
+    os.makedirs(cache_dir, exist_ok=True)
+    snapshot_path, metadata_path = _snapshot_paths(source_path, cache_dir)
+
+    source_stat = os.stat(source_path)
+    if _is_snapshot_current(snapshot_path, _load_metadata(metadata_path), source_stat.st_size, source_stat.st_mtime_ns):
+        logging.info(f"入力ファイルに変更が無いため、前回のスナップショットを使用します: {snapshot_path}")
+        return snapshot_path
+
+    last_error: OSError | None = None
+    for attempt in range(retries + 1):
+        if attempt > 0:
+            wait_seconds = backoff_seconds * 2 ** (attempt - 1)
+            logging.warning(
+                f"入力ファイルを読み込めないため、{wait_seconds:.1f}秒後に再試行します"
+                f"（{attempt}/{retries}）: {source_path}: {str(last_error)}"
+            )
+            time.sleep(wait_seconds)
+
+        try:
+            data, source_stat = _read_source(source_path)
+        except FileNotFoundError:
+            raise
+        except OSError as e:
+            last_error = e
+            continue
+
+        sha256 = hashlib.sha256(data).hexdigest()
+        temp_path = snapshot_path + '.tmp'
+        with open(temp_path, 'wb') as f:
+            f.write(data)
+        os.replace(temp_path, snapshot_path)
+
+        if os.path.getsize(snapshot_path) != source_stat.st_size or _file_sha256(snapshot_path) != sha256:
+            last_error = SnapshotError(f"スナップショットの検証に失敗しました: {snapshot_path}")
+            continue
+
+        with open(metadata_path, 'w', encoding='utf-8') as f:
+            json.dump({
+                'source_path': os.path.abspath(source_path),
+                'size': source_stat.st_size,
+                'mtime_ns': source_stat.st_mtime_ns,
+                'sha256': sha256,
+            }, f, ensure_ascii=False, indent=2)
+
+        logging.info(f"入力ファイルのスナップショットを作成しました: {source_path} -> {snapshot_path}")
+        return snapshot_path
+
+    raise SnapshotError(f"入力ファイルを読み込めませんでした: {source_path}: {str(last_error)}")
+
+
+def snapshot_inputs(
+        paths: dict,
+        keys: tuple[str, ...],
+        cache_dir: str,
+        retries: int = DEFAULT_RETRIES,
+        backoff_seconds: float = DEFAULT_BACKOFF_SECONDS
+) -> dict:
+    """
+    指定したキーの入力ファイルをスナップショットに置き換えたパス辞書を返す
+
+    Args:
+        paths: get_pathsで取得したパス辞書
+        keys: スナップショットを作成する入力ファイルのキー
+        cache_dir: スナップショットの保存先ディレクトリ
+        retries: 読み込みに失敗した場合の再試行回数
+        backoff_seconds: 最初の再試行までの待ち時間（秒）
+
+    Returns:
+        入力ファイルのパスをスナップショットのパスに置き換えたパス辞書
+    """
+    snapshot_paths = dict(paths)
+    for key in keys:
+        snapshot_paths[key] = snapshot_file(paths[key], cache_dir, retries, backoff_seconds)
+    return snapshot_paths
@@ -5,9 +5,15 @@ from logging.handlers import TimedRotatingFileHandler
 
 import configparser
 
+from utils.profiler import PROFILE_FILE_EXTENSIONS, PROFILE_FILE_PREFIX
+
+
+def get_log_directory(config: configparser.ConfigParser) -> str:
+    return os.path.join(os.path.dirname(__file__), config.get('LOGGING', 'log_directory', fallback='logs'))
+
 
 def setup_logging(config: configparser.ConfigParser):
-    log_directory = os.path.join(os.path.dirname(__file__), config.get('LOGGING', 'log_directory', fallback='logs'))
+    log_directory = get_log_directory(config)
     log_retention_days = config.getint('LOGGING', 'log_retention_days', fallback=7)
 
     if not os.path.exists(log_directory):
@@ -34,7 +40,8 @@ def cleanup_old_logs(log_directory: str, retention_days: int):
     main_log_file = f'{parent_dir_name}.log'
 
     for filename in os.listdir(log_directory):
-        if filename.endswith('.log') and filename != main_log_file:
+        is_profile = filename.startswith(PROFILE_FILE_PREFIX) and filename.endswith(PROFILE_FILE_EXTENSIONS)
+        if (filename.endswith('.log') and filename != main_log_file) or is_profile:
             file_path = os.path.join(log_directory, filename)
             file_modification_time = datetime.fromtimestamp(os.path.getmtime(file_path))
             if now - file_modification_time > timedelta(days=retention_days):
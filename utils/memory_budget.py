@@ -0,0 +1,199 @@
+import ctypes
+import logging
+import os
+import sys
+import tempfile
+from typing import Iterable, Sequence
+
+import pandas as pd
+
+# 入力ファイルのサイズに対する、処理中に増えるピークメモリの倍率（合成データで実測）
+# CSVは検索データの処理6.6倍・比較8.4倍（20万行）、圧縮されていないxlsは予定表の処理7.4倍（6万行）、
+# 圧縮されているxlsxは予定表の処理30～32倍（6万行・20万行）
+CSV_ESTIMATE_FACTOR = 10
+XLS_ESTIMATE_FACTOR = 10
+XLSX_ESTIMATE_FACTOR = 30
+XLSX_EXTENSIONS = ('.xlsx', '.xlsm')
+UNKNOWN_MONTH = 'unknown'
+# 値の種類が少なく、検索データと予定表で比較する列（カテゴリ型で保持する）
+CATEGORICAL_COLUMNS = ('入外', '術眼', '医師', '麻酔')
+
+
+def _estimate_factor(path: str) -> float:
+    """入力ファイルの形式ごとのピークメモリの倍率"""
+    extension = os.path.splitext(path)[1].lower()
+    if extension in XLSX_EXTENSIONS:
+        return XLSX_ESTIMATE_FACTOR
+    if extension == '.xls':
+        return XLS_ESTIMATE_FACTOR
+    return CSV_ESTIMATE_FACTOR
+
+
+def estimate_peak_bytes(file_paths: Iterable[str], factor: float | None = None) -> int:
+    """
+    入力ファイルのサイズから処理中に増えるピークメモリ使用量を推定
+
+    factorを省略した場合は、ファイルの形式ごとの倍率（CSV_ESTIMATE_FACTOR・XLS_ESTIMATE_FACTOR・XLSX_ESTIMATE_FACTOR）を使う。
+    """
+    return int(sum(
+        os.path.getsize(path) * (factor if factor is not None else _estimate_factor(path))
+        for path in file_paths if path and os.path.exists(path)
+    ))
+
+
+def exceeds_budget(estimated_bytes: int, memory_budget_mb: int) -> bool:
+    return memory_budget_mb > 0 and estimated_bytes > memory_budget_mb * 1024 * 1024
+
+
+def get_peak_memory_bytes() -> int | None:
+    """
+    プロセスのピークメモリ使用量（ワーキングセット）を取得
+
+    取得できない環境ではNoneを返す。
+    """
+    if sys.platform == 'win32':
+        class ProcessMemoryCounters(ctypes.Structure):
+            _fields_ = [
+                ('cb', ctypes.c_ulong),
+                ('PageFaultCount', ctypes.c_ulong),
+                ('PeakWorkingSetSize', ctypes.c_size_t),
+                ('WorkingSetSize', ctypes.c_size_t),
+                ('QuotaPeakPagedPoolUsage', ctypes.c_size_t),
+                ('QuotaPagedPoolUsage', ctypes.c_size_t),
+                ('QuotaPeakNonPagedPoolUsage', ctypes.c_size_t),
+                ('QuotaNonPagedPoolUsage', ctypes.c_size_t),
+                ('PagefileUsage', ctypes.c_size_t),
+                ('PeakPagefileUsage', ctypes.c_size_t),
+            ]
+
+        counters = ProcessMemoryCounters()
+        counters.cb = ctypes.sizeof(ProcessMemoryCounters)
+        try:
+            process = ctypes.windll.kernel32.GetCurrentProcess()  # type: ignore[attr-defined]
+            if ctypes.windll.psapi.GetProcessMemoryInfo(  # type: ignore[attr-defined]
+                    process, ctypes.byref(counters), counters.cb):
+                return int(counters.PeakWorkingSetSize)
+        except (AttributeError, OSError):
+            return None
+        return None
+
+    try:
+        import resource
+    except ImportError:
+        return None
+
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOSはバイト単位、Linuxはキロバイト単位
+    return int(max_rss if sys.platform == 'darwin' else max_rss * 1024)
+
+
+def _format_mb(size_bytes: int | None) -> str:
+    return f"{size_bytes / (1024 * 1024):.1f}MB" if size_bytes is not None else "取得不可"
+
+
+def log_memory_usage(stage_name: str, estimated_bytes: int, peak_before: int | None) -> None:
+    """
+    処理中のピークメモリの推定値と実測値をログに記録
+
+    取得できるピークメモリはプロセスの開始からの値のため、処理の開始時の値（peak_before）からの増加を
+    処理中の実測値とする。それまでの処理のピークを超えなかった場合、増加は0になる。
+
+    Args:
+        stage_name: ログに表示する処理の名前
+        estimated_bytes: estimate_peak_bytesで推定した処理中に増えるピークメモリ
+        peak_before: 処理の開始時にget_peak_memory_bytesで取得したプロセスのピークメモリ
+    """
+    peak_after = get_peak_memory_bytes()
+    increase = max(0, peak_after - peak_before) if peak_after is not None and peak_before is not None else None
+    logging.info(
+        f"{stage_name}のメモリ使用量: 推定増加={_format_mb(estimated_bytes)}, "
+        f"実測増加={_format_mb(increase)}（プロセスのピーク={_format_mb(peak_after)}）"
+    )
+
+
+def downcast_numeric_columns(df: pd.DataFrame) -> pd.DataFrame:
+    """整数・浮動小数点列を値が収まる最小の型に変換"""
+    for column in df.select_dtypes(include=['integer']).columns:
+        df[column] = pd.to_numeric(df[column], downcast='integer')
+    for column in df.select_dtypes(include=['floating']).columns:
+        df[column] = pd.to_numeric(df[column], downcast='float')
+    return df
+
+
+def shared_categorical_dtype(series: Sequence[pd.Series]) -> pd.CategoricalDtype:
+    """
+    すべての列の値を含む共通のカテゴリ型
+
+    カテゴリ型の列は行の値を走査せずにカテゴリを、それ以外の列は一意な値を集める。
+    """
+    values = [
+        pd.Index(s.cat.categories) if isinstance(s.dtype, pd.CategoricalDtype) else pd.Index(s.dropna().unique())
+        for s in series
+    ]
+    categories = values[0].append(values[1:]).unique() if values else pd.Index([])
+    return pd.CategoricalDtype(categories.dropna())
+
+
+def share_categories(frames: Sequence[pd.DataFrame], columns: Iterable[str] = CATEGORICAL_COLUMNS) -> list[pd.DataFrame]:
+    """
+    複数のDataFrameの列を、共通のカテゴリを持つカテゴリ型に揃える
+
+    同じカテゴリ型どうしは整数コードで比較でき、結合・連結してもカテゴリ型のまま保たれる。
+    """
+    for column in columns:
+        targets = [frame for frame in frames if column in frame.columns]
+        if not targets:
+            continue
+        dtype = shared_categorical_dtype([frame[column] for frame in targets])
+        for frame in targets:
+            frame[column] = frame[column].astype(dtype)
+    return list(frames)
+
+
+def partition_csv_by_month(
+        csv_path: str,
+        date_column: str,
+        work_dir: str,
+        date_format: str | None = None,
+        chunksize: int = 50_000,
+        **read_csv_kwargs
+) -> list[tuple[str, str]]:
+    """
+    CSVを手術月ごとのCSVに分割
+
+    ファイルをチャンク単位で1回だけ読み込み、各行を手術月（YYYYMM）ごとの
+    一時ファイルに追記する。分割後は月ごとに読み込むことで、メモリ使用量を
+    1か月分のデータ量に抑えられる。
+
+    Args:
+        csv_path: 分割するCSVファイル（cp932）のパス
+        date_column: 手術日の列名
+        work_dir: 分割したファイルの出力先ディレクトリ
+        date_format: 手術日の書式（Noneの場合は自動判定）
+        chunksize: 1回に読み込む行数
+        **read_csv_kwargs: pd.read_csvに渡す追加の引数
+
+    Returns:
+        (手術月, 分割したCSVのパス) のリスト（手術月の昇順）
+    """
+    partitions: dict[str, str] = {}
+
+    for chunk in pd.read_csv(csv_path, encoding='cp932', chunksize=chunksize, **read_csv_kwargs):
+        dates = pd.to_datetime(chunk[date_column], format=date_format, errors='coerce')
+        months = dates.dt.strftime('%Y%m').fillna(UNKNOWN_MONTH)
+
+        for month, rows in chunk.groupby(months, sort=False):
+            month_key = str(month)
+            partition_path = partitions.get(month_key)
+            if partition_path is None:
+                partition_path = os.path.join(work_dir, f'{month_key}.csv')
+                partitions[month_key] = partition_path
+                rows.to_csv(partition_path, index=False, encoding='cp932')
+            else:
+                rows.to_csv(partition_path, index=False, encoding='cp932', mode='a', header=False)
+
+    return sorted(partitions.items())
+
+
+def create_partition_directory() -> tempfile.TemporaryDirectory:
+    return tempfile.TemporaryDirectory(prefix='ophchecker_partition_')
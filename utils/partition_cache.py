@@ -0,0 +1,163 @@
+import hashlib
+import json
+import logging
+import os
+import pickle
+from typing import Any, Callable, Sequence
+
+import pandas as pd
+
+# キャッシュの形式や処理内容を変更した場合に上げ、古いキャッシュを無効にする
+CACHE_VERSION = '1'
+MANIFEST_FILENAME = 'manifest.json'
+
+
+def partition_digests(frames: Sequence[tuple[pd.DataFrame, pd.Series]], context: str = '') -> dict[str, str]:
+    """
+    分割キー（手術日）ごとに、各DataFrameの行のハッシュをまとめた値を計算
+
+    Args:
+        frames: (DataFrame, 行ごとの分割キー) のリスト。同じキーの行は複数のDataFrameにまたがってまとめる
+        context: 結果に影響する設定などを表す文字列（変わるとすべての分割が再計算される）
+
+    Returns:
+        分割キーとハッシュの辞書（キーが欠損している行は含めない）
+    """
+    hashers: dict[str, Any] = {}
+
+    for frame_index, (df, keys) in enumerate(frames):
+        valid = keys.notna()
+        if not valid.any():
+            continue
+        row_hashes = pd.util.hash_pandas_object(df[valid].astype(str), index=False)
+        for key, hashes in row_hashes.groupby(keys[valid].to_numpy(), sort=False):
+            hasher = hashers.get(str(key))
+            if hasher is None:
+                hasher = hashlib.sha1(f'{CACHE_VERSION}|{context}'.encode('utf-8'))
+                hashers[str(key)] = hasher
+            hasher.update(f'|{frame_index}|{len(hashes)}|'.encode('utf-8'))
+            hasher.update(hashes.to_numpy().tobytes())
+
+    return {key: hasher.hexdigest() for key, hasher in hashers.items()}
+
+
+class PartitionCache:
+    """
+    分割キー（手術日）ごとの処理結果を保存するキャッシュ
+
+    分割ごとに処理結果をpickleで保存し、入力のハッシュをmanifest.jsonで管理する。
+    """
+
+    def __init__(self, cache_dir: str, namespace: str):
+        self.directory = os.path.join(cache_dir, namespace)
+        self.manifest_path = os.path.join(self.directory, MANIFEST_FILENAME)
+        self._manifest = self._load_manifest()
+
+    def _load_manifest(self) -> dict[str, str]:
+        try:
+            with open(self.manifest_path, encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _partition_path(self, key: str) -> str:
+        safe_key = ''.join(char if char.isalnum() else '_' for char in key)
+        return os.path.join(self.directory, f'{safe_key}.pkl')
+
+    def load(self, key: str, digest: str) -> pd.DataFrame | None:
+        """入力のハッシュが一致する場合に保存済みの結果を返す"""
+        if self._manifest.get(key) != digest:
+            return None
+        try:
+            with open(self._partition_path(key), 'rb') as f:
+                return pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            return None
+
+    def store(self, key: str, digest: str, df: pd.DataFrame) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        with open(self._partition_path(key), 'wb') as f:
+            pickle.dump(df, f, protocol=pickle.HIGHEST_PROTOCOL)
+        self._manifest[key] = digest
+
+    def prune(self, keep_keys: set[str]) -> None:
+        """今回の入力に含まれない分割を削除"""
+        for key in list(self._manifest):
+            if key not in keep_keys:
+                try:
+                    os.remove(self._partition_path(key))
+                except OSError:
+                    pass
+                del self._manifest[key]
+
+    def save_manifest(self) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        with open(self.manifest_path, 'w', encoding='utf-8') as f:
+            json.dump(self._manifest, f, ensure_ascii=False, indent=2, sort_keys=True)
+
+
+def run_partitioned(
+        cache: PartitionCache,
+        frames: Sequence[tuple[pd.DataFrame, pd.Series]],
+        compute: Callable[..., pd.DataFrame],
+        result_key_column: str,
+        context: str = ''
+) -> pd.DataFrame:
+    """
+    入力が変わった分割だけを処理し、変わっていない分割はキャッシュした結果を使う
+
+    変わった分割の行はまとめて1回だけcomputeに渡し、結果を分割キーごとに保存する。
+    分割キーが欠損している行は常に処理し、キャッシュしない。
+
+    Args:
+        cache: 分割ごとの結果のキャッシュ
+        frames: (DataFrame, 行ごとの分割キー) のリスト
+        compute: 変わった分割の行だけを含むDataFrame（コピー）を、framesと同じ順に受け取って処理する関数
+        result_key_column: 処理結果で分割キーを表す列
+        context: 結果に影響する設定などを表す文字列
+
+    Returns:
+        全分割の処理結果（分割キーの昇順、キーが欠損している行は末尾）
+    """
+    digests = partition_digests(frames, context)
+
+    cached: dict[str, pd.DataFrame] = {}
+    for key, digest in digests.items():
+        df_cached = cache.load(key, digest)
+        if df_cached is not None:
+            cached[key] = df_cached
+
+    changed_keys = set(digests) - set(cached)
+    logging.info(
+        f"手術日ごとの処理: 全{len(digests)}日のうち{len(changed_keys)}日を再計算し、{len(cached)}日はキャッシュを使用します"
+    )
+
+    results: dict[str, pd.DataFrame] = dict(cached)
+    extra_frames: list[pd.DataFrame] = []
+    df_changed = None
+
+    # computeが受け取ったDataFrameを変更できるようにコピーを渡す
+    subsets = [df[keys.isin(changed_keys) | keys.isna()].copy() for df, keys in frames]
+    if any(len(subset) > 0 for subset in subsets) or not results:
+        df_changed = compute(*subsets)
+        result_keys = df_changed[result_key_column]
+
+        for key, df_part in df_changed.groupby(result_keys, sort=False):
+            if str(key) in changed_keys:
+                results[str(key)] = df_part
+            else:
+                extra_frames.append(df_part)
+        if result_keys.isna().any():
+            extra_frames.append(df_changed[result_keys.isna()])
+
+        # 結果の行が無かった分割も空の結果として保存し、次回は再計算しない
+        for key in changed_keys:
+            cache.store(key, digests[key], results.get(key, df_changed.iloc[0:0]))
+
+    cache.prune(set(digests))
+    cache.save_manifest()
+
+    frames_in_order = [results[key] for key in sorted(results)] + extra_frames
+    if not frames_in_order and df_changed is not None:
+        return df_changed
+    return pd.concat(frames_in_order)
@@ -0,0 +1,66 @@
+import cProfile
+import io
+import logging
+import os
+import pstats
+import re
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Callable, Iterator
+
+# ログディレクトリに出力するプロファイルのファイル名の接頭辞と拡張子（ログと同じ保持期間で削除する）
+PROFILE_FILE_PREFIX = 'profile_'
+PROFILE_FILE_EXTENSIONS = ('.prof', '.txt')
+
+
+def _stage_file_stem(output_dir: str, stage_name: str) -> str:
+    """ステージ名とタイムスタンプからファイル名（拡張子なし）を作成"""
+    safe_name = re.sub(r'[^\w\-]+', '_', stage_name)
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    return os.path.join(output_dir, f'{PROFILE_FILE_PREFIX}{timestamp}_{safe_name}')
+
+
+@contextmanager
+def profile_stage(stage_name: str, output_dir: str, top_n: int = 30) -> Iterator[None]:
+    """
+    ブロック内の処理をcProfileで計測し、.profファイルと上位N件の集計テキストを出力
+
+    Args:
+        stage_name: ステージ名（ファイル名に使用）
+        output_dir: 出力先ディレクトリ
+        top_n: 集計テキストに出力する関数の件数
+    """
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        _write_profile(profiler, stage_name, output_dir, top_n)
+
+
+def _write_profile(profiler: cProfile.Profile, stage_name: str, output_dir: str, top_n: int) -> None:
+    try:
+        os.makedirs(output_dir, exist_ok=True)
+        stem = _stage_file_stem(output_dir, stage_name)
+
+        profiler.dump_stats(f'{stem}.prof')
+
+        stream = io.StringIO()
+        stats = pstats.Stats(profiler, stream=stream)
+        stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(top_n)
+        with open(f'{stem}.txt', 'w', encoding='utf-8') as f:
+            f.write(stream.getvalue())
+
+        logging.info(f"プロファイル結果を出力しました: {stem}.prof")
+    except OSError as e:
+        logging.error(f"プロファイル結果の出力中にエラーが発生しました {stage_name}: {str(e)}")
+
+
+def profiled(func: Callable, stage_name: str, output_dir: str, top_n: int = 30) -> Callable:
+    """関数の呼び出しをprofile_stageで包んだ関数を返す"""
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+        with profile_stage(stage_name, output_dir, top_n):
+            return func(*args, **kwargs)
+
+    return wrapper
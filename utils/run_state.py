@@ -0,0 +1,96 @@
+import configparser
+import hashlib
+import json
+import logging
+import os
+from datetime import datetime
+from typing import Iterable
+
+RUN_STATE_FILENAME = 'last_run.json'
+
+
+def get_run_state_path(log_directory: str) -> str:
+    return os.path.join(log_directory, RUN_STATE_FILENAME)
+
+
+def _settings_digest(config: configparser.ConfigParser) -> str:
+    """メモリ上の設定内容のハッシュ（画面で変更して未保存の設定も検出するため）"""
+    content = json.dumps(
+        {section: dict(config.items(section, raw=True)) for section in config.sections()},
+        ensure_ascii=False,
+        sort_keys=True
+    )
+    return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+
+def compute_fingerprint(file_paths: dict[str, str], config: configparser.ConfigParser) -> dict:
+    """
+    入力ファイルと設定の指紋を作成
+
+    ファイルはパス・サイズ・更新日時で識別し、存在しないファイルはNoneとする。
+
+    Args:
+        file_paths: 名前とファイルパスの辞書
+        config: 設定ファイルオブジェクト
+
+    Returns:
+        JSONに保存できる指紋の辞書
+    """
+    files = {}
+    for name, path in sorted(file_paths.items()):
+        if path and os.path.isfile(path):
+            stat = os.stat(path)
+            files[name] = [os.path.abspath(path), stat.st_size, stat.st_mtime_ns]
+        else:
+            files[name] = None
+
+    return {'files': files, 'settings': _settings_digest(config)}
+
+
+def load_run_state(state_path: str) -> dict | None:
+    try:
+        with open(state_path, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def save_run_state(state_path: str, fingerprint: dict, output_file: str) -> None:
+    """正常に完了した実行の指紋と出力ファイルを保存"""
+    state = {
+        'fingerprint': fingerprint,
+        'output_file': output_file,
+        'completed_at': datetime.now().isoformat(timespec='seconds'),
+    }
+    try:
+        os.makedirs(os.path.dirname(state_path), exist_ok=True)
+        with open(state_path, 'w', encoding='utf-8') as f:
+            json.dump(state, f, ensure_ascii=False, indent=2)
+    except OSError as e:
+        logging.warning(f"実行状態を保存できませんでした: {state_path}: {str(e)}")
+
+
+def find_unchanged_output(state_path: str, fingerprint: dict, required_paths: Iterable[str] = ()) -> str | None:
+    """
+    前回の正常終了時から入力ファイルと設定が変わっていなければ前回の出力ファイルを返す
+
+    Args:
+        state_path: 実行状態ファイルのパス
+        fingerprint: 今回の入力ファイルと設定の指紋
+        required_paths: 前回の結果を使うために残っている必要があるファイル
+
+    Returns:
+        前回の出力ファイルのパス（前回不一致が無かった場合は空文字）。
+        変更がある、または前回の結果が使えない場合はNone
+    """
+    state = load_run_state(state_path)
+    if state is None or state.get('fingerprint') != fingerprint:
+        return None
+
+    output_file = state.get('output_file', '')
+    if output_file and not os.path.exists(output_file):
+        return None
+    if any(not os.path.exists(path) for path in required_paths):
+        return None
+
+    return output_file
@@ -0,0 +1,92 @@
+import logging
+from dataclasses import dataclass
+from typing import Callable, Sequence
+
+import pandas as pd
+
+
+@dataclass(frozen=True)
+class Step:
+    """
+    DataFrameに適用する1つの処理と、その処理が読み書きする列
+
+    filters_rowsは行を削除する処理（列の値は変えない）、row_dependentは他の行の値によって
+    結果が変わる処理（重複の判定・並べ替えなど）を表す。
+    """
+    name: str
+    func: Callable[[pd.DataFrame], pd.DataFrame]
+    reads: frozenset[str] = frozenset()
+    writes: frozenset[str] = frozenset()
+    filters_rows: bool = False
+    row_dependent: bool = False
+
+
+def _must_precede(earlier: Step, later: Step) -> bool:
+    """宣言順でearlierが先の2つの処理を、入れ替えると結果が変わるか"""
+    if earlier.row_dependent or later.row_dependent:
+        return True
+    if earlier.filters_rows and later.filters_rows:
+        # 行の削除どうしは順序によらず同じ行が残る
+        return False
+    # 一方が書き込む列をもう一方が読み書きする場合は、宣言順の値を使う必要がある
+    return bool(earlier.writes & (later.reads | later.writes) or later.writes & earlier.reads)
+
+
+def order_steps(steps: Sequence[Step]) -> list[Step]:
+    """
+    列の依存関係が許す範囲で、行を削除する処理をできるだけ先に実行する順序
+
+    入れ替えると結果が変わる処理の組は宣言順を保ち、それ以外は
+    行を削除する処理、まだ実行していない削除処理が依存する処理、宣言順の優先度で並べる。
+    行ごとに独立した処理は削除される行があっても他の行の結果が変わらないため、
+    以降の処理の行数を減らせる。
+    """
+    predecessors = [
+        {index for index in range(position) if _must_precede(steps[index], step)}
+        for position, step in enumerate(steps)
+    ]
+
+    def ancestors(position: int) -> set[int]:
+        result: set[int] = set()
+        pending = list(predecessors[position])
+        while pending:
+            index = pending.pop()
+            if index not in result:
+                result.add(index)
+                pending.extend(predecessors[index])
+        return result
+
+    # 他の行に依存する削除処理は移動できないため、前に移動する対象にしない
+    movable_filters = [
+        position for position, step in enumerate(steps) if step.filters_rows and not step.row_dependent
+    ]
+    filter_ancestors = {position: ancestors(position) for position in movable_filters}
+
+    ordered: list[int] = []
+    remaining = set(range(len(steps)))
+    while remaining:
+        ready = [position for position in remaining if not predecessors[position] - set(ordered)]
+        unblocks_filter = set().union(*(
+            filter_ancestors[position] for position in filter_ancestors if position in remaining
+        ))
+
+        def priority(position: int) -> tuple[int, int]:
+            if position in filter_ancestors:
+                return 0, position
+            return (1 if position in unblocks_filter else 2), position
+
+        chosen = min(ready, key=priority)
+        ordered.append(chosen)
+        remaining.remove(chosen)
+
+    return [steps[position] for position in ordered]
+
+
+def run_steps(df: pd.DataFrame, steps: Sequence[Step]) -> pd.DataFrame:
+    """処理を順に適用（行を削除した処理は削除した件数をログに記録）"""
+    for step in steps:
+        row_count = len(df)
+        df = step.func(df)
+        if step.filters_rows and len(df) < row_count:
+            logging.debug(f"{step.name}: {row_count - len(df)}行を削除しました")
+    return df